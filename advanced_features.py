@@ -1,7 +1,18 @@
 # advanced_features.py
-from typing import List, Dict
-import random
+from typing import List, Dict, Optional, Sequence
 from datetime import datetime, timedelta
+from lexicon import SENTIMENT_LEXICON, NICHE_LEXICON
+from realtime_utils import ENGAGEMENT_LENGTH_RANGE, FEATURE_COLUMNS, extract_caption_features, score_feature_arrays
+
+# Style presets: (text before the caption, text after it)
+CONTENT_STYLES = {
+    "Default": ("", ""),
+    "Viral": ("🔥 STOP SCROLLING! 🔥", "💥 This is HUGE! Share if you agree! 👇"),
+    "Professional": ("Industry Insight:", "Thoughts? Let's discuss in the comments."),
+    "Storytelling": ("Here's a story you need to hear...", "What's your story? Share below 👇"),
+    "Educational": ("📚 Today's Lesson:", "Want to learn more? Follow for daily tips!"),
+    "Humorous": ("😂 Real talk:", "Tag someone who needs to see this! 😅"),
+}
 
 def get_best_posting_times(platform: str) -> Dict[str, List[str]]:
     """Return optimal posting times based on platform and audience"""
@@ -24,53 +35,102 @@ def get_best_posting_times(platform: str) -> Dict[str, List[str]]:
     }
     return times.get(platform, times["Instagram"])
 
-def generate_ab_variants(original_caption: str, num_variants: int = 2) -> List[Dict[str, str]]:
-    """Generate A/B test variants with different hooks and CTAs"""
+# Hook variations
+AB_HOOKS = [
+    "🔥 Hot take:",
+    "💡 Pro tip:",
+    "⚡ Quick question:",
+    "🎯 Real talk:",
+    "👀 You need to see this:",
+    "🚀 Game changer:"
+]
+
+# CTA variations
+AB_CTAS = [
+    "Drop a comment below 👇",
+    "Save this for later 📌",
+    "Share with someone who needs this 💙",
+    "DM us to learn more 📩",
+    "Click the link in bio 🔗",
+    "Tag a friend who needs to see this 👥"
+]
+
+def _variant_label(index: int) -> str:
+    """A, B, ..., Z, AA, AB, ... like spreadsheet columns"""
+    label = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        label = chr(65 + rem) + label
+    return label
+
+def generate_ab_variants(
+    original_caption: str,
+    num_variants: int = 2,
+    platform: str = "Instagram",
+    seed: int = 0,
+    hooks: Sequence[str] = AB_HOOKS,
+    ctas: Sequence[str] = AB_CTAS,
+    styles: Optional[Sequence[str]] = None,
+) -> List[Dict]:
+    """Top `num_variants` hook × style × CTA variants by predicted engagement score.
+
+    Every combination is scored in one numpy pass: the parts are joined by
+    blank lines, so the scorer's features are sums (lengths, hashtag and emoji
+    counts) or ORs (CTA, question) of per-part features computed once. Only a
+    CTA phrase split across two parts would be missed. Equal scores are ordered
+    by a shuffle seeded with `seed`, so the same inputs give the same variants.
+    """
+    import numpy as np
+
+    hooks = list(dict.fromkeys(hooks))
+    ctas = list(dict.fromkeys(ctas))
+    styles = list(dict.fromkeys(styles or CONTENT_STYLES))
+    cores = [apply_content_style(original_caption, style) for style in styles]
+
+    def features(texts: List[str]) -> Dict[str, "np.ndarray"]:
+        rows = [extract_caption_features(t) for t in texts]
+        return {name: np.array([row[name] for row in rows]) for name in FEATURE_COLUMNS}
+
+    # Axes: (hook, style, cta)
+    h, s, c = features(hooks), features(cores), features(ctas)
+    h = {k: v[:, None, None] for k, v in h.items()}
+    s = {k: v[None, :, None] for k, v in s.items()}
+    c = {k: v[None, None, :] for k, v in c.items()}
+    low, high = ENGAGEMENT_LENGTH_RANGE.get(platform, (1, 0))
+    scores = score_feature_arrays(
+        h["char_count"] + s["char_count"] + c["char_count"] + 4,  # two "\n\n" separators
+        h["hashtag_count"] + s["hashtag_count"] + c["hashtag_count"],
+        h["emoji_count"] + s["emoji_count"] + c["emoji_count"],
+        h["has_cta"] | s["has_cta"] | c["has_cta"],
+        h["has_question"] | s["has_question"] | c["has_question"],
+        low,
+        high,
+    ).ravel()
+
+    order = np.random.default_rng(seed).permutation(scores.size)
+    top = order[np.argsort(-scores[order], kind="stable")[:max(0, num_variants)]]
     variants = []
-    
-    # Hook variations
-    hooks = [
-        "🔥 Hot take:",
-        "💡 Pro tip:",
-        "⚡ Quick question:",
-        "🎯 Real talk:",
-        "👀 You need to see this:",
-        "🚀 Game changer:"
-    ]
-    
-    # CTA variations
-    ctas = [
-        "Drop a comment below 👇",
-        "Save this for later 📌",
-        "Share with someone who needs this 💙",
-        "DM us to learn more 📩",
-        "Click the link in bio 🔗",
-        "Tag a friend who needs to see this 👥"
-    ]
-    
-    for i in range(num_variants):
-        variant = {
-            "version": f"Variant {chr(65+i)}",
-            "hook": random.choice(hooks),
-            "cta": random.choice(ctas),
-            "caption": f"{random.choice(hooks)}\n\n{original_caption}\n\n{random.choice(ctas)}"
-        }
-        variants.append(variant)
-    
+    for i, flat in enumerate(top):
+        hook, style, cta = np.unravel_index(flat, (len(hooks), len(styles), len(ctas)))
+        variants.append({
+            "version": f"Variant {_variant_label(i)}",
+            "hook": hooks[hook],
+            "cta": ctas[cta],
+            "style": styles[style],
+            "caption": f"{hooks[hook]}\n\n{cores[style]}\n\n{ctas[cta]}",
+            "engagement_score": int(scores[flat]),
+        })
     return variants
 
 def analyze_sentiment(text: str) -> Dict[str, any]:
     """Analyze sentiment of the caption"""
     # Simple keyword-based sentiment (can be replaced with ML model)
-    positive_words = ['great', 'amazing', 'excellent', 'love', 'best', 'awesome', 'fantastic', 'wonderful', 'success', 'win']
-    negative_words = ['bad', 'worst', 'hate', 'terrible', 'awful', 'fail', 'problem', 'issue', 'difficult', 'hard']
-    neutral_words = ['update', 'news', 'announcement', 'information', 'learn', 'know', 'understand']
+    found = SENTIMENT_LEXICON.terms_by_category(text)
     
-    text_lower = text.lower()
-    
-    pos_count = sum(1 for word in positive_words if word in text_lower)
-    neg_count = sum(1 for word in negative_words if word in text_lower)
-    neu_count = sum(1 for word in neutral_words if word in text_lower)
+    pos_count = len(found.get("positive", ()))
+    neg_count = len(found.get("negative", ()))
+    neu_count = len(found.get("neutral", ()))
     
     total = pos_count + neg_count + neu_count
     
@@ -144,18 +204,10 @@ def generate_content_calendar(plan_items: List, start_date: datetime = None) ->
 
 def apply_content_style(caption: str, style: str) -> str:
     """Apply content style modifications"""
-    if style == "Viral":
-        return f"🔥 STOP SCROLLING! 🔥\n\n{caption}\n\n💥 This is HUGE! Share if you agree! 👇"
-    elif style == "Professional":
-        return f"Industry Insight:\n\n{caption}\n\nThoughts? Let's discuss in the comments."
-    elif style == "Storytelling":
-        return f"Here's a story you need to hear...\n\n{caption}\n\nWhat's your story? Share below 👇"
-    elif style == "Educational":
-        return f"📚 Today's Lesson:\n\n{caption}\n\nWant to learn more? Follow for daily tips!"
-    elif style == "Humorous":
-        return f"😂 Real talk:\n\n{caption}\n\nTag someone who needs to see this! 😅"
-    else:
+    prefix, suffix = CONTENT_STYLES.get(style, ("", ""))
+    if not prefix and not suffix:
         return caption
+    return f"{prefix}\n\n{caption}\n\n{suffix}"
 
 def translate_caption(caption: str, target_language: str) -> str:
     """Mock translation (replace with real translation API)"""
@@ -189,7 +241,7 @@ def generate_smart_hashtags(title: str, niche: str, platform: str) -> List[str]:
         "business": ["Business", "Entrepreneurship", "StartupLife", "Leadership", "Marketing"]
     }
     
-    base_tags = niche_tags.get(niche.lower(), ["Growth", "Success", "Motivation"])
+    base_tags = niche_tags.get(NICHE_LEXICON.first_category(niche), ["Growth", "Success", "Motivation"])
     
     # Generate hashtags
     hashtags = [f"#{tag}" for tag in base_tags[:count]]
@@ -1,19 +1,36 @@
 # agent.py
 import os
-from typing import List, Dict
-from pydantic import BaseModel, Field
+import re
+import sys
+import json
+import asyncio
+import weakref
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, List, Dict, Iterable, Iterator, Optional, Tuple, Callable
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import PromptTemplate
-from langchain_core.messages import SystemMessage, HumanMessage
-from prompts import (
-    SOCIAL_STRATEGY_SYSTEM,
-    SOCIAL_STRATEGY_TEMPLATE,
-    CAPTION_SYSTEM,
-    CAPTION_TEMPLATE,
-    REPURPOSE_SYSTEM,
-    REPURPOSE_TEMPLATE,
+from cache import ResponseCache, cache_key, get_default_cache
+from metrics import MetricsRegistry, get_metrics
+from scheduler import (
+    LLMScheduler,
+    get_scheduler,
+    estimate_tokens,
+    priority,
+    OPERATION_PRIORITY,
+    EXPECTED_OUTPUT_TOKENS,
+    PRIORITY_NORMAL,
+    PRIORITY_BULK,
 )
+from prompt_registry import PromptRegistry, RegisteredPrompt, get_prompt_registry
+from hedging import AttemptSignal, HedgeCancelled, HedgingPolicy, model_label
+from singleflight import SingleFlight, get_singleflight
+
+# langchain_openai and the langchain_core model stack take over a second to import,
+# so they load on first use (see SocialAgent.__init__); importing this module stays cheap
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+    from semantic_cache import SemanticCache, SemanticMatch
 
 load_dotenv()
 
@@ -28,17 +45,563 @@ class PlanItem(BaseModel):
     hashtags: str
 
 
+class CompactPost(BaseModel):
+    """One plan post as returned in JSON mode; short keys keep the output small."""
+
+    # Extra keys are ignored when parsing but forbidden in the schema sent to the model
+    model_config = ConfigDict(json_schema_extra={"additionalProperties": False})
+
+    d: int = Field(..., description="Day number")
+    p: str = Field(..., description="Platform")
+    t: str = Field(..., description="Post type")
+    i: str = Field(..., description="Idea title")
+    k: str = Field(..., description="Key points, comma-separated")
+    c: str = Field(..., description="Call to action")
+    h: str = Field(..., description="Hashtags, space-separated")
+
+    def to_plan_item(self) -> PlanItem:
+        return PlanItem(
+            post_date=f"Day {self.d}",
+            platform=self.p,
+            post_type=self.t,
+            idea_title=self.i,
+            key_points=self.k,
+            cta=self.c,
+            hashtags=self.h,
+        )
+
+
+class CompactPlan(BaseModel):
+    model_config = ConfigDict(json_schema_extra={"additionalProperties": False})
+
+    posts: List[CompactPost]
+
+
+class CaptionResult(BaseModel):
+    post_date: str
+    platform: str
+    caption: Optional[str] = None
+    error: Optional[str] = None
+
+
+PLAN_FIELDS = ["post_date", "platform", "post_type", "idea_title", "key_points", "cta", "hashtags"]
+PLAN_DAYS = 30
+PLAN_THEMES = ["education", "storytelling", "behind-the-scenes", "social proof", "UGC prompts", "offers"]
+
+PLAN_OUTPUT_FORMATS = ("text", "json")
+
+# OpenAI structured outputs; other chat models ignore or reject unknown kwargs, see _plan_llm_kwargs
+PLAN_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "plan", "strict": True, "schema": CompactPlan.model_json_schema()},
+}
+
+_DAY_NUMBER = re.compile(r"\d+")
+_LABEL_NOISE = re.compile(r"[*_`#>\-\s]+")
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+_COMPACT_PLAN = TypeAdapter(CompactPlan)
+_COMPACT_POST = TypeAdapter(CompactPost)
+
+# Request fields that must match exactly for a semantic cache hit; the rest are compared fuzzily
+_SEMANTIC_EXACT_FIELDS = {
+    "caption": ["platform"],
+    "repurpose": ["source_platform", "target_platforms"],
+}
+
+
+def _parse_plan_block(block_text: str) -> Optional[PlanItem]:
+    """Parse one `---` delimited block into a PlanItem, or None if incomplete."""
+    block = {}
+    for line in block_text.splitlines():
+        if ":" in line:
+            key, value = line.split(":", 1)
+            # Tolerate markdown labels such as "**Post Date:**" or "- Platform:"
+            key = _LABEL_NOISE.sub(" ", key).strip().lower().replace(" ", "_")
+            if key in PLAN_FIELDS and key not in block:
+                block[key] = value.strip().strip("*").strip()
+
+    if all(key in block for key in PLAN_FIELDS):
+        try:
+            return PlanItem(**{k: block[k] for k in PLAN_FIELDS})
+        except Exception:
+            return None
+    return None
+
+
+def _parse_plan_json(text: str) -> List[PlanItem]:
+    """Validate a JSON-mode reply into PlanItems.
+
+    The whole document is validated in one pass; if that fails, every post that
+    validates on its own is kept so one bad entry does not lose the plan.
+    """
+    text = _CODE_FENCE.sub("", text.strip())
+    try:
+        return [post.to_plan_item() for post in _COMPACT_PLAN.validate_json(text).posts]
+    except ValidationError:
+        pass
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return []
+    posts = data.get("posts") if isinstance(data, dict) else data
+    items = []
+    for post in posts if isinstance(posts, list) else []:
+        try:
+            items.append(_COMPACT_POST.validate_python(post).to_plan_item())
+        except ValidationError:
+            continue
+    return items
+
+
+def _day_number(post_date: str) -> Optional[int]:
+    match = _DAY_NUMBER.search(post_date)
+    return int(match.group()) if match else None
+
+
+def _plan_by_day(items: Iterable[PlanItem], days: int = PLAN_DAYS) -> Dict[int, PlanItem]:
+    """Items keyed by day number, dropping days outside 1..days; the first item for a day wins."""
+    by_day: Dict[int, PlanItem] = {}
+    for item in items:
+        day = _day_number(item.post_date)
+        if day is not None and 1 <= day <= days and day not in by_day:
+            by_day[day] = item
+    return by_day
+
+
+def _first_per_day(items: Iterable[PlanItem]) -> List[PlanItem]:
+    """Drop repeated days, keeping the first post for each (the policy of every plan path)."""
+    seen = set()
+    kept = []
+    for item in items:
+        day = _day_number(item.post_date)
+        if day is not None:
+            if day in seen:
+                continue
+            seen.add(day)
+        kept.append(item)
+    return kept
+
+
+def missing_days(items: Iterable[PlanItem], days: int = PLAN_DAYS) -> List[int]:
+    """Day numbers in 1..days with no usable item."""
+    by_day = _plan_by_day(items, days)
+    return [day for day in range(1, days + 1) if day not in by_day]
+
+
+def _plan_outline(by_day: Dict[int, PlanItem]) -> str:
+    """One short line per kept day, given to the model as context for a repair."""
+    if not by_day:
+        return "(nothing yet)"
+    return "\n".join(
+        f"- Day {day} ({item.platform}, {item.post_type}): {item.idea_title}"
+        for day, item in sorted(by_day.items())
+    )
+
+
+def _shard_ranges(days: int, shards: int) -> List[Tuple[int, int]]:
+    """Split days 1..days into `shards` contiguous, near-equal (start, end) ranges."""
+    shards = max(1, min(shards, days))
+    size, extra = divmod(days, shards)
+    ranges = []
+    start = 1
+    for i in range(shards):
+        end = start + size - 1 + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end + 1
+    return ranges
+
+
+def _shard_themes(shards: int) -> List[List[str]]:
+    """Deal PLAN_THEMES round-robin so every shard has its own focus."""
+    themes = [[] for _ in range(shards)]
+    for i in range(max(shards, len(PLAN_THEMES))):
+        themes[i % shards].append(PLAN_THEMES[i % len(PLAN_THEMES)])
+    return themes
+
+
+def _iter_repurpose_sections(chunks: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """Yield (platform, caption) as soon as each `[Platform]:` section is closed.
+
+    A section closes when the next header line arrives or the stream ends.
+    """
+    current = None
+    buffer: List[str] = []
+    pending = ""
+
+    def lines():
+        nonlocal pending
+        for chunk in chunks:
+            pending += chunk
+            *complete, pending = pending.split("\n")
+            yield from complete
+        if pending:
+            yield pending
+
+    for line in lines():
+        if line.startswith("[") and "]" in line:
+            if current:
+                yield current, "\n".join(buffer).strip()
+            current = line.strip().strip("[]:").strip()
+            buffer = []
+        else:
+            buffer.append(line)
+
+    text = "\n".join(buffer).strip()
+    if current and text:
+        yield current, text
+
+
+def _usage_tokens(usage: Optional[dict], messages, text: str) -> Tuple[int, int]:
+    """(prompt, completion) tokens from the provider's usage metadata, else a local estimate."""
+    if usage:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    return sum(estimate_tokens(m.content) for m in messages), estimate_tokens(text)
+
+
+def _ai_message(content: str):
+    from langchain_core.messages import AIMessage
+
+    return AIMessage(content=content)
+
+
+def _is_chat_openai(llm) -> bool:
+    # If langchain_openai was never imported, llm cannot be a ChatOpenAI
+    module = sys.modules.get("langchain_openai")
+    return module is not None and isinstance(llm, module.ChatOpenAI)
+
+
+def _cached_tokens(usage: Optional[dict]) -> int:
+    """Prompt tokens the provider served from its prefix cache."""
+    return ((usage or {}).get("input_token_details") or {}).get("cache_read", 0) or 0
+
+
+def _platform_output(platform: str, text: str) -> str:
+    """Caption for one platform from a single-platform reply, with or without a header."""
+    sections = dict(_iter_repurpose_sections([text.strip()]))
+    if platform in sections:
+        return sections[platform]
+    if len(sections) == 1:
+        return next(iter(sections.values()))
+    return text.strip()
+
+
 class SocialAgent:
-    def __init__(self, model: str = "gpt-4o-mini", temperature: float = 0.7):
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not set in .env")
-        self.llm = ChatOpenAI(model=model, temperature=temperature)
+    def __init__(
+        self,
+        model: str = "gpt-4o-mini",
+        temperature: float = 0.7,
+        max_concurrency: int = 16,
+        cache: Optional[ResponseCache] = None,
+        use_cache: Optional[bool] = None,
+        semantic_cache: Optional["SemanticCache"] = None,
+        scheduler: Optional[LLMScheduler] = None,
+        llm: Optional["BaseChatModel"] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        prompts: Optional[PromptRegistry] = None,
+        hedging: Optional[HedgingPolicy] = None,
+        singleflight: Optional[SingleFlight] = None,
+        coalesce: bool = True,
+    ):
+        self.model_name = model
+        self.temperature = temperature
+        if llm is not None:
+            # Any LangChain chat model, e.g. fake_llm.FakeChatModel for offline runs
+            self.llm = llm
+        else:
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY not set in .env")
+            # Retries are owned by the shared scheduler, not the client
+            # stream_usage puts token counts on the last streamed chunk for the metrics
+            from langchain_openai import ChatOpenAI
+
+            self.llm = ChatOpenAI(model=model, temperature=temperature, max_retries=0, stream_usage=True)
+        self.scheduler = scheduler or get_scheduler()
+        self.max_concurrency = max_concurrency
+        # asyncio primitives are bound to one event loop, so keep one per loop
+        self._semaphores = weakref.WeakKeyDictionary()
+        # Only deterministic settings are cached unless asked otherwise
+        self.use_cache = temperature == 0 if use_cache is None else use_cache
+        self.cache = cache if cache is not None else get_default_cache()
+        self.semantic_cache = semantic_cache
+        self.metrics = metrics or get_metrics()
+        self.prompts = prompts or get_prompt_registry()
+        # Off unless configured: each hedge is a second paid request
+        self.hedging = hedging
+        # Identical concurrent requests (double-clicks, reruns, open tabs) share one upstream call
+        self.singleflight = (singleflight or get_singleflight()) if coalesce else None
+        self._local = threading.local()
+
+    def _messages(self, prompt: RegisteredPrompt, variables: dict):
+        messages = prompt.messages(variables)
+        self.prompts.record(prompt, messages)
+        return messages
+
+    def _cache_key(self, messages) -> Optional[str]:
+        if not self.use_cache or not self.cache.enabled:
+            return None
+        return cache_key(messages[0].content, messages[1].content, self.model_name, self.temperature)
+
+    @property
+    def last_semantic_match(self) -> Optional["SemanticMatch"]:
+        """Semantic cache match that served this thread's last caption/repurpose call, if any."""
+        return getattr(self._local, "semantic_match", None)
+
+    def _semantic_fields(self, namespace: str, variables: dict) -> Tuple[dict, dict]:
+        exact_fields = _SEMANTIC_EXACT_FIELDS[namespace]
+        exact = {k: variables[k] for k in exact_fields}
+        exact["model"] = self.model_name
+        fuzzy = {k: v for k, v in variables.items() if k not in exact_fields}
+        return exact, fuzzy
 
-    def _invoke_chain(self, system_prompt: str, prompt: PromptTemplate, variables: dict):
-        system_message = SystemMessage(content=system_prompt)
-        human_message = HumanMessage(content=prompt.format(**variables))
-        return self.llm.invoke([system_message, human_message])
+    def _semantic_lookup(self, namespace: str, variables: dict) -> Optional[str]:
+        self._local.semantic_match = None
+        if self.semantic_cache is None:
+            return None
+        call = self.metrics.start(namespace, self.model_name)
+        match = self.semantic_cache.lookup(namespace, *self._semantic_fields(namespace, variables))
+        self._local.semantic_match = match
+        if match is None:
+            return None
+        call.finish(cache="semantic")
+        return match.response
+
+    def _semantic_store(self, namespace: str, variables: dict, response: str):
+        if self.semantic_cache is not None:
+            self.semantic_cache.add(namespace, *self._semantic_fields(namespace, variables), response)
+
+    def _flight_key(self, mode: str, messages, llm_kwargs: Optional[dict] = None) -> str:
+        """`mode` ("invoke" or "stream") keeps streamed and whole-message flights apart: their results differ in shape."""
+        human = messages[1].content + json.dumps(llm_kwargs or {}, sort_keys=True, default=str)
+        return mode + ":" + cache_key(messages[0].content, human, model_label(self.llm, self.model_name), self.temperature)
+
+    def _coalesced(self, call) -> Callable[[Optional[BaseException]], None]:
+        """Finishes a follower's metrics: no tokens of its own, counted as cache="coalesced"."""
+        return lambda error: call.finish(cache="coalesced", error=error)
+
+    def _admission(self, messages, operation: str) -> Tuple[int, int]:
+        """(estimated tokens, queue priority) used by the scheduler for one call."""
+        tokens = sum(estimate_tokens(m.content) for m in messages) + EXPECTED_OUTPUT_TOKENS.get(operation, 500)
+        return tokens, OPERATION_PRIORITY.get(operation, PRIORITY_NORMAL)
+
+    def _invoke_chain(
+        self, prompt: RegisteredPrompt, variables: dict, operation: str = "plan",
+        llm_kwargs: Optional[dict] = None,
+    ):
+        messages = self._messages(prompt, variables)
+        call = self.metrics.start(operation, self.model_name)
+        key = self._cache_key(messages)
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                call.finish(cache="hit")
+                return _ai_message(cached)
+            call.cache = "miss"
+
+        if self.singleflight is None:
+            return self._invoke_upstream(messages, operation, call, key, llm_kwargs)
+        resp, _ = self.singleflight.do(
+            self._flight_key("invoke", messages, llm_kwargs),
+            lambda: self._invoke_upstream(messages, operation, call, key, llm_kwargs),
+            self._coalesced(call),
+        )
+        return resp
+
+    def _invoke_upstream(self, messages, operation: str, call, key: Optional[str], llm_kwargs: Optional[dict]):
+        tokens, rank = self._admission(messages, operation)
+        try:
+            if self.hedging is not None and self.hedging.applies(operation):
+                resp = self._hedged_invoke(messages, operation, tokens, rank, call, llm_kwargs)
+            else:
+                resp = self.scheduler.run(
+                    lambda: self.llm.invoke(messages, **(llm_kwargs or {})), self.model_name, tokens, rank, call.scheduler_stats
+                )
+        except Exception as e:
+            call.finish(error=e)
+            raise
+        call.finish(*_usage_tokens(resp.usage_metadata, messages, resp.content), cached_tokens=_cached_tokens(resp.usage_metadata))
+        if key:
+            self.cache.set(key, resp.content)
+        return resp
+
+    def _hedged_invoke(self, messages, operation: str, tokens: int, rank: int, call, llm_kwargs: Optional[dict]):
+        """invoke() through the hedging policy. Attempts stream so the first token is observable."""
+
+        def attempt(llm, signal: AttemptSignal):
+            stats = call.scheduler_stats if llm is self.llm else {}
+
+            def collect():
+                if signal.cancelled:
+                    raise HedgeCancelled()
+                message = None
+                stream = llm.stream(messages, **(llm_kwargs or {}))
+                try:
+                    for chunk in stream:
+                        if signal.cancelled:
+                            raise HedgeCancelled()
+                        if chunk.content:
+                            signal.first_token()
+                            call.first_token()
+                        message = chunk if message is None else message + chunk
+                finally:
+                    stream.close()
+                return message if message is not None else _ai_message("")
+
+            return self.scheduler.run(collect, model_label(llm, self.model_name), tokens, rank, stats)
+
+        resp, hedged, won = self.hedging.run(operation, self.llm, attempt)
+        if hedged:
+            self.metrics.record_hedge(operation, self.model_name, won)
+        return resp
+
+    async def _ahedged_invoke(self, messages, operation: str, tokens: int, rank: int, call, llm_kwargs: Optional[dict]):
+        async def attempt(llm, signal: AttemptSignal):
+            stats = call.scheduler_stats if llm is self.llm else {}
+
+            async def collect():
+                message = None
+                async for chunk in llm.astream(messages, **(llm_kwargs or {})):
+                    if chunk.content:
+                        signal.first_token()
+                        call.first_token()
+                    message = chunk if message is None else message + chunk
+                return message if message is not None else _ai_message("")
+
+            return await self.scheduler.arun(collect, model_label(llm, self.model_name), tokens, rank, stats)
+
+        resp, hedged, won = await self.hedging.arun(operation, self.llm, attempt)
+        if hedged:
+            self.metrics.record_hedge(operation, self.model_name, won)
+        return resp
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def _ainvoke_chain(
+        self, prompt: RegisteredPrompt, variables: dict, operation: str = "plan",
+        llm_kwargs: Optional[dict] = None,
+    ):
+        messages = self._messages(prompt, variables)
+        call = self.metrics.start(operation, self.model_name)
+        key = self._cache_key(messages)
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                call.finish(cache="hit")
+                return _ai_message(cached)
+            call.cache = "miss"
+
+        if self.singleflight is None:
+            return await self._ainvoke_upstream(messages, operation, call, key, llm_kwargs)
+        resp, _ = await self.singleflight.ado(
+            self._flight_key("invoke", messages, llm_kwargs),
+            lambda: self._ainvoke_upstream(messages, operation, call, key, llm_kwargs),
+            self._coalesced(call),
+        )
+        return resp
+
+    async def _ainvoke_upstream(self, messages, operation: str, call, key: Optional[str], llm_kwargs: Optional[dict]):
+        try:
+            async with self._semaphore():
+                tokens, rank = self._admission(messages, operation)
+                if self.hedging is not None and self.hedging.applies(operation):
+                    resp = await self._ahedged_invoke(messages, operation, tokens, rank, call, llm_kwargs)
+                else:
+                    resp = await self.scheduler.arun(
+                        lambda: self.llm.ainvoke(messages, **(llm_kwargs or {})), self.model_name, tokens, rank, call.scheduler_stats
+                    )
+        except Exception as e:
+            call.finish(error=e)
+            raise
+        call.finish(*_usage_tokens(resp.usage_metadata, messages, resp.content), cached_tokens=_cached_tokens(resp.usage_metadata))
+        if key:
+            self.cache.set(key, resp.content)
+        return resp
+
+    def _stream_chain(
+        self, prompt: RegisteredPrompt, variables: dict, operation: str = "plan",
+        complete: Optional[Callable[[], bool]] = None,
+    ) -> Iterator[str]:
+        """Yield text chunks. A stream read to the end is cached; one the caller
+        closes early is cached only if `complete()` says it already got everything."""
+        messages = self._messages(prompt, variables)
+        call = self.metrics.start(operation, self.model_name)
+        key = self._cache_key(messages)
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                call.finish(cache="hit")
+                yield cached
+                return
+            call.cache = "miss"
+
+        if self.singleflight is None:
+            yield from self._stream_upstream(messages, operation, call, key, complete)
+            return
+        yield from self.singleflight.stream(
+            self._flight_key("stream", messages),
+            lambda: self._stream_upstream(messages, operation, call, key, complete),
+            self._coalesced(call),
+        )
+
+    def _stream_upstream(
+        self, messages, operation: str, call, key: Optional[str], complete: Optional[Callable[[], bool]] = None
+    ) -> Iterator[str]:
+        parts = []
+        usage = None
+        error = None
+        tokens, rank = self._admission(messages, operation)
+        try:
+            for chunk in self.scheduler.stream(
+                lambda: self.llm.stream(messages), self.model_name, tokens, rank, call.scheduler_stats
+            ):
+                usage = chunk.usage_metadata or usage
+                if chunk.content:
+                    call.first_token()
+                    parts.append(chunk.content)
+                    yield chunk.content
+        except GeneratorExit:
+            if key and complete is not None and complete():
+                self.cache.set(key, "".join(parts))
+            raise
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Also runs when the caller stops reading early (GeneratorExit)
+            call.finish(*_usage_tokens(usage, messages, "".join(parts)), cached_tokens=_cached_tokens(usage), error=error)
+        # Only a stream read to the end is a complete response worth caching
+        if key:
+            self.cache.set(key, "".join(parts))
+
+    def _plan_request(
+        self,
+        brand_name: str,
+        niche: str,
+        audience: str,
+        tone: str,
+        platforms: List[str],
+        goal: str,
+        constraints: str = "",
+        output_format: str = "text",
+    ):
+        if output_format not in PLAN_OUTPUT_FORMATS:
+            raise ValueError(f"output_format must be one of {PLAN_OUTPUT_FORMATS}, got {output_format!r}")
+        prompt = self.prompts.get("plan_json" if output_format == "json" else "plan")
+        variables = {
+            "brand_name": brand_name,
+            "niche": niche,
+            "audience": audience,
+            "tone": tone,
+            "platforms": ", ".join(platforms),
+            "goal": goal,
+            "constraints": constraints or "None",
+        }
+        return prompt, variables
 
     def create_30_day_plan(
         self,
@@ -49,49 +612,330 @@ class SocialAgent:
         platforms: List[str],
         goal: str,
         constraints: str = "",
+        shards: int = 1,
+        output_format: str = "text",
+        repair: bool = True,
     ) -> List[PlanItem]:
+        """Generate the plan in one call, or `shards` concurrent day ranges.
 
-        prompt = PromptTemplate(
-            template=SOCIAL_STRATEGY_TEMPLATE,
-            input_variables=["brand_name", "niche", "audience", "tone",
-                             "platforms", "goal", "constraints"]
+        output_format="json" asks for a compact JSON document (structured
+        outputs on OpenAI models), which parses reliably and costs fewer
+        output tokens than the labelled text blocks.
+
+        With `repair`, days that are missing or failed to parse are requested
+        again in one follow-up call, with the rest of the plan as context.
+        """
+        prompt, variables = self._plan_request(
+            brand_name, niche, audience, tone, platforms, goal, constraints, output_format
         )
+        if shards > 1:
+            items = self._create_sharded_plan(variables, shards, output_format)
+        else:
+            resp = self._invoke_chain(
+                prompt, variables, llm_kwargs=self._plan_llm_kwargs(output_format)
+            )
+            items = self._parse_plan_response(resp, output_format, PLAN_DAYS)
+        # Nothing usable means the reply as a whole failed; that is left to the caller
+        if repair and items and missing_days(items):
+            items = self._repair_plan(variables, items, missing_days(items), output_format)
+        return items
+
+    def _parse_plan(self, text: str, output_format: str = "text") -> List[PlanItem]:
+        if output_format == "json":
+            # A model that ignored the JSON instructions may still have used the text format
+            return _first_per_day(_parse_plan_json(text)) or self._parse_plan(text)
+
+        items: List[PlanItem] = []
+
+        for block_text in text.strip().split("---"):
+            item = _parse_plan_block(block_text)
+            if item:
+                items.append(item)
+
+        return _first_per_day(items)
+
+    def _plan_llm_kwargs(self, output_format: str) -> Optional[dict]:
+        if output_format == "json" and _is_chat_openai(self.llm):
+            return {"response_format": PLAN_RESPONSE_FORMAT}
+        return None
+
+    def _parse_plan_response(self, resp, output_format: str, expected: int) -> List[PlanItem]:
+        """Parse a plan reply and record how much of it parsed, per output format."""
+        items = self._parse_plan(resp.content, output_format)
+        _, completion_tokens = _usage_tokens(resp.usage_metadata, [], resp.content)
+        self.metrics.record_parse(output_format, expected, len(items), completion_tokens)
+        return items
 
+    def _shard_requests(self, variables: dict, shards: int) -> List[Tuple[int, int, dict]]:
+        """Build one (start, end, variables) request per day range.
+
+        Each shard is told which themes the other shards cover so that ideas
+        do not repeat across concurrently generated ranges.
+        """
+        ranges = _shard_ranges(PLAN_DAYS, shards)
+        themes = _shard_themes(len(ranges))
+        requests = []
+        for i, (start, end) in enumerate(ranges):
+            others = [
+                f"- Day {s} to Day {e}: {', '.join(themes[j])}"
+                for j, (s, e) in enumerate(ranges) if j != i
+            ]
+            requests.append((start, end, {
+                **variables,
+                "day_range": f"Day {start} to Day {end}",
+                "focus_themes": ", ".join(themes[i]),
+                "other_parts": "\n".join(others),
+            }))
+        return requests
+
+    def _merge_shard(self, start: int, end: int, items: List[PlanItem]) -> List[PlanItem]:
+        in_range = [item for item in items if start <= (_day_number(item.post_date) or 0) <= end]
+        if not in_range and items:
+            # The model restarted numbering at Day 1; relabel by position.
+            in_range = [
+                item.model_copy(update={"post_date": f"Day {start + i}"})
+                for i, item in enumerate(items[: end - start + 1])
+            ]
+        return in_range
+
+    def _shard_prompt(self, output_format: str = "text") -> RegisteredPrompt:
+        return self.prompts.get("plan_shard_json" if output_format == "json" else "plan_shard")
+
+    def _merge_shards(self, results: List[List[PlanItem]]) -> List[PlanItem]:
+        items = [item for shard_items in results for item in shard_items]
+        items.sort(key=lambda item: _day_number(item.post_date) or 0)
+        return items
+
+    def _repair_prompt(self, output_format: str = "text") -> RegisteredPrompt:
+        return self.prompts.get("plan_repair_json" if output_format == "json" else "plan_repair")
+
+    def _repair_variables(self, variables: dict, kept: Dict[int, PlanItem], days: List[int]) -> dict:
+        return {
+            **variables,
+            "days": ", ".join(f"Day {day}" for day in days),
+            "existing_plan": _plan_outline(kept),
+        }
+
+    def _apply_repair(
+        self, kept: Dict[int, PlanItem], days: List[int], new_items: List[PlanItem]
+    ) -> List[PlanItem]:
+        """Merge regenerated items for `days` into the kept ones, in day order."""
+        wanted = set(days)
+        fresh = {day: item for day, item in _plan_by_day(new_items).items() if day in wanted}
+        if not fresh and new_items:
+            # The model numbered the posts its own way; take them in the order asked for.
+            fresh = {
+                day: item.model_copy(update={"post_date": f"Day {day}"})
+                for day, item in zip(days, new_items)
+            }
+        merged = {**kept, **fresh}
+        return [merged[day] for day in sorted(merged)]
+
+    def _repair_plan(
+        self, variables: dict, items: List[PlanItem], days: List[int], output_format: str = "text"
+    ) -> List[PlanItem]:
+        days = sorted(set(days))
+        kept = {day: item for day, item in _plan_by_day(items).items() if day not in days}
         resp = self._invoke_chain(
-            SOCIAL_STRATEGY_SYSTEM,
-            prompt,
-            {
-                "brand_name": brand_name,
-                "niche": niche,
-                "audience": audience,
-                "tone": tone,
-                "platforms": ", ".join(platforms),
-                "goal": goal,
-                "constraints": constraints or "None",
-            },
+            self._repair_prompt(output_format), self._repair_variables(variables, kept, days),
+            "plan_repair", self._plan_llm_kwargs(output_format),
         )
+        return self._apply_repair(kept, days, self._parse_plan_response(resp, output_format, len(days)))
 
-        text = resp.content.strip()
-        items: List[PlanItem] = []
-        blocks = text.split("---")
-
-        for block_text in blocks:
-            block = {}
-            for line in block_text.splitlines():
-                if ":" in line:
-                    key, value = line.split(":", 1)
-                    key = key.lower().replace(" ", "_").strip()
-                    block[key] = value.strip()
-
-            required = ["post_date", "platform", "post_type", "idea_title", "key_points", "cta", "hashtags"]
-            if all(key in block for key in required):
-                try:
-                    items.append(PlanItem(**{k: block[k] for k in required}))
-                except Exception:
-                    continue
+    async def _arepair_plan(
+        self, variables: dict, items: List[PlanItem], days: List[int], output_format: str = "text"
+    ) -> List[PlanItem]:
+        days = sorted(set(days))
+        kept = {day: item for day, item in _plan_by_day(items).items() if day not in days}
+        resp = await self._ainvoke_chain(
+            self._repair_prompt(output_format), self._repair_variables(variables, kept, days),
+            "plan_repair", self._plan_llm_kwargs(output_format),
+        )
+        return self._apply_repair(kept, days, self._parse_plan_response(resp, output_format, len(days)))
+
+    def regenerate_days(
+        self,
+        items: List[PlanItem],
+        days: List[int],
+        brand_name: str,
+        niche: str,
+        audience: str,
+        tone: str,
+        platforms: List[str],
+        goal: str,
+        constraints: str = "",
+        output_format: str = "text",
+    ) -> List[PlanItem]:
+        """Rewrite only `days` of an existing plan and return the whole plan in day order.
+
+        The other days are sent as a one-line-per-post outline so the new posts
+        fit around them; cost scales with the number of days rewritten.
+        """
+        _, variables = self._plan_request(
+            brand_name, niche, audience, tone, platforms, goal, constraints, output_format
+        )
+        if not days:
+            return [item for _, item in sorted(_plan_by_day(items).items())]
+        return self._repair_plan(variables, items, days, output_format)
+
+    async def aregenerate_days(
+        self,
+        items: List[PlanItem],
+        days: List[int],
+        brand_name: str,
+        niche: str,
+        audience: str,
+        tone: str,
+        platforms: List[str],
+        goal: str,
+        constraints: str = "",
+        output_format: str = "text",
+    ) -> List[PlanItem]:
+        _, variables = self._plan_request(
+            brand_name, niche, audience, tone, platforms, goal, constraints, output_format
+        )
+        if not days:
+            return [item for _, item in sorted(_plan_by_day(items).items())]
+        return await self._arepair_plan(variables, items, days, output_format)
+
+    def _create_sharded_plan(self, variables: dict, shards: int, output_format: str = "text") -> List[PlanItem]:
+        prompt = self._shard_prompt(output_format)
+        requests = self._shard_requests(variables, shards)
+        llm_kwargs = self._plan_llm_kwargs(output_format)
+
+        def run(request):
+            start, end, shard_variables = request
+            resp = self._invoke_chain(prompt, shard_variables, "plan_shard", llm_kwargs)
+            return self._merge_shard(start, end, self._parse_plan_response(resp, output_format, end - start + 1))
+
+        with ThreadPoolExecutor(max_workers=len(requests)) as pool:
+            results = list(pool.map(run, requests))
+
+        return self._merge_shards(results)
+
+    async def acreate_30_day_plan(
+        self,
+        brand_name: str,
+        niche: str,
+        audience: str,
+        tone: str,
+        platforms: List[str],
+        goal: str,
+        constraints: str = "",
+        shards: int = 1,
+        output_format: str = "text",
+        repair: bool = True,
+    ) -> List[PlanItem]:
 
+        prompt, variables = self._plan_request(
+            brand_name, niche, audience, tone, platforms, goal, constraints, output_format
+        )
+        llm_kwargs = self._plan_llm_kwargs(output_format)
+        if shards <= 1:
+            resp = await self._ainvoke_chain(prompt, variables, llm_kwargs=llm_kwargs)
+            items = self._parse_plan_response(resp, output_format, PLAN_DAYS)
+        else:
+            prompt = self._shard_prompt(output_format)
+
+            async def run(start: int, end: int, shard_variables: dict) -> List[PlanItem]:
+                resp = await self._ainvoke_chain(prompt, shard_variables, "plan_shard", llm_kwargs)
+                return self._merge_shard(start, end, self._parse_plan_response(resp, output_format, end - start + 1))
+
+            results = await asyncio.gather(
+                *(run(*request) for request in self._shard_requests(variables, shards))
+            )
+            items = self._merge_shards(list(results))
+        if repair and items and missing_days(items):
+            items = await self._arepair_plan(variables, items, missing_days(items), output_format)
         return items
 
+    def stream_30_day_plan(
+        self,
+        brand_name: str,
+        niche: str,
+        audience: str,
+        tone: str,
+        platforms: List[str],
+        goal: str,
+        constraints: str = "",
+        days: int = PLAN_DAYS,
+    ) -> Iterator[PlanItem]:
+        """Yield PlanItems as soon as their `---` blocks complete in the token stream.
+
+        Reading stops (and the stream is closed) once days 1..`days` each have a
+        post. As in create_30_day_plan, the first post for a day wins and later
+        ones for the same day are skipped.
+        """
+        prompt, variables = self._plan_request(
+            brand_name, niche, audience, tone, platforms, goal, constraints
+        )
+        count = 0
+        seen = set()
+        covered = set()
+        # Stopping once every day is covered closes the stream early; the text so far is still a whole plan
+        chunks = self._stream_chain(prompt, variables, complete=lambda: len(covered) >= days)
+        buffer = ""
+        received = 0
+
+        def accept(item: Optional[PlanItem]) -> bool:
+            if item is None:
+                return False
+            day = _day_number(item.post_date)
+            if day is not None:
+                if day in seen:
+                    return False
+                seen.add(day)
+                if 1 <= day <= days:
+                    covered.add(day)
+            return True
+
+        try:
+            for chunk in chunks:
+                buffer += chunk
+                received += len(chunk)
+                if "---" not in buffer:
+                    continue
+                # Everything before the last separator is a closed block.
+                *complete, buffer = buffer.split("---")
+                for block_text in complete:
+                    item = _parse_plan_block(block_text)
+                    if accept(item):
+                        yield item
+                        count += 1
+                        if len(covered) >= days:
+                            self.metrics.record_parse("text", days, count, received // 4 + 1)
+                            return
+
+            item = _parse_plan_block(buffer)
+            if accept(item):
+                yield item
+                count += 1
+            self.metrics.record_parse("text", days, count, received // 4 + 1)
+        finally:
+            chunks.close()
+
+    def _caption_request(
+        self,
+        platform: str,
+        tone: str,
+        audience: str,
+        title: str,
+        key_points: str,
+        cta: str,
+        hashtags: str,
+    ):
+        prompt = self.prompts.get("caption")
+        variables = {
+            "platform": platform,
+            "tone": tone,
+            "audience": audience,
+            "title": title,
+            "key_points": key_points,
+            "cta": cta,
+            "hashtags": hashtags,
+        }
+        return prompt, variables
+
     def write_caption(
         self,
         platform: str,
@@ -103,63 +947,204 @@ class SocialAgent:
         hashtags: str,
     ) -> str:
 
-        prompt = PromptTemplate(
-            template=CAPTION_TEMPLATE,
-            input_variables=["platform", "tone", "audience", "title", "key_points", "cta", "hashtags"],
+        prompt, variables = self._caption_request(
+            platform, tone, audience, title, key_points, cta, hashtags
         )
+        cached = self._semantic_lookup("caption", variables)
+        if cached is not None:
+            return cached
 
-        resp = self._invoke_chain(
-            CAPTION_SYSTEM,
-            prompt,
-            {
-                "platform": platform,
-                "tone": tone,
-                "audience": audience,
-                "title": title,
-                "key_points": key_points,
-                "cta": cta,
-                "hashtags": hashtags,
-            }
+        resp = self._invoke_chain(prompt, variables, "caption")
+        caption = resp.content.strip()
+        self._semantic_store("caption", variables, caption)
+        return caption
+
+    async def awrite_caption(
+        self,
+        platform: str,
+        tone: str,
+        audience: str,
+        title: str,
+        key_points: str,
+        cta: str,
+        hashtags: str,
+    ) -> str:
+
+        prompt, variables = self._caption_request(
+            platform, tone, audience, title, key_points, cta, hashtags
+        )
+        cached = self._semantic_lookup("caption", variables)
+        if cached is not None:
+            return cached
+
+        resp = await self._ainvoke_chain(prompt, variables, "caption")
+        caption = resp.content.strip()
+        self._semantic_store("caption", variables, caption)
+        return caption
+
+    async def awrite_captions_for_plan(
+        self,
+        plan_items: List[PlanItem],
+        tone: str,
+        audience: str,
+        max_concurrency: int = 8,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> List[CaptionResult]:
+        """Write a caption for every plan item concurrently.
+
+        Results come back in plan order. A failed item is returned with its
+        `error` set instead of aborting the batch, so finished captions are kept.
+        """
+        limit = asyncio.Semaphore(max_concurrency)
+        total = len(plan_items)
+        done = 0
+
+        async def run(item: PlanItem) -> CaptionResult:
+            nonlocal done
+            async with limit:
+                try:
+                    caption = await self.awrite_caption(
+                        platform=item.platform,
+                        tone=tone,
+                        audience=audience,
+                        title=item.idea_title,
+                        key_points=item.key_points,
+                        cta=item.cta,
+                        hashtags=item.hashtags,
+                    )
+                    result = CaptionResult(post_date=item.post_date, platform=item.platform, caption=caption)
+                except Exception as e:
+                    result = CaptionResult(post_date=item.post_date, platform=item.platform, error=str(e))
+            done += 1
+            if on_progress:
+                on_progress(done, total)
+            return result
+
+        # A whole month of captions is bulk work; it queues behind interactive requests
+        with priority(PRIORITY_BULK):
+            return list(await asyncio.gather(*(run(item) for item in plan_items)))
+
+    def write_captions_for_plan(
+        self,
+        plan_items: List[PlanItem],
+        tone: str,
+        audience: str,
+        max_concurrency: int = 8,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> List[CaptionResult]:
+        return asyncio.run(
+            self.awrite_captions_for_plan(plan_items, tone, audience, max_concurrency, on_progress)
         )
-        return resp.content.strip()
+
+    def _repurpose_request(
+        self,
+        source_platform: str,
+        original_caption: str,
+        target_platforms: List[str],
+    ):
+        prompt = self.prompts.get("repurpose")
+        variables = {
+            "source_platform": source_platform,
+            "original_caption": original_caption,
+            "target_platforms": ", ".join(target_platforms),
+        }
+        return prompt, variables
+
+    def _parse_repurpose(self, text: str) -> Dict[str, str]:
+        return dict(_iter_repurpose_sections([text.strip()]))
+
+    def _repurpose_one(self, source_platform: str, original_caption: str, platform: str) -> Tuple[str, str]:
+        prompt, variables = self._repurpose_request(source_platform, original_caption, [platform])
+        resp = self._invoke_chain(prompt, variables, "repurpose")
+        return platform, _platform_output(platform, resp.content)
 
     def repurpose(
         self,
         source_platform: str,
         original_caption: str,
         target_platforms: List[str],
+        fan_out: bool = False,
     ) -> Dict[str, str]:
 
-        prompt = PromptTemplate(
-            template=REPURPOSE_TEMPLATE,
-            input_variables=["source_platform", "original_caption", "target_platforms"],
-        )
+        if fan_out:
+            outputs = dict(self.stream_repurpose(source_platform, original_caption, target_platforms, fan_out=True))
+            return {p: outputs[p] for p in target_platforms}
 
-        resp = self._invoke_chain(
-            REPURPOSE_SYSTEM,
-            prompt,
-            {
-                "source_platform": source_platform,
-                "original_caption": original_caption,
-                "target_platforms": ", ".join(target_platforms),
-            }
-        )
+        prompt, variables = self._repurpose_request(source_platform, original_caption, target_platforms)
+        cached = self._semantic_lookup("repurpose", variables)
+        if cached is not None:
+            return self._parse_repurpose(cached)
 
-        text = resp.content.strip()
-        outputs: Dict[str, str] = {}
-        current = None
-        buffer = []
-
-        for line in text.splitlines():
-            if line.startswith("[") and "]" in line:
-                if current:
-                    outputs[current] = "\n".join(buffer).strip()
-                current = line.strip("[]:").strip()
-                buffer = []
-            else:
-                buffer.append(line)
+        resp = self._invoke_chain(prompt, variables, "repurpose")
+        self._semantic_store("repurpose", variables, resp.content)
+        return self._parse_repurpose(resp.content)
+
+    def stream_repurpose(
+        self,
+        source_platform: str,
+        original_caption: str,
+        target_platforms: List[str],
+        fan_out: bool = False,
+    ) -> Iterator[Tuple[str, str]]:
+        """Yield (platform, caption) pairs as soon as each platform's text is complete.
+
+        With `fan_out`, one request per target platform runs concurrently and
+        results arrive in completion order, so total latency is that of the
+        slowest single platform.
+        """
+        if fan_out:
+            # Per-platform calls skip the semantic cache; don't leave an earlier call's match behind
+            self._local.semantic_match = None
+            with ThreadPoolExecutor(max_workers=max(1, len(target_platforms))) as pool:
+                futures = [
+                    pool.submit(self._repurpose_one, source_platform, original_caption, platform)
+                    for platform in target_platforms
+                ]
+                for future in as_completed(futures):
+                    yield future.result()
+            return
+
+        prompt, variables = self._repurpose_request(source_platform, original_caption, target_platforms)
+        cached = self._semantic_lookup("repurpose", variables)
+        if cached is not None:
+            yield from self._parse_repurpose(cached).items()
+            return
+
+        parts: List[str] = []
+
+        def collect(chunks: Iterator[str]) -> Iterator[str]:
+            for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+
+        yield from _iter_repurpose_sections(collect(self._stream_chain(prompt, variables, "repurpose")))
+        self._semantic_store("repurpose", variables, "".join(parts))
+
+    async def _arepurpose_one(self, source_platform: str, original_caption: str, platform: str) -> Tuple[str, str]:
+        prompt, variables = self._repurpose_request(source_platform, original_caption, [platform])
+        resp = await self._ainvoke_chain(prompt, variables, "repurpose")
+        return platform, _platform_output(platform, resp.content)
+
+    async def arepurpose(
+        self,
+        source_platform: str,
+        original_caption: str,
+        target_platforms: List[str],
+        fan_out: bool = False,
+    ) -> Dict[str, str]:
+
+        if fan_out:
+            self._local.semantic_match = None
+            results = await asyncio.gather(
+                *(self._arepurpose_one(source_platform, original_caption, p) for p in target_platforms)
+            )
+            return dict(results)
 
-        if current and buffer:
-            outputs[current] = "\n".join(buffer).strip()
+        prompt, variables = self._repurpose_request(source_platform, original_caption, target_platforms)
+        cached = self._semantic_lookup("repurpose", variables)
+        if cached is not None:
+            return self._parse_repurpose(cached)
 
-        return outputs
+        resp = await self._ainvoke_chain(prompt, variables, "repurpose")
+        self._semantic_store("repurpose", variables, resp.content)
+        return self._parse_repurpose(resp.content)
@@ -1,9 +1,16 @@
 # app.py
 import os
+from typing import Optional
+
 import streamlit as st
 from dotenv import load_dotenv
-from agent import SocialAgent, PlanItem
-from utils import plan_to_dataframe, save_session
+from agent import SocialAgent, PlanItem, missing_days
+from scheduler import LLMThrottledError, get_scheduler
+from metrics import get_metrics
+from prompt_registry import get_prompt_registry
+from state import get_store
+from utils import plan_to_dataframe
+from session_store import get_default_session_store
 from realtime_utils import analyze_caption_realtime, get_trending_hashtags
 from advanced_features import (
     get_best_posting_times,
@@ -24,6 +31,96 @@ st.set_page_config(page_title="Social Media Agent", page_icon="📣", layout="wi
 st.sidebar.header("⚙️ Configuration")
 model = st.sidebar.selectbox("Model", options=["gpt-4o-mini"], index=0)
 temperature = st.sidebar.slider("Creativity (temperature)", 0.0, 1.0, 0.7, 0.1)
+bypass_cache = st.sidebar.checkbox(
+    "Bypass response cache", value=False,
+    help="Identical requests at temperature 0 are served from the local cache unless bypassed."
+)
+use_semantic_cache = st.sidebar.checkbox(
+    "Reuse near-duplicate captions", value=False,
+    help="Serve a stored caption/repurpose result when a new request is almost identical."
+)
+if use_semantic_cache:
+    from semantic_cache import get_default_semantic_cache
+
+    get_default_semantic_cache().threshold = st.sidebar.slider("Similarity threshold", 0.80, 0.99, 0.92, 0.01)
+plan_shards = st.sidebar.slider(
+    "Parallel plan shards", 1, 6, 1,
+    help="Split the month into day ranges generated concurrently. 1 streams a single plan."
+)
+structured_plan = st.sidebar.checkbox(
+    "Structured (JSON) plan output", value=False,
+    help="Ask for a compact JSON plan: fewer output tokens and no formatting drift, but no streaming."
+)
+
+
+@st.cache_resource(show_spinner=False)
+def get_hedging_policy(percentile: float):
+    """Shared per percentile, so the latency history survives agent reconfiguration."""
+    from hedging import HedgingPolicy
+
+    return HedgingPolicy(percentile=percentile)
+
+
+hedge_captions = st.sidebar.checkbox(
+    "Hedge slow caption calls", value=False,
+    help="Send a duplicate caption/repurpose request when the first token is slower than usual; costs extra tokens."
+)
+hedge_percentile = None
+if hedge_captions:
+    hedge_percentile = st.sidebar.slider("Hedge after latency percentile", 0.80, 0.99, 0.95, 0.01)
+
+with st.sidebar.expander("🚦 Rate limits"):
+    queue_stats = get_scheduler().stats()
+    st.write(f"Queue depth: {queue_stats['queue_depth']}")
+    st.write(f"Throttled calls: {queue_stats['throttled']} / {queue_stats['admitted']}")
+    st.write(f"Avg wait: {queue_stats['avg_wait_s']}s (max {queue_stats['max_wait_s']}s)")
+    st.write(f"Retries: {queue_stats['retries']}, gave up: {queue_stats['failures']}")
+
+
+@st.cache_resource(show_spinner=False)
+def start_metrics_server(port: int):
+    """Expose /metrics for Prometheus once per process."""
+    return get_metrics().serve_prometheus(port)
+
+
+if os.getenv("LLM_METRICS_PORT"):
+    start_metrics_server(int(os.getenv("LLM_METRICS_PORT")))
+
+with st.sidebar.expander("📈 LLM metrics"):
+    metric_rows = get_metrics().summary()
+    if metric_rows:
+        st.dataframe(metric_rows, hide_index=True, use_container_width=True)
+        st.write(f"Estimated spend: ${sum(row['cost_usd'] for row in metric_rows):.4f}")
+        st.caption("Prompt templates (static prefix = reusable by provider prompt caching)")
+        st.dataframe(
+            [row for row in get_prompt_registry().report() if row["calls"]], hide_index=True, use_container_width=True
+        )
+        if hedge_captions:
+            st.caption("Hedged calls")
+            st.dataframe(get_hedging_policy(hedge_percentile).stats(), hide_index=True, use_container_width=True)
+        parse_rows = get_metrics().parse_summary()
+        if parse_rows:
+            st.caption("Plan parsing by output format")
+            st.dataframe(parse_rows, hide_index=True, use_container_width=True)
+        st.download_button(
+            "Download Prometheus metrics",
+            get_metrics().to_prometheus(),
+            file_name="llm_metrics.prom",
+            mime="text/plain",
+        )
+    else:
+        st.caption("No LLM calls yet.")
+
+with st.sidebar.expander("🗄️ Saved plans"):
+    history_brand = st.text_input("Brand", key="history_brand")
+    history_page = st.number_input("Page", min_value=1, value=1, step=1, key="history_page")
+    saved_plans = get_default_session_store().list_plans(
+        brand=history_brand or None, limit=10, offset=(history_page - 1) * 10
+    )
+    for saved in saved_plans:
+        st.write(f"#{saved['id']} {saved['brand']} · {saved['item_count']} posts · {saved['status']}")
+    if not saved_plans:
+        st.caption("No saved plans.")
 
 st.sidebar.divider()
 st.sidebar.header("🚀 Advanced Options")
@@ -41,7 +138,9 @@ show_best_times = st.sidebar.checkbox("Show Best Posting Times", value=False)
 # A/B Testing
 enable_ab_testing = st.sidebar.checkbox("Generate A/B Test Variants", value=False)
 if enable_ab_testing:
-    num_variants = st.sidebar.slider("Number of variants", 2, 5, 2)
+    num_variants = st.sidebar.slider("Number of variants", 2, 20, 3)
+    ab_seed = st.sidebar.number_input("Variant seed", min_value=0, value=0, step=1,
+                                      help="Breaks ties between equally scored variants; same seed, same variants.")
 
 # Competitor analysis
 enable_competitor = st.sidebar.checkbox("Competitor Insights", value=False)
@@ -65,6 +164,34 @@ if enable_translation:
 # Save as template
 save_template = st.sidebar.checkbox("Save as Template", value=False)
 
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def get_agent(model: str, temperature: float, use_cache, use_semantic_cache: bool,
+              hedge_percentile: Optional[float] = None) -> SocialAgent:
+    """One pooled agent (and HTTP client) per configuration, shared by every session."""
+    from semantic_cache import get_default_semantic_cache
+
+    return SocialAgent(
+        model=model,
+        temperature=temperature,
+        use_cache=use_cache,
+        semantic_cache=get_default_semantic_cache() if use_semantic_cache else None,
+        hedging=get_hedging_policy(hedge_percentile) if hedge_percentile else None,
+    )
+
+
+def build_agent() -> SocialAgent:
+    return get_agent(model, temperature, False if bypass_cache else None, use_semantic_cache, hedge_percentile)
+
+
+def show_error(e: Exception):
+    if isinstance(e, LLMThrottledError):
+        wait = f" Try again in about {e.retry_after:.0f}s." if e.retry_after else " Try again in a minute."
+        st.warning(f"⏳ The model API is rate limiting us (gave up after {e.attempts} attempts).{wait}")
+    else:
+        st.error(f"Error: {e}")
+
+
 st.title("📣 Social Media Agent")
 st.caption("Generate a 30-day plan, write captions, and repurpose across platforms.")
 
@@ -82,44 +209,205 @@ with st.form("brand_form"):
     constraints = st.text_area("Constraints (optional)", "Keep captions under 180 words; respect Indian context.")
     submitted = st.form_submit_button("Generate 30-Day Plan")
 
-agent = None
-plan_items = []
+# Generated artifacts survive reruns; each kind is capped per session
+plans = get_store(st.session_state, "plans")
+bulk_captions = get_store(st.session_state, "bulk_captions")
+captions = get_store(st.session_state, "captions")
+repurposed = get_store(st.session_state, "repurposed")
+exports = get_store(st.session_state, "exports")
 
 if submitted:
     try:
-        agent = SocialAgent(model=model, temperature=temperature)
-        with st.spinner("Creating content plan..."):
-            plan_items = agent.create_30_day_plan(
-                brand_name=brand_name,
-                niche=niche,
-                audience=audience,
-                tone=tone,
-                platforms=platforms,
-                goal=goal,
-                constraints=constraints,
-            )
+        agent = build_agent()
+        session_store = get_default_session_store()
+        plan_id = session_store.start_plan(brand_name, niche=niche)
+        plan_items = []
+        try:
+            progress_area = st.empty()
+            with progress_area.container():
+                status = st.empty()
+                table = st.empty()
+                with st.spinner("Creating content plan..."):
+                    if plan_shards > 1 or structured_plan:
+                        # Day ranges are generated concurrently and merged in order
+                        plan_items = agent.create_30_day_plan(
+                            brand_name=brand_name,
+                            niche=niche,
+                            audience=audience,
+                            tone=tone,
+                            platforms=platforms,
+                            goal=goal,
+                            constraints=constraints,
+                            shards=plan_shards,
+                            output_format="json" if structured_plan else "text",
+                        )
+                        session_store.add_items(plan_id, plan_items)
+                    else:
+                        # Rows are added as each post is parsed from the token stream
+                        for item in agent.stream_30_day_plan(
+                            brand_name=brand_name,
+                            niche=niche,
+                            audience=audience,
+                            tone=tone,
+                            platforms=platforms,
+                            goal=goal,
+                            constraints=constraints,
+                        ):
+                            plan_items.append(item)
+                            session_store.add_item(plan_id, item)
+                            status.caption(f"Received {len(plan_items)} of 30 posts...")
+                            table.dataframe(plan_to_dataframe(plan_items), use_container_width=True)
+                        gaps = missing_days(plan_items)
+                        if plan_items and gaps:
+                            # Ask again for just the missing days rather than the whole month
+                            status.caption(f"Filling in {len(gaps)} missing day(s)...")
+                            plan_items = agent.regenerate_days(
+                                plan_items,
+                                gaps,
+                                brand_name=brand_name,
+                                niche=niche,
+                                audience=audience,
+                                tone=tone,
+                                platforms=platforms,
+                                goal=goal,
+                                constraints=constraints,
+                            )
+                            session_store.replace_days(plan_id, plan_items)
+            progress_area.empty()
+        except BaseException:
+            # Includes Streamlit stopping the script mid-stream; a failed plan must not look in progress
+            session_store.abort_plan(plan_id)
+            raise
+        session_store.finish_plan(plan_id, "complete" if len(plan_items) >= 30 else "partial")
         if not plan_items:
             st.warning("Plan generated, but parsing was partial. Showing raw text below (use caption writer with manual inputs).")
         else:
-            st.success(f"Generated {len(plan_items)} plan items.")
-            df = plan_to_dataframe(plan_items)
-            st.dataframe(df, use_container_width=True)
             filename = f"{brand_name.replace(' ', '_')}_30_day_plan"
-            path = save_session(filename, plan_items)
-            st.info(f"Session saved: {path}")
-            st.download_button("Download CSV", df.to_csv(index=False).encode("utf-8"), file_name=f"{filename}.csv", mime="text/csv")
-            
-            # Show content calendar if enabled
-            if show_calendar:
-                st.markdown("### 📅 Content Calendar")
-                calendar = generate_content_calendar(plan_items)
-                import pandas as pd
-                cal_df = pd.DataFrame(calendar)
-                st.dataframe(cal_df, use_container_width=True)
+            plans.put(brand_name, {
+                "items": plan_items,
+                "brand_name": brand_name,
+                "niche": niche,
+                "tone": tone,
+                "audience": audience,
+                "platforms": platforms,
+                "goal": goal,
+                "constraints": constraints,
+                "output_format": "json" if structured_plan else "text",
+                "filename": filename,
+                "plan_id": plan_id,
+            })
+            st.session_state["active_plan"] = brand_name
     except Exception as e:
-        st.error(f"Error: {e}")
+        show_error(e)
         st.stop()
 
+active_plan = plans.get(st.session_state.get("active_plan", ""))
+if active_plan:
+    plan_items = active_plan["items"]
+    st.success(f"Generated {len(plan_items)} plan items.")
+    df = plan_to_dataframe(plan_items)
+    st.dataframe(df, use_container_width=True)
+    st.info(f"Session saved as plan #{active_plan['plan_id']} in {get_default_session_store().path}")
+    st.download_button("Download CSV", df.to_csv(index=False).encode("utf-8"), file_name=f"{active_plan['filename']}.csv", mime="text/csv")
+
+    with st.expander("🔁 Regenerate selected days"):
+        gaps = missing_days(plan_items)
+        if gaps:
+            st.caption(f"Missing days: {', '.join(map(str, gaps))}")
+        regen_days = st.multiselect("Days", list(range(1, 31)), default=gaps, key="regen_days")
+        if st.button("Regenerate these days", disabled=not regen_days):
+            try:
+                agent = build_agent()
+                with st.spinner(f"Rewriting {len(regen_days)} day(s)..."):
+                    plan_items = agent.regenerate_days(
+                        plan_items,
+                        regen_days,
+                        brand_name=active_plan["brand_name"],
+                        niche=active_plan["niche"],
+                        audience=active_plan["audience"],
+                        tone=active_plan["tone"],
+                        platforms=active_plan.get("platforms") or ["Instagram"],
+                        goal=active_plan.get("goal", ""),
+                        constraints=active_plan.get("constraints", ""),
+                        output_format=active_plan.get("output_format", "text"),
+                    )
+                get_default_session_store().replace_days(active_plan["plan_id"], plan_items)
+                plans.put(active_plan["brand_name"], {**active_plan, "items": plan_items})
+                # Captions written for the old posts no longer match
+                bulk_captions.pop(active_plan["brand_name"])
+                st.rerun()
+            except Exception as e:
+                show_error(e)
+    
+    # Show content calendar if enabled
+    if show_calendar:
+        st.markdown("### 📅 Content Calendar")
+        calendar = generate_content_calendar(plan_items)
+        import pandas as pd
+        cal_df = pd.DataFrame(calendar)
+        st.dataframe(cal_df, use_container_width=True)
+
+    # Bulk captions for the generated plan
+    st.subheader("🗂️ Captions for the whole plan")
+    bulk_concurrency = st.slider("Parallel caption requests", 1, 30, 8)
+    bulk_btn = st.button(f"Write captions for all {len(plan_items)} posts")
+
+    if bulk_btn:
+        try:
+            agent = build_agent()
+            progress = st.progress(0.0, text="Writing captions...")
+            results = agent.write_captions_for_plan(
+                plan_items,
+                tone=active_plan["tone"],
+                audience=active_plan["audience"],
+                max_concurrency=bulk_concurrency,
+                on_progress=lambda done, total: progress.progress(done / total, text=f"Captions: {done}/{total}"),
+            )
+            progress.empty()
+            bulk_captions.put(active_plan["brand_name"], results)
+        except Exception as e:
+            show_error(e)
+
+    bulk_results = bulk_captions.get(active_plan["brand_name"])
+    if bulk_results:
+        failed = [r for r in bulk_results if r.error]
+        if failed:
+            st.warning(f"{len(failed)} caption(s) failed: {', '.join(r.post_date for r in failed)}. The rest are kept below.")
+        else:
+            st.success(f"Wrote {len(bulk_results)} captions.")
+        import pandas as pd
+        captions_df = pd.DataFrame([r.model_dump() for r in bulk_results])
+        st.dataframe(captions_df, use_container_width=True)
+        st.download_button(
+            "Download captions CSV",
+            captions_df.to_csv(index=False).encode("utf-8"),
+            file_name=f"{active_plan['brand_name'].replace(' ', '_')}_captions.csv",
+            mime="text/csv",
+        )
+
+    # Built on request and kept until the plan or its captions change, not on every rerun
+    from export import export_key
+    parquet_key = export_key(plan_items, active_plan["brand_name"], captions=bulk_results, plan_id=active_plan["plan_id"])
+    parquet = exports.get(parquet_key)
+    if parquet is None and st.button("Prepare Parquet export"):
+        try:
+            from export import plan_export_frame, to_parquet_bytes
+            with st.spinner("Preparing export..."):
+                export_df = plan_export_frame(
+                    plan_items, active_plan["brand_name"], captions=bulk_results, plan_id=active_plan["plan_id"]
+                )
+                parquet = to_parquet_bytes(export_df)
+            exports.put(parquet_key, parquet)
+        except ImportError:
+            st.caption("Install pyarrow to enable Parquet export.")
+    if parquet is not None:
+        st.download_button(
+            "Download plan + captions (Parquet)",
+            parquet,
+            file_name=f"{active_plan['filename']}.parquet",
+            mime="application/vnd.apache.parquet",
+        )
+
 # Caption writer
 st.subheader("✍️ Caption writer")
 colA, colB = st.columns(2)
@@ -136,7 +424,7 @@ caption_btn = st.button("Generate caption")
 
 if caption_btn:
     try:
-        agent = agent or SocialAgent(model=model, temperature=temperature)
+        agent = build_agent()
         with st.spinner("Writing caption..."):
             caption = agent.write_caption(
                 platform=platform,
@@ -147,6 +435,7 @@ if caption_btn:
                 cta=cta,
                 hashtags=hashtags,
             )
+        match = agent.last_semantic_match
         
         # Apply content style if selected
         if content_style != "Default":
@@ -157,124 +446,146 @@ if caption_btn:
             smart_tags = generate_smart_hashtags(title, niche or "general", platform)
             caption += f"\n\n{' '.join(smart_tags)}"
         
-        st.success("Caption generated")
-        
-        # Real-time AI analysis
-        analysis = analyze_caption_realtime(caption, platform)
-        
-        # Real-time preview with platform-specific formatting
-        st.markdown("### 📱 Live Preview & AI Analysis")
-        col_preview, col_stats, col_ai = st.columns([2, 1, 1])
-        
-        with col_preview:
-            if platform == "Instagram":
-                st.markdown(f"**Instagram Post**")
-                st.text_area("Preview", caption, height=200, disabled=True, key="ig_preview")
-            elif platform == "LinkedIn":
-                st.markdown(f"**LinkedIn Post**")
-                st.text_area("Preview", caption, height=200, disabled=True, key="li_preview")
-            else:
-                st.markdown(f"**Twitter/X Post**")
-                st.text_area("Preview", caption, height=200, disabled=True, key="tw_preview")
-        
-        with col_stats:
-            st.markdown("**📊 Stats**")
-            limits = {"Instagram": 2200, "LinkedIn": 3000, "Twitter": 280}
-            limit = limits[platform]
-            
-            st.metric("Characters", f"{analysis['char_count']}/{limit}")
-            st.metric("Words", analysis['word_count'])
-            st.metric("Hashtags", analysis['hashtag_count'])
-            st.metric("Emojis", analysis['emoji_count'])
-            
-            if analysis['char_count'] > limit:
-                st.error(f"⚠️ Exceeds {platform} limit!")
-            elif analysis['char_count'] > limit * 0.9:
-                st.warning(f"⚠️ Close to limit")
-            else:
-                st.success("✅ Within limit")
-        
-        with col_ai:
-            st.markdown("**🤖 AI Score**")
-            score = analysis['engagement_score']
-            st.metric("Engagement", f"{score}/100")
-            
-            if score >= 80:
-                st.success("🔥 Excellent!")
-            elif score >= 60:
-                st.info("👍 Good")
-            else:
-                st.warning("💡 Can improve")
-            
-            if analysis['has_cta']:
-                st.success("✅ Has CTA")
-            else:
-                st.warning("❌ No CTA")
-        
-        # AI Suggestions
-        if analysis['warnings']:
-            st.error("⚠️ **Warnings:**")
-            for warning in analysis['warnings']:
-                st.write(f"• {warning}")
-        
-        if analysis['suggestions']:
-            st.info("💡 **AI Suggestions:**")
-            for suggestion in analysis['suggestions']:
-                st.write(f"• {suggestion}")
-        
-        # Trending hashtags
-        trending = get_trending_hashtags(niche)
-        st.success(f"🔥 **Trending in {niche}:** {' '.join(trending)}")
-        
-        st.code(caption)
-        
-        # Advanced features
-        if show_best_times:
-            st.markdown("### ⏰ Best Posting Times")
-            times = get_best_posting_times(platform)
-            col_time1, col_time2 = st.columns(2)
-            with col_time1:
-                st.info(f"**Best Days:** {', '.join(times['best_days'])}")
-                st.write(f"**Weekdays:** {', '.join(times['weekdays'])}")
-            with col_time2:
-                st.write(f"**Weekends:** {', '.join(times['weekends'])}")
+        caption_key = f"{platform}|{title}|{content_style}"
+        captions.put(caption_key, {
+            "caption": caption,
+            "platform": platform,
+            "niche": niche,
+            "style": content_style,
+            "analysis": analyze_caption_realtime(caption, platform),
+            "semantic_match": (match.similarity, match.source_id) if match else None,
+        })
+        st.session_state["active_caption"] = caption_key
+    except Exception as e:
+        show_error(e)
+
+caption_artifact = captions.get(st.session_state.get("active_caption", ""))
+if caption_artifact:
+    caption = caption_artifact["caption"]
+    caption_platform = caption_artifact["platform"]
+    caption_niche = caption_artifact["niche"]
+    analysis = caption_artifact["analysis"]
+    if caption_artifact["semantic_match"]:
+        similarity, source_id = caption_artifact["semantic_match"]
+        st.info(f"♻️ Reused a near-duplicate caption (similarity {similarity:.2f}, source {source_id}).")
+
+    st.success("Caption generated")
+    
+    # Real-time preview with platform-specific formatting
+    st.markdown("### 📱 Live Preview & AI Analysis")
+    col_preview, col_stats, col_ai = st.columns([2, 1, 1])
+    
+    with col_preview:
+        if caption_platform == "Instagram":
+            st.markdown(f"**Instagram Post**")
+            st.text_area("Preview", caption, height=200, disabled=True, key="ig_preview")
+        elif caption_platform == "LinkedIn":
+            st.markdown(f"**LinkedIn Post**")
+            st.text_area("Preview", caption, height=200, disabled=True, key="li_preview")
+        else:
+            st.markdown(f"**Twitter/X Post**")
+            st.text_area("Preview", caption, height=200, disabled=True, key="tw_preview")
+    
+    with col_stats:
+        st.markdown("**📊 Stats**")
+        limits = {"Instagram": 2200, "LinkedIn": 3000, "Twitter": 280}
+        limit = limits[caption_platform]
         
-        if show_sentiment:
-            st.markdown("### 😊 Sentiment Analysis")
-            sentiment = analyze_sentiment(caption)
-            col_sent1, col_sent2, col_sent3 = st.columns(3)
-            with col_sent1:
-                st.metric("Sentiment", sentiment['sentiment'])
-            with col_sent2:
-                st.metric("Score", f"{sentiment['score']}%")
-            with col_sent3:
-                st.metric("Confidence", f"{sentiment['confidence']}%")
+        st.metric("Characters", f"{analysis['char_count']}/{limit}")
+        st.metric("Words", analysis['word_count'])
+        st.metric("Hashtags", analysis['hashtag_count'])
+        st.metric("Emojis", analysis['emoji_count'])
         
-        if enable_ab_testing:
-            st.markdown("### 🧪 A/B Test Variants")
-            variants = generate_ab_variants(caption, num_variants)
-            for variant in variants:
-                with st.expander(f"📊 {variant['version']}"):
-                    st.code(variant['caption'])
-                    st.caption(f"Hook: {variant['hook']} | CTA: {variant['cta']}")
+        if analysis['char_count'] > limit:
+            st.error(f"⚠️ Exceeds {caption_platform} limit!")
+        elif analysis['char_count'] > limit * 0.9:
+            st.warning(f"⚠️ Close to limit")
+        else:
+            st.success("✅ Within limit")
+    
+    with col_ai:
+        st.markdown("**🤖 AI Score**")
+        score = analysis['engagement_score']
+        st.metric("Engagement", f"{score}/100")
         
-        if enable_translation:
-            st.markdown(f"### 🌍 Translation ({target_language})")
-            translated = translate_caption(caption, target_language)
-            st.code(translated)
+        if score >= 80:
+            st.success("🔥 Excellent!")
+        elif score >= 60:
+            st.info("👍 Good")
+        else:
+            st.warning("💡 Can improve")
         
-        if enable_competitor and competitor_handle:
-            st.markdown("### 🔍 Competitor Insights")
-            insights = get_competitor_insights(niche or "General")
-            col_comp1, col_comp2 = st.columns(2)
-            with col_comp1:
-                st.write(f"**Top Content:** {', '.join(insights['top_content_types'])}")
-                st.write(f"**Avg Engagement:** {insights['avg_engagement_rate']}")
-            with col_comp2:
-                st.write(f"**Posting Frequency:** {insights['posting_frequency']}")
-                st.write(f"**Trending:** {', '.join(insights['trending_topics'])}")
-    except Exception as e:
-        st.error(f"Error: {e}")
+        if analysis['has_cta']:
+            st.success("✅ Has CTA")
+        else:
+            st.warning("❌ No CTA")
+    
+    # AI Suggestions
+    if analysis['warnings']:
+        st.error("⚠️ **Warnings:**")
+        for warning in analysis['warnings']:
+            st.write(f"• {warning}")
+    
+    if analysis['suggestions']:
+        st.info("💡 **AI Suggestions:**")
+        for suggestion in analysis['suggestions']:
+            st.write(f"• {suggestion}")
+    
+    # Trending hashtags
+    trending = get_trending_hashtags(caption_niche)
+    st.success(f"🔥 **Trending in {caption_niche}:** {' '.join(trending)}")
+    
+    st.code(caption)
+    
+    # Advanced features
+    if show_best_times:
+        st.markdown("### ⏰ Best Posting Times")
+        times = get_best_posting_times(caption_platform)
+        col_time1, col_time2 = st.columns(2)
+        with col_time1:
+            st.info(f"**Best Days:** {', '.join(times['best_days'])}")
+            st.write(f"**Weekdays:** {', '.join(times['weekdays'])}")
+        with col_time2:
+            st.write(f"**Weekends:** {', '.join(times['weekends'])}")
+    
+    if show_sentiment:
+        st.markdown("### 😊 Sentiment Analysis")
+        sentiment = analyze_sentiment(caption)
+        col_sent1, col_sent2, col_sent3 = st.columns(3)
+        with col_sent1:
+            st.metric("Sentiment", sentiment['sentiment'])
+        with col_sent2:
+            st.metric("Score", f"{sentiment['score']}%")
+        with col_sent3:
+            st.metric("Confidence", f"{sentiment['confidence']}%")
+    
+    if enable_ab_testing:
+        st.markdown("### 🧪 A/B Test Variants")
+        # A caption that already has a style preset only varies its hook and CTA
+        variants = generate_ab_variants(
+            caption, num_variants, platform=caption_platform, seed=int(ab_seed),
+            styles=None if caption_artifact.get("style", "Default") == "Default" else ["Default"],
+        )
+        for variant in variants:
+            with st.expander(f"📊 {variant['version']} · score {variant['engagement_score']}"):
+                st.code(variant['caption'])
+                st.caption(f"Hook: {variant['hook']} | Style: {variant['style']} | CTA: {variant['cta']}")
+    
+    if enable_translation:
+        st.markdown(f"### 🌍 Translation ({target_language})")
+        translated = translate_caption(caption, target_language)
+        st.code(translated)
+    
+    if enable_competitor and competitor_handle:
+        st.markdown("### 🔍 Competitor Insights")
+        insights = get_competitor_insights(caption_niche or "General")
+        col_comp1, col_comp2 = st.columns(2)
+        with col_comp1:
+            st.write(f"**Top Content:** {', '.join(insights['top_content_types'])}")
+            st.write(f"**Avg Engagement:** {insights['avg_engagement_rate']}")
+        with col_comp2:
+            st.write(f"**Posting Frequency:** {insights['posting_frequency']}")
+            st.write(f"**Trending:** {', '.join(insights['trending_topics'])}")
 
 # Repurpose tool
 st.subheader("🔁 Repurpose across platforms")
@@ -287,40 +598,69 @@ if original_caption:
     st.caption(f"📝 Input: {input_chars} characters")
 
 target_platforms = st.multiselect("Target platforms", ["Instagram", "LinkedIn", "Twitter"], default=["LinkedIn","Twitter"])
+repurpose_fan_out = st.checkbox(
+    "One request per platform", value=False,
+    help="Run a separate request for each target platform in parallel instead of one combined request."
+)
 repurpose_btn = st.button("Repurpose")
 
+def render_repurposed_card(plat: str, text: str):
+    st.markdown(f"**{plat} version:**")
+    
+    # Real-time stats for each repurposed version
+    col_text, col_stat = st.columns([3, 1])
+    with col_text:
+        st.code(text)
+    with col_stat:
+        char_count = len(text)
+        limits = {"Instagram": 2200, "LinkedIn": 3000, "Twitter": 280}
+        limit = limits.get(plat, 2200)
+        
+        st.metric("Chars", f"{char_count}/{limit}")
+        if char_count > limit:
+            st.error("⚠️ Over limit")
+        else:
+            st.success("✅ Good")
+
 if repurpose_btn:
     if not original_caption.strip():
         st.warning("Please paste an original caption.")
     else:
         try:
-            agent = agent or SocialAgent(model=model, temperature=temperature)
+            agent = build_agent()
+            # One card per target platform, filled in as soon as its section arrives
+            cards = {}
+            for plat in target_platforms:
+                cards[plat] = st.empty()
+                cards[plat].caption(f"⏳ Waiting for {plat}...")
+            outputs = {}
             with st.spinner("Repurposing..."):
-                outputs = agent.repurpose(source_platform, original_caption, target_platforms)
+                for plat, text in agent.stream_repurpose(
+                    source_platform, original_caption, target_platforms, fan_out=repurpose_fan_out
+                ):
+                    outputs[plat] = text
+                    card = cards.get(plat) or cards.setdefault(plat, st.empty())
+                    with card.container():
+                        render_repurposed_card(plat, text)
+            match = agent.last_semantic_match
+            if match:
+                st.info(f"♻️ Reused a near-duplicate result (similarity {match.similarity:.2f}, source {match.source_id}).")
+            for plat in target_platforms:
+                if plat not in outputs:
+                    cards[plat].empty()
             if not outputs:
                 st.warning("No repurposed outputs parsed. Try again with a shorter caption.")
             else:
-                for plat, text in outputs.items():
-                    st.markdown(f"**{plat} version:**")
-                    
-                    # Real-time stats for each repurposed version
-                    col_text, col_stat = st.columns([3, 1])
-                    with col_text:
-                        st.code(text)
-                    with col_stat:
-                        char_count = len(text)
-                        limits = {"Instagram": 2200, "LinkedIn": 3000, "Twitter": 280}
-                        limit = limits.get(plat, 2200)
-                        
-                        st.metric("Chars", f"{char_count}/{limit}")
-                        if char_count > limit:
-                            st.error("⚠️ Over limit")
-                        else:
-                            st.success("✅ Good")
-                
+                repurpose_key = f"{source_platform}|{','.join(target_platforms)}|{hash(original_caption)}"
+                repurposed.put(repurpose_key, outputs)
+                st.session_state["active_repurpose"] = repurpose_key
                 st.success("Repurposed successfully.")
         except Exception as e:
-            st.error(f"Error: {e}")
+            show_error(e)
+else:
+    # Re-render the last result on reruns without calling the model again
+    for plat, text in (repurposed.get(st.session_state.get("active_repurpose", "")) or {}).items():
+        render_repurposed_card(plat, text)
 
 st.divider()
 
@@ -0,0 +1,364 @@
+# batch_runner.py
+"""Headless batch generation from a JSONL file of brand briefs.
+
+Each line is a JSON object with the create_30_day_plan arguments and optional
+follow-up steps:
+
+    {"id": "rooman", "brand_name": "Rooman Skills", "niche": "EdTech", "audience": "...",
+     "tone": "...", "platforms": ["Instagram", "LinkedIn"], "goal": "...", "constraints": "",
+     "shards": 1, "output_format": "json",
+     "captions": {"tone": "...", "audience": "...", "max_concurrency": 8},
+     "repurpose": [{"source_platform": "LinkedIn", "day": 3, "target_platforms": ["Twitter"]},
+                   {"source_platform": "Instagram", "original_caption": "...", "target_platforms": ["LinkedIn"]}]}
+
+Outputs go to <out>/<job id>/ (plan.json, captions.json, repurpose.json, state.json),
+each written atomically as soon as its step finishes, and every finished job is
+appended to <out>/results.jsonl. Re-running resumes from the last finished step.
+Jobs are claimed with lease files, so several processes or machines sharing the
+output directory can work through one job file without doing a job twice.
+The job id includes a hash of the brief, so an edited brief starts afresh
+instead of resuming from checkpoints made for the old one.
+
+    python batch_runner.py briefs.jsonl --out batch_output --concurrency 4 --processes 2
+    python batch_runner.py briefs.jsonl --offline   # FakeChatModel, no credentials or network
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import asyncio
+import hashlib
+import argparse
+import re
+import traceback
+from typing import Dict, Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+PLAN_ARGS = ["brand_name", "niche", "audience", "tone", "platforms", "goal", "constraints", "shards", "output_format"]
+REQUIRED_ARGS = ["brand_name", "niche", "audience", "tone", "platforms", "goal"]
+_UNSAFE = re.compile(r"[^A-Za-z0-9_-]+")
+
+
+def job_id(brief: dict) -> str:
+    """Directory name for a brief: its "id" made path-safe, plus a hash of its contents.
+
+    Without an "id" the hash alone is used.
+    """
+    payload = json.dumps(brief, sort_keys=True, ensure_ascii=False)
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    name = _UNSAFE.sub("_", str(brief.get("id") or "")).strip("_")[:64]
+    return f"{name}-{digest[:12]}" if name else digest[:16]
+
+
+def read_briefs(path: str) -> Iterator[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            brief = json.loads(line)
+            missing = [k for k in REQUIRED_ARGS if not brief.get(k)]
+            if missing:
+                raise ValueError(f"{path}:{line_number}: brief is missing {', '.join(missing)}")
+            yield brief
+
+
+def write_json_atomic(path: str, data):
+    """Write to a temp file in the same directory, then rename over the target."""
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_json(path: str, default=None):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def append_line(path: str, record: dict):
+    # A single O_APPEND write per record keeps lines intact across processes
+    line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+class LeaseLost(RuntimeError):
+    pass
+
+
+class Lease:
+    """Exclusive claim on a job, held as a file created with O_EXCL.
+
+    The holder refreshes the file's mtime while it works; a lease whose mtime is
+    older than `ttl` is considered abandoned (crashed worker) and may be taken over.
+    """
+
+    def __init__(self, path: str, ttl: float = 300.0):
+        self.path = path
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def _create(self) -> bool:
+        try:
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as f:
+            f.write(self.owner)
+        return True
+
+    def _expired(self, path: str) -> bool:
+        try:
+            return time.time() - os.path.getmtime(path) > self.ttl
+        except FileNotFoundError:
+            return True
+
+    def acquire(self) -> bool:
+        if self._create():
+            return True
+        if not self._expired(self.path):
+            return False
+        # Move the stale lease aside; only one worker's rename can succeed
+        stale = f"{self.path}.{uuid.uuid4().hex}.stale"
+        try:
+            os.rename(self.path, stale)
+        except FileNotFoundError:
+            return self._create()
+        if not self._expired(stale):
+            # Another worker took over between our check and the rename: put its lease back
+            try:
+                os.link(stale, self.path)
+            except FileExistsError:
+                pass
+            os.unlink(stale)
+            return False
+        os.unlink(stale)
+        return self._create()
+
+    def held(self) -> bool:
+        try:
+            with open(self.path, "r") as f:
+                return f.read() == self.owner
+        except FileNotFoundError:
+            return False
+
+    def refresh(self):
+        if not self.held():
+            raise LeaseLost(f"Lease {self.path} was taken over")
+        os.utime(self.path)
+
+    def release(self):
+        if self.held():
+            os.unlink(self.path)
+
+    async def heartbeat(self):
+        # Stops quietly if the lease is lost; the next checkpoint raises LeaseLost
+        while self.held():
+            os.utime(self.path)
+            await asyncio.sleep(self.ttl / 3)
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        agent,
+        out_dir: str,
+        concurrency: int = 4,
+        lease_ttl: float = 300.0,
+        max_attempts: int = 3,
+        log=print,
+    ):
+        self.agent = agent
+        self.out_dir = out_dir
+        self.concurrency = concurrency
+        self.lease_ttl = lease_ttl
+        self.max_attempts = max_attempts
+        self.log = log
+        os.makedirs(out_dir, exist_ok=True)
+
+    def job_dir(self, jid: str) -> str:
+        return os.path.join(self.out_dir, jid)
+
+    def state(self, jid: str) -> dict:
+        return read_json(os.path.join(self.job_dir(jid), "state.json"), {"steps": [], "attempts": 0})
+
+    def _save_state(self, jid: str, state: dict):
+        write_json_atomic(os.path.join(self.job_dir(jid), "state.json"), state)
+
+    def pending(self, jid: str) -> bool:
+        state = self.state(jid)
+        return state.get("status") != "done" and state.get("attempts", 0) < self.max_attempts
+
+    async def run(self, briefs: List[dict]) -> Dict[str, int]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        counts = {"done": 0, "failed": 0, "skipped": 0}
+
+        async def worker(brief: dict):
+            jid = job_id(brief)
+            if not self.pending(jid):
+                counts["skipped"] += 1
+                return
+            async with semaphore:
+                os.makedirs(self.job_dir(jid), exist_ok=True)
+                lease = Lease(os.path.join(self.job_dir(jid), "lease"), self.lease_ttl)
+                # Check again under the lease: another worker may have finished it meanwhile
+                if not lease.acquire():
+                    counts["skipped"] += 1
+                    return
+                try:
+                    if not self.pending(jid):
+                        counts["skipped"] += 1
+                        return
+                    ok = await self._run_job(jid, brief, lease)
+                    counts["done" if ok else "failed"] += 1
+                finally:
+                    lease.release()
+
+        await asyncio.gather(*(worker(brief) for brief in briefs))
+        return counts
+
+    async def _run_job(self, jid: str, brief: dict, lease: Lease) -> bool:
+        state = self.state(jid)
+        state["attempts"] = state.get("attempts", 0) + 1
+        state["status"] = "running"
+        state["worker"] = lease.owner
+        self._save_state(jid, state)
+        started = time.monotonic()
+        heartbeat = asyncio.create_task(lease.heartbeat())
+        try:
+            await self._run_steps(jid, brief, state, lease)
+        except LeaseLost as e:
+            self.log(f"[{jid}] {e}; leaving it to the new owner")
+            return False
+        except Exception as e:
+            state.update(status="failed", error=f"{type(e).__name__}: {e}")
+            self._save_state(jid, state)
+            self.log(f"[{jid}] failed (attempt {state['attempts']}): {state['error']}")
+            if os.getenv("BATCH_DEBUG"):
+                traceback.print_exc()
+            append_line(os.path.join(self.out_dir, "results.jsonl"), {"id": jid, "status": "failed", "error": state["error"]})
+            return False
+        finally:
+            heartbeat.cancel()
+        state.update(status="done", error=None, elapsed_s=round(time.monotonic() - started, 2))
+        self._save_state(jid, state)
+        append_line(
+            os.path.join(self.out_dir, "results.jsonl"),
+            {"id": jid, "status": "done", "brand_name": brief["brand_name"], "dir": self.job_dir(jid), "steps": state["steps"]},
+        )
+        self.log(f"[{jid}] done in {state['elapsed_s']}s")
+        return True
+
+    def _checkpoint(self, jid: str, state: dict, step: str, filename: str, data, lease: Lease):
+        lease.refresh()
+        write_json_atomic(os.path.join(self.job_dir(jid), filename), data)
+        if step not in state["steps"]:
+            state["steps"].append(step)
+        self._save_state(jid, state)
+        self.log(f"[{jid}] {step} saved")
+
+    async def _run_steps(self, jid: str, brief: dict, state: dict, lease: Lease):
+        from agent import PlanItem, CaptionResult
+
+        job_dir = self.job_dir(jid)
+        if "plan" in state["steps"]:
+            plan_items = [PlanItem(**x) for x in read_json(os.path.join(job_dir, "plan.json"))]
+        else:
+            args = {k: brief[k] for k in PLAN_ARGS if k in brief}
+            plan_items = await self.agent.acreate_30_day_plan(**args)
+            if not plan_items:
+                raise ValueError("plan could not be parsed")
+            self._checkpoint(jid, state, "plan", "plan.json", [i.model_dump() for i in plan_items], lease)
+
+        captions: List[CaptionResult] = []
+        options = brief.get("captions")
+        if options is not None and options is not False:
+            # "captions": true uses the brief's tone and audience
+            options = options if isinstance(options, dict) else {}
+            if "captions" in state["steps"]:
+                captions = [CaptionResult(**x) for x in read_json(os.path.join(job_dir, "captions.json"))]
+            else:
+                captions = await self.agent.awrite_captions_for_plan(
+                    plan_items,
+                    tone=options.get("tone", brief["tone"]),
+                    audience=options.get("audience", brief["audience"]),
+                    max_concurrency=options.get("max_concurrency", 8),
+                )
+                self._checkpoint(jid, state, "captions", "captions.json", [c.model_dump() for c in captions], lease)
+
+        by_day = {c.post_date: c.caption for c in captions if c.caption}
+        results = read_json(os.path.join(job_dir, "repurpose.json"), [])
+        for index, request in enumerate(brief.get("repurpose") or []):
+            step = f"repurpose:{index}"
+            if step in state["steps"]:
+                continue
+            original = request.get("original_caption") or by_day.get(f"Day {request.get('day')}")
+            if not original:
+                raise ValueError(f"repurpose #{index} needs original_caption or a day with a written caption")
+            outputs = await self.agent.arepurpose(
+                request["source_platform"], original, request["target_platforms"], fan_out=request.get("fan_out", False)
+            )
+            results.append({"index": index, "source_platform": request["source_platform"], "outputs": outputs})
+            self._checkpoint(jid, state, step, "repurpose.json", results, lease)
+
+
+def run_worker(args) -> Dict[str, int]:
+    load_dotenv()
+    from agent import SocialAgent
+
+    llm = None
+    if args.offline:
+        from fake_llm import FakeChatModel
+
+        llm = FakeChatModel(latency=0.05, tokens_per_second=200)
+    agent = SocialAgent(model=args.model, temperature=args.temperature, llm=llm, max_concurrency=args.llm_concurrency)
+    runner = BatchRunner(agent, args.out, concurrency=args.concurrency, lease_ttl=args.lease_ttl, max_attempts=args.max_attempts)
+    return asyncio.run(runner.run(list(read_briefs(args.jobs))))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Run JSONL brand briefs through the social agent.")
+    parser.add_argument("jobs", help="JSONL file with one brief per line")
+    parser.add_argument("--out", default="batch_output", help="Output and checkpoint directory (may be shared)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Briefs in flight per process")
+    parser.add_argument("--llm-concurrency", type=int, default=16, help="LLM calls in flight per process")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes on this machine")
+    parser.add_argument("--lease-ttl", type=float, default=300.0, help="Seconds before an unrefreshed lease is taken over")
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--temperature", type=float, default=0.7)
+    parser.add_argument("--offline", action="store_true", help="Use the local FakeChatModel (no credentials or network)")
+    args = parser.parse_args(argv)
+
+    # Validate the job file once before starting workers
+    total = sum(1 for _ in read_briefs(args.jobs))
+    print(f"{total} brief(s) in {args.jobs}")
+
+    if args.processes <= 1:
+        counts = run_worker(args)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        counts = {"done": 0, "failed": 0, "skipped": 0}
+        with ProcessPoolExecutor(max_workers=args.processes) as pool:
+            for result in pool.map(run_worker, [args] * args.processes):
+                for key, value in result.items():
+                    counts[key] += value
+    print(f"done: {counts['done']}, failed: {counts['failed']}, skipped: {counts['skipped']}")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+# benchmarks/conftest.py
+import time
+import statistics
+
+import pytest
+
+from agent import SocialAgent
+from cache import ResponseCache
+from fake_llm import FakeChatModel
+from scheduler import LLMScheduler
+
+try:
+    import pytest_benchmark  # noqa: F401
+    HAS_PYTEST_BENCHMARK = True
+except ImportError:
+    HAS_PYTEST_BENCHMARK = False
+
+
+@pytest.fixture
+def make_agent():
+    """SocialAgent on a FakeChatModel, with no response cache (unless given) and no rate limits."""
+
+    def factory(latency: float = 0.0, tokens_per_second: float = None, llm=None, cache=None, **kwargs) -> SocialAgent:
+        return SocialAgent(
+            llm=llm or FakeChatModel(latency=latency, tokens_per_second=tokens_per_second),
+            cache=cache or ResponseCache(enabled=False),
+            scheduler=LLMScheduler(limits={"gpt-4o-mini": (10 ** 9, 10 ** 12)}),
+            **kwargs,
+        )
+
+    return factory
+
+
+if not HAS_PYTEST_BENCHMARK:
+    _results = []
+
+    class _Benchmark:
+        """Minimal stand-in for the pytest-benchmark fixture (calibrated rounds, min/median/mean)."""
+
+        def __init__(self, name: str, min_time: float = 0.2, max_rounds: int = 1000):
+            self.name = name
+            self.min_time = min_time
+            self.max_rounds = max_rounds
+            self.stats = None
+
+        def _record(self, timings):
+            self.stats = {
+                "min": min(timings),
+                "median": statistics.median(timings),
+                "mean": statistics.fmean(timings),
+                "rounds": len(timings),
+            }
+            _results.append((self.name, self.stats))
+
+        def __call__(self, fn, *args, **kwargs):
+            timings = []
+            started = time.perf_counter()
+            while True:
+                t0 = time.perf_counter()
+                result = fn(*args, **kwargs)
+                timings.append(time.perf_counter() - t0)
+                if time.perf_counter() - started >= self.min_time or len(timings) >= self.max_rounds:
+                    break
+            self._record(timings)
+            return result
+
+        def pedantic(self, fn, args=(), kwargs=None, setup=None, rounds=1, iterations=1, warmup_rounds=0):
+            kwargs = kwargs or {}
+            for _ in range(warmup_rounds):
+                fn(*args, **kwargs)
+            timings = []
+            result = None
+            for _ in range(rounds):
+                if setup is not None:
+                    prepared = setup()
+                    if prepared is not None:
+                        args, kwargs = prepared
+                t0 = time.perf_counter()
+                for _ in range(iterations):
+                    result = fn(*args, **kwargs)
+                timings.append((time.perf_counter() - t0) / iterations)
+            self._record(timings)
+            return result
+
+    @pytest.fixture
+    def benchmark(request):
+        return _Benchmark(request.node.name)
+
+    def pytest_terminal_summary(terminalreporter):
+        if not _results:
+            return
+        terminalreporter.section("benchmarks (pytest-benchmark not installed; built-in timer)")
+        width = max(len(name) for name, _ in _results)
+        terminalreporter.write_line(f"{'name':<{width}}  {'min (ms)':>10}  {'median (ms)':>12}  {'mean (ms)':>10}  {'rounds':>6}")
+        for name, stats in _results:
+            terminalreporter.write_line(
+                f"{name:<{width}}  {stats['min'] * 1e3:>10.3f}  {stats['median'] * 1e3:>12.3f}  "
+                f"{stats['mean'] * 1e3:>10.3f}  {stats['rounds']:>6}"
+            )
@@ -0,0 +1,160 @@
+# benchmarks/test_agent_latency.py
+"""End-to-end agent latency against a FakeChatModel with fixed latency and token rate.
+
+Concurrency is checked through the fake model's call count and peak number of
+calls in progress, not wall-clock ceilings; the benchmark timings are reported only.
+"""
+import asyncio
+
+from cache import ResponseCache
+from fake_llm import FakeChatModel, RecordingChatModel, ReplayChatModel
+from metrics import MetricsRegistry
+
+LATENCY = 0.05
+TOKENS_PER_SECOND = 4000
+BRIEF = dict(brand_name="Brand", niche="EdTech", audience="Students", tone="Friendly",
+             platforms=["Instagram", "LinkedIn"], goal="Sign-ups")
+
+
+def test_plan_latency(benchmark, make_agent):
+    agent = make_agent(LATENCY, TOKENS_PER_SECOND)
+    items = benchmark.pedantic(agent.create_30_day_plan, kwargs=BRIEF, rounds=3)
+    assert len(items) == 30
+
+
+def test_json_plan_latency(benchmark, make_agent):
+    """JSON mode replies are shorter, so they finish sooner at the same token rate."""
+    metrics = MetricsRegistry()
+    agent = make_agent(LATENCY, TOKENS_PER_SECOND, metrics=metrics)
+    items = benchmark.pedantic(agent.create_30_day_plan, kwargs=dict(BRIEF, output_format="json"), rounds=3)
+    assert len(items) == 30
+    agent.create_30_day_plan(**BRIEF)
+    rows = {row["format"]: row for row in metrics.parse_summary()}
+    assert rows["json"]["parse_success_rate"] == rows["text"]["parse_success_rate"] == 1.0
+    assert rows["json"]["token_savings"] > 0
+
+
+def test_sharded_plan_latency(benchmark, make_agent):
+    llm = FakeChatModel(latency=LATENCY, tokens_per_second=TOKENS_PER_SECOND)
+    agent = make_agent(llm=llm)
+    items = benchmark.pedantic(agent.create_30_day_plan, kwargs=dict(BRIEF, shards=5), rounds=3)
+    assert [i.post_date for i in items] == [f"Day {d}" for d in range(1, 31)]
+    # One call per shard, all five in flight together rather than one after another
+    assert llm.call_count == 15
+    assert llm.peak_concurrency == 5
+
+
+def test_regenerate_days_latency(benchmark, make_agent):
+    """Rewriting 3 of 30 days costs a fraction of the month's output tokens."""
+    metrics = MetricsRegistry()
+    agent = make_agent(LATENCY, TOKENS_PER_SECOND, metrics=metrics)
+    plan = agent.create_30_day_plan(**BRIEF)
+    items = benchmark.pedantic(agent.regenerate_days, args=(plan, [3, 14, 30]), kwargs=BRIEF, rounds=3)
+    assert [i.post_date for i in items] == [f"Day {d}" for d in range(1, 31)]
+    assert [items[d - 1] for d in (1, 2, 15)] == [plan[d - 1] for d in (1, 2, 15)]
+    rows = {row["operation"]: row for row in metrics.summary()}
+    repair = rows["plan_repair"]
+    assert repair["completion_tokens"] / repair["calls"] < rows["plan"]["completion_tokens"] / 5
+
+
+def test_plan_gap_repair(make_agent):
+    """Days the parser could not recover are requested again, not the whole month."""
+
+    class DropsDays(FakeChatModel):
+        def reply(self, messages):
+            text = super().reply(messages)
+            if "Days to write:" in messages[-1].content:
+                return text
+            return "---".join(b for b in text.split("---") if "Day 4\n" not in b and "Day 17\n" not in b)
+
+    metrics = MetricsRegistry()
+    items = make_agent(llm=DropsDays(), metrics=metrics).create_30_day_plan(**BRIEF)
+    assert [i.post_date for i in items] == [f"Day {d}" for d in range(1, 31)]
+    assert [row["operation"] for row in metrics.summary()] == ["plan", "plan_repair"]
+
+
+def test_stream_first_item_latency(benchmark, make_agent):
+    agent = make_agent(LATENCY, TOKENS_PER_SECOND)
+
+    def first_item():
+        stream = agent.stream_30_day_plan(**BRIEF)
+        item = next(stream)
+        stream.close()
+        return item
+
+    item = benchmark.pedantic(first_item, rounds=3)
+    assert item.post_date == "Day 1"
+
+
+def test_streamed_plan_is_cached(make_agent):
+    """The stream is closed once the month is parsed; that text is still a whole plan and gets cached."""
+    cache = ResponseCache()
+    agent = make_agent(LATENCY, TOKENS_PER_SECOND, cache=cache, temperature=0)
+    first = list(agent.stream_30_day_plan(**BRIEF))
+    assert list(agent.stream_30_day_plan(**BRIEF)) == first and len(first) == 30
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    partial = agent.stream_30_day_plan(**dict(BRIEF, goal="Other"))
+    next(partial)
+    partial.close()
+    assert len(cache.memory) == 1
+
+
+def test_caption_latency(benchmark, make_agent):
+    agent = make_agent(LATENCY, TOKENS_PER_SECOND)
+    caption = benchmark.pedantic(
+        agent.write_caption,
+        args=("Instagram", "Friendly", "Students", "Title", "Points", "Link in bio", "#a"),
+        rounds=5,
+    )
+    assert "Link in bio" in caption
+
+
+def test_bulk_captions_latency(benchmark, make_agent):
+    llm = FakeChatModel(latency=LATENCY, tokens_per_second=TOKENS_PER_SECOND)
+    agent = make_agent(llm=llm)
+    plan = make_agent().create_30_day_plan(**BRIEF)
+    results = benchmark.pedantic(agent.write_captions_for_plan, args=(plan, "Friendly", "Students"),
+                                 kwargs={"max_concurrency": 10}, rounds=2)
+    assert all(r.caption for r in results)
+    # 30 calls per round, 10 at a time: never more, and not one by one
+    assert llm.call_count == 60
+    assert llm.peak_concurrency == 10
+
+
+def test_repurpose_fan_out_latency(benchmark, make_agent):
+    llm = FakeChatModel(latency=LATENCY, tokens_per_second=TOKENS_PER_SECOND)
+    agent = make_agent(llm=llm)
+    targets = ["Twitter", "LinkedIn", "Facebook", "Threads"]
+    outputs = benchmark.pedantic(agent.repurpose, args=("Instagram", "Original caption", targets),
+                                 kwargs={"fan_out": True}, rounds=3)
+    assert list(outputs) == targets
+    # One call per platform, all in flight together
+    assert llm.call_count == 3 * len(targets)
+    assert llm.peak_concurrency == len(targets)
+
+
+def test_fan_out_clears_semantic_match(make_agent):
+    from semantic_cache import SemanticCache
+
+    agent = make_agent(semantic_cache=SemanticCache())
+    agent.repurpose("Instagram", "Original caption", ["Twitter", "LinkedIn"])
+    agent.repurpose("Instagram", "Original caption", ["Twitter", "LinkedIn"])
+    assert agent.last_semantic_match is not None
+    dict(agent.stream_repurpose("Instagram", "Another caption", ["Twitter"], fan_out=True))
+    assert agent.last_semantic_match is None
+
+
+def test_async_repurpose_latency(benchmark, make_agent):
+    agent = make_agent(LATENCY, TOKENS_PER_SECOND)
+    outputs = benchmark.pedantic(
+        lambda: asyncio.run(agent.arepurpose("Instagram", "Original caption", ["Twitter", "LinkedIn"])), rounds=3
+    )
+    assert set(outputs) == {"Twitter", "LinkedIn"}
+
+
+def test_replay_latency(benchmark, make_agent, tmp_path):
+    cassette = str(tmp_path / "cassette.jsonl")
+    recorded = make_agent(llm=RecordingChatModel(inner=FakeChatModel(seed=7), cassette=cassette)).create_30_day_plan(**BRIEF)
+    replayer = make_agent(llm=ReplayChatModel(cassette=cassette))
+    assert benchmark(replayer.create_30_day_plan, **BRIEF) == recorded
@@ -0,0 +1,91 @@
+# benchmarks/test_batch_runner.py
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+from batch_runner import BatchRunner, Lease, LeaseLost, job_id, main, read_json
+from fake_llm import FakeChatModel
+
+BRIEF = dict(id="brand", brand_name="Brand", niche="EdTech", audience="Students", tone="Friendly",
+             platforms=["Instagram"], goal="Sign-ups")
+
+
+def test_job_id_is_path_safe_and_tracks_content():
+    for raw in ["../x", "/etc/passwd", "a/../../b", "..", "C:\\temp"]:
+        jid = job_id(dict(BRIEF, id=raw))
+        assert os.sep not in jid and "/" not in jid and not jid.startswith(".")
+    assert job_id(BRIEF) == job_id(dict(BRIEF)) and job_id(BRIEF).startswith("brand-")
+    # Same id, edited brief: a different checkpoint directory
+    assert job_id(dict(BRIEF, goal="Awareness")) != job_id(BRIEF)
+    # Ids that sanitize alike still get their own directories
+    assert job_id(dict(BRIEF, id="a/b")) != job_id(dict(BRIEF, id="a_b"))
+    assert len(job_id({k: v for k, v in BRIEF.items() if k != "id"})) == 16
+
+
+def test_lease_is_exclusive(tmp_path):
+    path = str(tmp_path / "lease")
+    first, second = Lease(path), Lease(path)
+    assert first.acquire() and first.held()
+    assert not second.acquire() and not second.held()
+    first.release()
+    assert not os.path.exists(path)
+    assert second.acquire() and second.held()
+
+
+def test_stale_lease_is_taken_over(tmp_path):
+    path = str(tmp_path / "lease")
+    crashed, fresh = Lease(path, ttl=60), Lease(path, ttl=60)
+    assert crashed.acquire()
+    assert not fresh.acquire()
+    old = time.time() - 120
+    os.utime(path, (old, old))
+    assert fresh.acquire() and fresh.held() and not crashed.held()
+    with pytest.raises(LeaseLost):
+        crashed.refresh()
+    # The old owner's release leaves the new lease alone
+    crashed.release()
+    assert fresh.held()
+
+
+def _runner(make_agent, out_dir):
+    llm = FakeChatModel()
+    return BatchRunner(make_agent(llm=llm), str(out_dir), log=lambda message: None), llm
+
+
+def test_resume_skips_finished_jobs_and_steps(make_agent, tmp_path):
+    brief = dict(BRIEF, captions=True)
+    jid = job_id(brief)
+    runner, llm = _runner(make_agent, tmp_path)
+    assert asyncio.run(runner.run([brief])) == {"done": 1, "failed": 0, "skipped": 0}
+    assert llm.call_count == 31
+    assert runner.state(jid)["steps"] == ["plan", "captions"]
+
+    # A finished job is not run again
+    runner, llm = _runner(make_agent, tmp_path)
+    assert asyncio.run(runner.run([brief])) == {"done": 0, "failed": 0, "skipped": 1}
+    assert llm.call_count == 0
+
+    # Interrupted after the plan: only the captions are written again, from the saved plan
+    plan = read_json(os.path.join(runner.job_dir(jid), "plan.json"))
+    os.remove(os.path.join(runner.job_dir(jid), "captions.json"))
+    runner._save_state(jid, {"steps": ["plan"], "attempts": 1, "status": "running"})
+    runner, llm = _runner(make_agent, tmp_path)
+    assert asyncio.run(runner.run([brief])) == {"done": 1, "failed": 0, "skipped": 0}
+    assert llm.call_count == 30
+    assert read_json(os.path.join(runner.job_dir(jid), "plan.json")) == plan
+    assert not os.path.exists(os.path.join(runner.job_dir(jid), "lease"))
+
+
+def test_cli_offline(tmp_path, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    jobs = tmp_path / "briefs.jsonl"
+    jobs.write_text(json.dumps(dict(BRIEF, id="../escape")) + "\n", encoding="utf-8")
+    out = tmp_path / "out"
+    assert main([str(jobs), "--out", str(out), "--offline"]) == 0
+    results = [json.loads(line) for line in (out / "results.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert [r["status"] for r in results] == ["done"]
+    assert os.path.dirname(results[0]["dir"]) == str(out)
+    assert not (tmp_path / "escape").exists()
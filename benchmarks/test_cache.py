@@ -0,0 +1,107 @@
+# benchmarks/test_cache.py
+import threading
+
+import pytest
+
+import cache as cache_module
+from cache import DEFAULT_TTL, MemoryCache, ResponseCache, SQLiteCache
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+
+def test_custom_memory_tier_is_kept():
+    memory = MemoryCache(max_entries=2, ttl=5)
+    assert ResponseCache(memory=memory).memory is memory
+
+
+def test_default_memory_tier_uses_disk_ttl(tmp_path):
+    assert ResponseCache().memory.ttl == DEFAULT_TTL
+    assert ResponseCache(disk=SQLiteCache(str(tmp_path / "c.db"), ttl=60)).memory.ttl == 60
+
+
+def test_memory_ttl_expiry(clock):
+    memory = MemoryCache(ttl=10)
+    memory.set("k", "v")
+    clock.now += 10
+    assert memory.get("k") == "v"
+    clock.now += 1
+    assert memory.get("k") is None and len(memory) == 0
+
+
+def test_memory_size_eviction_is_lru():
+    memory = MemoryCache(max_entries=2)
+    memory.set("a", "1")
+    memory.set("b", "2")
+    memory.get("a")
+    memory.set("c", "3")
+    assert (memory.get("a"), memory.get("b"), memory.get("c")) == ("1", None, "3")
+
+
+def test_disk_ttl_expiry(clock, tmp_path):
+    disk = SQLiteCache(str(tmp_path / "c.db"), ttl=10)
+    disk.set("k", "v")
+    clock.now += 5
+    assert disk.get("k") == ("v", clock.now - 5)
+    clock.now += 6
+    assert disk.get("k") is None
+
+
+def test_disk_size_eviction_every_50_writes(clock, tmp_path):
+    disk = SQLiteCache(str(tmp_path / "c.db"), max_entries=10, ttl=None)
+
+    def rows():
+        return disk._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    for i in range(49):
+        clock.now += 1
+        disk.set(f"k{i}", str(i))
+    # Eviction is amortised: nothing is removed before the 50th write
+    assert rows() == 49
+    clock.now += 1
+    disk.set("k49", "49")
+    assert rows() == 10
+    # The most recently used rows survive
+    assert disk.get("k39") is None and disk.get("k40")[0] == "40"
+
+
+def test_disk_hit_is_promoted_to_memory(clock, tmp_path):
+    path = str(tmp_path / "c.db")
+    ResponseCache(disk=SQLiteCache(path)).set("k", "v")
+    written = clock.now
+    clock.now += 100
+    fresh = ResponseCache(disk=SQLiteCache(path))
+    assert fresh.get("k") == "v" and fresh.get("k") == "v"
+    assert (fresh.stats()["disk_hits"], fresh.stats()["memory_hits"]) == (1, 1)
+    # Promotion keeps the original age, so the entry expires from memory on the disk schedule
+    assert fresh.memory._data["k"][1] == written
+
+
+def test_counters_are_thread_safe():
+    responses = ResponseCache()
+    responses.set("k", "v")
+
+    def lookups():
+        for _ in range(2000):
+            responses.get("k")
+            responses.get("missing")
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = responses.stats()
+    assert (stats["hits"], stats["misses"], stats["memory_hits"]) == (16000, 16000, 16000)
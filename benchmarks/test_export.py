@@ -0,0 +1,89 @@
+# benchmarks/test_export.py
+import os
+from datetime import date
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from agent import CaptionResult
+from export import (
+    FEATURE_DTYPES, export_key, export_schema, plan_export_frame, read_dataset, to_arrow_table,
+    to_parquet_bytes, write_dataset,
+)
+
+BRIEF = dict(brand_name="Brand", niche="EdTech", audience="Students", tone="Friendly",
+             platforms=["Instagram", "LinkedIn"], goal="Sign-ups")
+# Day 1 is Oct 20, so days 13-30 fall in November
+START = date(2026, 10, 20)
+
+
+@pytest.fixture
+def plan(make_agent):
+    return make_agent().create_30_day_plan(**BRIEF)
+
+
+def _captions(plan):
+    return [CaptionResult(post_date=item.post_date, platform=item.platform, caption=f"Join us! {item.idea_title} #EdTech")
+            for item in plan[:3]] + [CaptionResult(post_date=plan[3].post_date, platform=plan[3].platform, error="timeout")]
+
+
+def test_export_schema(plan):
+    df = plan_export_frame(plan, "Brand", START, captions=_captions(plan), plan_id=7)
+    table = to_arrow_table(df)
+    assert table.schema == export_schema()
+    assert str(table.schema.field("platform").type) == "dictionary<values=string, indices=int32, ordered=0>"
+    assert list(df.columns[:5]) == ["brand", "plan_id", "day", "scheduled_date", "month"]
+    assert df["day"].tolist() == list(range(1, 31))
+    assert df["caption"].notna().sum() == 3 and df["caption_error"].tolist()[3] == "timeout"
+    # Feature columns are typed and null where there is no caption
+    assert {column: str(df[column].dtype) for column in FEATURE_DTYPES} == FEATURE_DTYPES
+    assert df["has_cta"].tolist()[:3] == [True] * 3 and df["has_cta"][3:].isna().all()
+
+    # Same schema without any captions
+    assert to_arrow_table(plan_export_frame(plan, "Brand", START)).schema == export_schema()
+
+
+def test_write_dataset_partitions(plan, tmp_path):
+    df = plan_export_frame(plan, "Brand", START, plan_id=7)
+    written = write_dataset(df, str(tmp_path))
+    partitions = sorted({os.path.relpath(os.path.dirname(path), tmp_path) for path in written})
+    assert partitions == [os.path.join("brand=Brand", "month=2026-10"), os.path.join("brand=Brand", "month=2026-11")]
+    # A second export adds files instead of overwriting the first
+    assert not set(write_dataset(df, str(tmp_path))) & set(written)
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_read_dataset_round_trip(plan, tmp_path, format):
+    df = plan_export_frame(plan, "Brand", START, captions=_captions(plan), plan_id=7)
+    write_dataset(df, str(tmp_path), format)
+    write_dataset(plan_export_frame(plan, "Other", START), str(tmp_path), format)
+
+    back = read_dataset(str(tmp_path), format, brand="Brand").sort_values("day").reset_index(drop=True)
+    assert len(back) == 30 and set(back["brand"]) == {"Brand"}
+    assert back["idea_title"].tolist() == [item.idea_title for item in plan]
+    assert back["platform"].astype(str).tolist() == df["platform"].astype(str).tolist()
+    assert back["scheduled_date"].tolist() == df["scheduled_date"].tolist()
+    assert back["caption"].tolist()[:3] == df["caption"].tolist()[:3] and back["caption"][3:].isna().all()
+    assert back["engagement_score"].tolist()[:3] == pytest.approx(df["engagement_score"].tolist()[:3])
+
+    november = read_dataset(str(tmp_path), format, brand="Brand", month="2026-11")
+    assert sorted(november["day"]) == list(range(13, 31))
+
+
+def test_parquet_bytes(plan, tmp_path):
+    import pyarrow.parquet as pq
+
+    df = plan_export_frame(plan, "Brand", START)
+    path = tmp_path / "plan.parquet"
+    path.write_bytes(to_parquet_bytes(df))
+    assert pq.read_table(path).schema == export_schema()
+
+
+def test_export_key_tracks_inputs(plan):
+    captions = _captions(plan)
+    key = export_key(plan, "Brand", START, captions, plan_id=7)
+    assert export_key(list(plan), "Brand", START, list(captions), plan_id=7) == key
+    assert export_key(plan, "Brand", START, captions[:2], plan_id=7) != key
+    assert export_key(plan[:-1], "Brand", START, captions, plan_id=7) != key
+    assert export_key(plan, "Brand", date(2026, 11, 1), captions, plan_id=7) != key
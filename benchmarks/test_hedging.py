@@ -0,0 +1,92 @@
+# benchmarks/test_hedging.py
+"""Hedged captions against a FakeChatModel whose every 5th call stalls before its first token."""
+import asyncio
+import itertools
+import time
+from typing import List
+
+from langchain_core.messages import BaseMessage
+
+from fake_llm import FakeChatModel
+from hedging import HedgingPolicy
+from metrics import MetricsRegistry
+
+LATENCY = 0.02
+STALL = 0.5
+CAPTION = dict(platform="Instagram", tone="Friendly", audience="Students", key_points="Skills",
+               cta="Enroll", hashtags="#EdTech")
+
+
+def _stalling_llm(**kwargs) -> FakeChatModel:
+    return FakeChatModel(latency=LATENCY, tokens_per_second=4000, stall_every=5, stall=STALL, **kwargs)
+
+
+def _policy(**kwargs) -> HedgingPolicy:
+    return HedgingPolicy(percentile=0.9, initial_delay=0.1, min_samples=5, **kwargs)
+
+
+class _MarkedFallback(FakeChatModel):
+    """Fallback whose replies say where they came from."""
+
+    def reply(self, messages: List[BaseMessage]) -> str:
+        return "[fallback] " + super().reply(messages)
+
+
+def test_hedged_caption_tail_latency(benchmark, make_agent):
+    metrics = MetricsRegistry()
+    hedging = _policy(fallbacks=[_MarkedFallback(latency=LATENCY, tokens_per_second=4000, model_name="fallback")])
+    agent = make_agent(llm=_stalling_llm(), metrics=metrics, hedging=hedging)
+    captions = []
+    posts = itertools.count()
+
+    def caption():
+        captions.append(agent.write_caption(title=f"Post {next(posts)}", **CAPTION))
+
+    benchmark.pedantic(caption, rounds=30)
+    # Every 5th primary call stalls; each of those must be answered by the fallback
+    stalled = [captions[i] for i in range(4, 30, 5)]
+    assert all(c.startswith("[fallback] ") for c in stalled)
+    from_fallback = sum(c.startswith("[fallback] ") for c in captions)
+    stats = hedging.stats()[0]
+    assert stats["calls"] == 30 and stats["hedged"] >= 6
+    assert stats["hedge_wins"] == from_fallback >= 6
+    row = metrics.summary()[0]
+    assert (row["hedges"], row["hedge_wins"]) == (stats["hedged"], stats["hedge_wins"])
+
+
+def test_unhedged_caption_stalls(make_agent):
+    """Baseline for the test above: without hedging the stalls reach p99."""
+    agent = make_agent(llm=_stalling_llm())
+    timings = []
+    for i in range(10):
+        started = time.perf_counter()
+        agent.write_caption(title=f"Post {i}", **CAPTION)
+        timings.append(time.perf_counter() - started)
+    # A lower bound only: the stalled calls sleep at least STALL
+    assert sum(t >= STALL for t in timings) == 2
+
+
+def test_async_hedge_without_fallbacks(make_agent):
+    """With no fallback list the primary is asked again; the stalled attempt is cancelled."""
+    hedging = _policy()
+    llm = _stalling_llm()
+    agent = make_agent(llm=llm, hedging=hedging)
+    titles = [f"Post {i}" for i in range(20)]
+
+    async def run():
+        return [await agent.awrite_caption(title=title, **CAPTION) for title in titles]
+
+    captions = asyncio.run(run())
+    # Hedges re-ask the same deterministic model, so every answer is the unhedged one
+    reference = make_agent(llm=FakeChatModel())
+    assert captions == [reference.write_caption(title=title, **CAPTION) for title in titles]
+    stats = hedging.stats()[0]
+    assert stats["calls"] == 20 and stats["hedged"] >= 3 and stats["hedge_wins"] == stats["hedged"]
+
+
+def test_plan_is_not_hedged(make_agent):
+    hedging = _policy()
+    agent = make_agent(LATENCY, 4000, hedging=hedging)
+    agent.create_30_day_plan(brand_name="Brand", niche="EdTech", audience="Students", tone="Friendly",
+                             platforms=["Instagram"], goal="Sign-ups")
+    assert hedging.stats() == []
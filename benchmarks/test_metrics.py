@@ -0,0 +1,122 @@
+# benchmarks/test_metrics.py
+import os
+import re
+import urllib.error
+import urllib.request
+
+import pytest
+
+from metrics import QUANTILES, MetricsRegistry
+
+# One sample per line: name, optional {label="value",...}, then a number
+_LABEL_VALUE = r'"(?:[^"\\\n]|\\[\\"n])*"'
+_SAMPLE = re.compile(
+    r"^([a-zA-Z_:][a-zA-Z0-9_:]*)"
+    rf"(?:\{{([a-zA-Z_][a-zA-Z0-9_]*={_LABEL_VALUE}(?:,[a-zA-Z_][a-zA-Z0-9_]*={_LABEL_VALUE})*)\}})?"
+    r" (-?[0-9.]+(?:e[+-]?[0-9]+)?)$"
+)
+
+
+def _registry() -> MetricsRegistry:
+    metrics = MetricsRegistry()
+    for wall, cache in ((0.1, "miss"), (0.2, "miss"), (0.3, "hit")):
+        metrics.record("caption", "gpt-4o-mini", wall=wall, ttft=wall / 2, prompt_tokens=100,
+                       completion_tokens=50, cached_tokens=20, retries=1, cache=cache)
+    metrics.record("plan", "gpt-4o-mini", wall=1.0, ttft=0.4, error=True)
+    metrics.record_hedge("caption", "gpt-4o-mini", won=True)
+    metrics.record_parse("json", expected=30, parsed=29, completion_tokens=900)
+    return metrics
+
+
+def _parse(text: str):
+    """{(name, labels): value}, checking every line and that each sample follows its family's TYPE."""
+    assert text.endswith("\n")
+    samples, types = {}, {}
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert name not in types and kind in ("counter", "summary")
+            types[name] = kind
+            continue
+        match = _SAMPLE.match(line)
+        assert match, line
+        name, labels, value = match.groups()
+        family = re.sub(r"_(sum|count)$", "", name) if name not in types else name
+        assert family in types and (family == name or types[family] == "summary"), line
+        key = (name, labels or "")
+        assert key not in samples, line
+        samples[key] = float(value)
+    return samples, types
+
+
+def test_prometheus_text_format():
+    samples, types = _parse(_registry().to_prometheus())
+    assert types["llm_call_duration_seconds"] == types["llm_time_to_first_token_seconds"] == "summary"
+    assert all(kind == "counter" and name.endswith("_total") for name, kind in types.items() if kind != "summary")
+    assert {"llm_calls_total", "llm_tokens_total", "llm_cost_usd_total", "llm_retries_total", "llm_errors_total",
+            "llm_hedges_total", "llm_hedge_wins_total", "llm_plan_parses_total"} <= set(types)
+
+
+def test_prometheus_summary_and_counter_lines():
+    samples, _ = _parse(_registry().to_prometheus())
+    caption = 'operation="caption",model="gpt-4o-mini"'
+    for q in QUANTILES:
+        assert ("llm_call_duration_seconds", f'{caption},quantile="{q}"') in samples
+    assert samples[("llm_call_duration_seconds", f'{caption},quantile="0.5"')] == 0.2
+    assert samples[("llm_call_duration_seconds_sum", caption)] == pytest.approx(0.6)
+    assert samples[("llm_call_duration_seconds_count", caption)] == 3
+    # Cache hits are not model latency
+    assert samples[("llm_time_to_first_token_seconds_count", caption)] == 2
+    assert samples[("llm_time_to_first_token_seconds_sum", caption)] == pytest.approx(0.15)
+
+    assert samples[("llm_calls_total", f'{caption},cache="miss"')] == 2
+    assert samples[("llm_calls_total", f'{caption},cache="hit"')] == 1
+    assert samples[("llm_calls_total", f'{caption},cache="semantic"')] == 0
+    assert samples[("llm_tokens_total", f'{caption},type="prompt"')] == 300
+    assert samples[("llm_tokens_total", f'{caption},type="completion"')] == 150
+    assert samples[("llm_tokens_total", f'{caption},type="cached_prompt"')] == 60
+    assert samples[("llm_retries_total", caption)] == 3
+    assert samples[("llm_errors_total", 'operation="plan",model="gpt-4o-mini"')] == 1
+    assert samples[("llm_cost_usd_total", caption)] > 0
+    assert samples[("llm_hedges_total", caption)] == samples[("llm_hedge_wins_total", caption)] == 1
+    assert samples[("llm_plan_items_parsed_total", 'format="json"')] == 29
+
+
+def test_prometheus_label_escaping():
+    metrics = MetricsRegistry()
+    metrics.record('op "quoted"', "path\\to\nmodel", wall=0.1, ttft=0.1)
+    # _parse fails on any line a raw newline or quote would break
+    samples, _ = _parse(metrics.to_prometheus())
+    assert ("llm_errors_total", 'operation="op \\"quoted\\"",model="path\\\\to\\nmodel"') in samples
+
+
+def test_prometheus_empty_registry():
+    samples, types = _parse(MetricsRegistry().to_prometheus())
+    assert samples == {} and "llm_plan_parses_total" not in types
+
+
+def test_write_prometheus(tmp_path):
+    metrics = _registry()
+    path = tmp_path / "textfile" / "llm.prom"
+    metrics.write_prometheus(str(path))
+    assert path.read_text(encoding="utf-8") == metrics.to_prometheus()
+    assert os.listdir(path.parent) == ["llm.prom"]
+
+
+def test_serve_prometheus():
+    metrics = _registry()
+    server = metrics.serve_prometheus(0, host="127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{url}/metrics", timeout=10) as response:
+            assert response.status == 200
+            assert response.headers["Content-Type"] == "text/plain; version=0.0.4; charset=utf-8"
+            assert response.read().decode("utf-8") == metrics.to_prometheus()
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{url}/other", timeout=10)
+        assert error.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,70 @@
+# benchmarks/test_parsing.py
+import random
+
+from agent import PLAN_FIELDS, _iter_repurpose_sections
+from fake_llm import fake_plan, fake_plan_json, fake_repurpose, split_tokens
+
+PLAN_TEXT = fake_plan(range(1, 31), ["Instagram", "LinkedIn", "Twitter"], random.Random(0))
+PLAN_JSON = fake_plan_json(range(1, 31), ["Instagram", "LinkedIn", "Twitter"], random.Random(0))
+REPURPOSE_TEXT = fake_repurpose({"Target Platforms": "Twitter, LinkedIn, Instagram, Facebook"}, random.Random(0))
+
+
+def test_parse_plan(benchmark, make_agent):
+    agent = make_agent()
+    items = benchmark(agent._parse_plan, PLAN_TEXT)
+    assert len(items) == 30
+    assert [item.post_date for item in items] == [f"Day {d}" for d in range(1, 31)]
+
+
+def test_parse_plan_json(benchmark, make_agent):
+    agent = make_agent()
+    items = benchmark(agent._parse_plan, PLAN_JSON, "json")
+    assert items == agent._parse_plan(PLAN_TEXT)
+
+
+def test_parse_plan_json_salvage(make_agent):
+    """One malformed post costs that post, not the plan."""
+    broken = PLAN_JSON.replace('"d":7,', '"d":"seven",', 1)
+    items = make_agent()._parse_plan(f"```json\n{broken}\n```", "json")
+    assert len(items) == 29
+    assert "Day 7" not in [item.post_date for item in items]
+
+
+def test_parse_plan_stream(benchmark, make_agent):
+    """Incremental parser fed token-sized chunks, as stream_30_day_plan sees them."""
+    agent = make_agent()
+    items = benchmark(lambda: list(agent.stream_30_day_plan("Brand", "EdTech", "Students", "Friendly", ["Instagram"], "Sign-ups")))
+    assert len(items) == 30
+    assert all(getattr(items[0], field) for field in PLAN_FIELDS)
+
+
+def test_repeated_day_keeps_first_post(make_agent):
+    """Streamed and whole plans agree when the model writes two posts for one day."""
+    from fake_llm import FakeChatModel
+
+    class RepeatsDay2(FakeChatModel):
+        def reply(self, messages):
+            blocks = super().reply(messages).split("---")
+            day2 = next(i for i, b in enumerate(blocks) if "Day 2\n" in b)
+            extra = blocks[day2].replace("Idea Title:", "Idea Title: Another")
+            return "---".join(blocks[:day2 + 1] + [extra] + blocks[day2 + 1:])
+
+    agent = make_agent(llm=RepeatsDay2())
+    brief = dict(brand_name="Brand", niche="EdTech", audience="Students", tone="Friendly",
+                 platforms=["Instagram"], goal="Sign-ups")
+    streamed = list(agent.stream_30_day_plan(**brief))
+    assert [item.post_date for item in streamed] == [f"Day {d}" for d in range(1, 31)]
+    assert streamed == agent.create_30_day_plan(**brief, repair=False) == agent.create_30_day_plan(**brief)
+    assert not streamed[1].idea_title.startswith("Another")
+
+
+def test_parse_repurpose(benchmark, make_agent):
+    agent = make_agent()
+    sections = benchmark(agent._parse_repurpose, REPURPOSE_TEXT)
+    assert list(sections) == ["Twitter", "LinkedIn", "Instagram", "Facebook"]
+
+
+def test_parse_repurpose_stream(benchmark):
+    chunks = split_tokens(REPURPOSE_TEXT)
+    sections = benchmark(lambda: list(_iter_repurpose_sections(iter(chunks))))
+    assert [platform for platform, _ in sections] == ["Twitter", "LinkedIn", "Instagram", "Facebook"]
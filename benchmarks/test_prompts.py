@@ -0,0 +1,40 @@
+# benchmarks/test_prompts.py
+import pytest
+from langchain_core.prompts import PromptTemplate
+
+from prompt_registry import DEFAULT_PROMPTS, PromptRegistry, get_prompt_registry
+
+CAPTION_VARIABLES = dict(platform="Instagram", tone="Friendly", audience="Students", title="Title",
+                         key_points="Points", cta="Link in bio", hashtags="#a #b")
+
+
+def test_render_compiled(benchmark):
+    prompt = get_prompt_registry().get("caption")
+    text = benchmark(prompt.format, **CAPTION_VARIABLES)
+    assert text == PromptTemplate.from_template(prompt.template).format(**CAPTION_VARIABLES)
+
+
+def test_render_prompt_template(benchmark):
+    """Baseline: building a PromptTemplate per call, as the agent used to."""
+    template = get_prompt_registry().get("caption").template
+    benchmark(lambda: PromptTemplate.from_template(template).format(**CAPTION_VARIABLES))
+
+
+@pytest.mark.parametrize("name", [name for name, *_ in DEFAULT_PROMPTS])
+def test_static_prefix_first(name):
+    """Variables come after the instructions, so renders share the static prefix."""
+    prompt = get_prompt_registry().get(name)
+    a = prompt.format(**{v: "a" for v in prompt.input_variables})
+    b = prompt.format(**{v: "b" for v in prompt.input_variables})
+    assert a.startswith(prompt.static_prefix) and b.startswith(prompt.static_prefix)
+    assert prompt.prefix_tokens > prompt.template_tokens / 2
+
+
+def test_versions():
+    registry = PromptRegistry()
+    registry.register("greet", 1, "sys", "Hello {name}")
+    registry.register("greet", 2, "sys", "Hi {name}")
+    assert registry.get("greet").format(name="A") == "Hi A"
+    assert registry.get("greet", 1).format(name="A") == "Hello A"
+    with pytest.raises(ValueError):
+        registry.register("greet", 2, "sys", "Hey {name}")
@@ -0,0 +1,35 @@
+# benchmarks/test_repl.py
+from main import ChatSession, LocalBackend
+from scheduler import estimate_tokens
+
+LATENCY = 0.05
+
+
+def test_repl_first_token_latency(benchmark):
+    """The backend is built once; each turn pays only the model's own time to first token."""
+    backend = LocalBackend("Be brief.", latency=LATENCY, tokens_per_second=4000)
+    model = backend.model
+    session = ChatSession(backend)
+
+    def first_token():
+        reply = session.send("Plan my month")
+        chunk = next(reply)
+        reply.close()
+        return chunk
+
+    assert benchmark.pedantic(first_token, rounds=3)
+    assert session.last_ttft is not None
+    # Every turn streamed from the one model built up front, one call each
+    assert backend.model is model and model.call_count == 3 and model.peak_concurrency == 1
+    # Turns closed after the first token are not kept in history
+    assert session.history == []
+
+
+def test_repl_history_budget():
+    session = ChatSession(LocalBackend("Be brief.", latency=0, tokens_per_second=None), max_history_tokens=2500)
+    for i in range(5):
+        "".join(session.send(f"Turn {i}"))
+        # The budget applies to what was sent: everything but the reply just added
+        assert sum(estimate_tokens(text) for _, text in session.history[:-1]) <= 2500
+        assert session.history[0][0] == "user" and session.history[-1][0] == "model"
+    assert session.history[-2] == ("user", "Turn 4")
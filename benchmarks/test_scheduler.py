@@ -0,0 +1,60 @@
+# benchmarks/test_scheduler.py
+import asyncio
+import threading
+import time
+
+from scheduler import LLMScheduler
+
+
+def _exhausted(limits=None) -> LLMScheduler:
+    """Scheduler whose "slow" model has spent its one request per minute."""
+    scheduler = LLMScheduler(limits={"slow": (1, 10 ** 9), "fast": (10 ** 6, 10 ** 9), **(limits or {})})
+    scheduler.acquire("slow", 10)
+    return scheduler
+
+
+def test_no_head_of_line_blocking_across_models():
+    scheduler = _exhausted()
+    waiter = threading.Thread(target=lambda: scheduler.acquire("slow", 10), daemon=True)
+    waiter.start()
+    while scheduler.stats()["queue_depth"] == 0:
+        time.sleep(0.001)
+    admitted = []
+    try_admit = scheduler._try_admit
+
+    def recording(ticket):
+        wait = try_admit(ticket)
+        if ticket.model == "fast":
+            admitted.append(wait)
+        return wait
+
+    scheduler._try_admit = recording
+    scheduler.acquire("fast", 10, priority=10)
+    # Admitted on its first check although a higher-priority call to "slow" waits about a minute
+    assert admitted == [0]
+    assert scheduler.stats()["queue_depth"] == 1
+
+
+def test_async_waiters_sleep_instead_of_polling():
+    scheduler = _exhausted()
+    attempts = []
+    try_admit = scheduler._try_admit
+
+    def counting(ticket):
+        attempts.append(ticket)
+        return try_admit(ticket)
+
+    scheduler._try_admit = counting
+
+    async def run():
+        waiters = [asyncio.ensure_future(scheduler.aacquire("slow", 10)) for _ in range(3)]
+        await asyncio.sleep(0.3)
+        await asyncio.wait_for(scheduler.aacquire("fast", 10), timeout=1.0)
+        for task in waiters:
+            task.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+    asyncio.run(run())
+    # One check per waiter on entry, plus the wake-up when "fast" was admitted; no 20 ms polling
+    assert len(attempts) <= 8
+    assert scheduler.stats()["queue_depth"] == 0
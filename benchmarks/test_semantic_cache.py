@@ -0,0 +1,26 @@
+# benchmarks/test_semantic_cache.py
+import itertools
+
+from semantic_cache import SemanticCache
+
+EXACT = {"platform": "Instagram", "model": "gpt-4o-mini"}
+
+
+def test_semantic_cache_add_when_full(benchmark):
+    """A full partition overwrites its oldest row in place instead of shifting the matrix."""
+    cache = SemanticCache(max_entries=2000)
+    for i in range(2000):
+        cache.add("caption", EXACT, {"title": f"warm {i}"}, f"warm {i}")
+    counter = itertools.count()
+    benchmark(lambda: cache.add("caption", EXACT, {"title": f"post {next(counter)}"}, "reply"))
+    assert cache.stats()["entries"] == 2000
+
+
+def test_semantic_cache_evicts_oldest():
+    cache = SemanticCache(max_entries=3)
+    for i in range(5):
+        cache.add("caption", EXACT, {"title": f"post number {i} about skills"}, f"reply {i}")
+    (partition,) = cache._partitions.values()
+    assert sorted(partition.responses) == ["reply 2", "reply 3", "reply 4"]
+    for i in (2, 3, 4):
+        assert cache.lookup("caption", EXACT, {"title": f"post number {i} about skills"}).response == f"reply {i}"
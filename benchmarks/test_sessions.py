@@ -0,0 +1,160 @@
+# benchmarks/test_sessions.py
+import json
+import os
+import random
+
+import pytest
+
+from agent import PlanItem
+from fake_llm import fake_plan
+from plan_columns import PlanColumns
+from session_store import SessionStore, migrate_json_sessions
+from utils import iter_session, load_session, load_session_columns, plan_to_dataframe, save_session
+
+
+@pytest.fixture(scope="module")
+def plan_items():
+    items = []
+    for seed in range(10):
+        text = fake_plan(range(1, 31), ["Instagram", "LinkedIn"], random.Random(seed))
+        for block in text.split("---")[1:-1]:
+            row = dict(line.split(": ", 1) for line in block.strip().splitlines())
+            items.append(PlanItem(**{k.lower().replace(" ", "_"): v for k, v in row.items()}))
+    return items
+
+
+def test_save_session(benchmark, plan_items, tmp_path):
+    path = benchmark(save_session, "bench", plan_items, str(tmp_path))
+    assert load_session(path) == plan_items
+
+
+def test_load_session(benchmark, plan_items, tmp_path):
+    path = save_session("bench", plan_items, str(tmp_path))
+    assert benchmark(load_session, path) == plan_items
+
+
+def test_iter_session(benchmark, plan_items, tmp_path):
+    path = save_session("bench", plan_items, str(tmp_path))
+    assert benchmark(lambda: list(iter_session(path))) == plan_items
+
+
+def test_load_session_columns(benchmark, plan_items, tmp_path):
+    path = save_session("bench", plan_items, str(tmp_path))
+    columns = benchmark(load_session_columns, path)
+    assert list(columns) == plan_items
+
+
+def test_plan_columns_to_dataframe(benchmark, plan_items):
+    columns = PlanColumns(plan_items * 10)
+    frame = benchmark(plan_to_dataframe, columns)
+    assert len(frame) == len(plan_items) * 10
+
+
+def test_session_store_write(benchmark, plan_items, tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"))
+
+    def save():
+        plan_id = store.start_plan("Bench")
+        for item in plan_items[:30]:
+            store.add_item(plan_id, item)
+        store.finish_plan(plan_id)
+        return plan_id
+
+    plan_id = benchmark(save)
+    assert store.load_plan(plan_id) == plan_items[:30]
+
+
+def test_session_store_read(benchmark, plan_items, tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"))
+    for brand in ["A", "B", "C"]:
+        store.save_plan(brand, plan_items)
+    items = benchmark(lambda: list(store.iter_items(brand="B", platform="LinkedIn")))
+    assert len(items) == sum(1 for i in plan_items if i.platform == "LinkedIn")
+
+
+def test_session_store_abort_plan(plan_items, tmp_path):
+    """A plan whose generation raised is not left looking in progress."""
+    store = SessionStore(str(tmp_path / "sessions.db"))
+    streamed = store.start_plan("brand")
+    store.add_items(streamed, plan_items[:7])
+    empty = store.start_plan("brand")
+    assert (store.abort_plan(streamed), store.abort_plan(empty)) == ("partial", "failed")
+    assert {p["id"]: (p["status"], p["item_count"]) for p in store.list_plans("brand")} == {
+        streamed: ("partial", 7), empty: ("failed", 0)
+    }
+    store.close()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1 << 16])
+def test_iter_session_records_across_chunks(tmp_path, chunk_size):
+    from utils import iter_session_records
+
+    records = [1, 22, 333, -4.5e3, "a, ]\"[", True, None, {"post_date": "Day 1", "idea_title": "Tips, [part 1]"}, [10, 20]]
+    path = tmp_path / "records.json"
+    path.write_text(json.dumps(records, indent=1), encoding="utf-8")
+    assert list(iter_session_records(str(path), chunk_size=chunk_size)) == records
+
+    path.write_text("[]", encoding="utf-8")
+    assert list(iter_session_records(str(path), chunk_size=chunk_size)) == []
+    for broken in ["[1, 22, 33", "[1, 22 33]", '[{"a": 1}', "{}"]:
+        path.write_text(broken, encoding="utf-8")
+        with pytest.raises(ValueError):
+            list(iter_session_records(str(path), chunk_size=chunk_size))
+
+
+def test_plan_columns_memory(plan_items):
+    """PlanColumns holds a fraction of the memory of the same items as PlanItem models."""
+    import tracemalloc
+
+    rows = [item.model_dump() for item in plan_items] * 10
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        models = [PlanItem(**row) for row in rows]
+        after_models = tracemalloc.get_traced_memory()[0]
+        columns = PlanColumns(rows)
+        after_columns = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert len(columns) == len(models) == 3000
+    assert after_columns - after_models < (after_models - before) / 4
+    # nbytes() accounts for what the columns actually allocate
+    assert columns.nbytes() <= after_columns - after_models < 2 * columns.nbytes()
+
+
+def test_migrate_json_sessions(plan_items, tmp_path):
+    sessions = tmp_path / "sessions"
+    originals = {
+        "Rooman_Skills_30_day_plan": plan_items[:30],
+        "Acme_30_day_plan": plan_items[30:60],
+    }
+    for name, items in originals.items():
+        save_session(name, items, str(sessions))
+    (sessions / "Truncated_30_day_plan.json").write_text(json.dumps([i.model_dump() for i in plan_items[:2]])[:-40])
+    (sessions / "NotAList_30_day_plan.json").write_text('{"post_date": "Day 1"}')
+    (sessions / "BadItem_30_day_plan.json").write_text(json.dumps([plan_items[0].model_dump(), {"post_date": "Day 2"}]))
+
+    store = SessionStore(str(tmp_path / "sessions.db"))
+    skipped = []
+    imported = migrate_json_sessions(store, str(sessions), skipped)
+    assert sorted(os.path.basename(path) for path, _ in imported) == ["Acme_30_day_plan.json", "Rooman_Skills_30_day_plan.json"]
+    assert sorted(os.path.basename(path) for path, _ in skipped) == [
+        "BadItem_30_day_plan.json", "NotAList_30_day_plan.json", "Truncated_30_day_plan.json"
+    ]
+    # Migrated plans match the files they came from; bad files leave nothing behind
+    plans = {p["brand"]: p for p in store.list_plans()}
+    assert set(plans) == {"Rooman Skills", "Acme"}
+    for name, items in originals.items():
+        plan = plans[name.replace("_30_day_plan", "").replace("_", " ")]
+        assert (plan["status"], plan["item_count"]) == ("complete", 30)
+        assert store.load_plan(plan["id"]) == items
+
+    # Re-running imports nothing new; a fixed file is picked up
+    assert migrate_json_sessions(store, str(sessions)) == []
+    save_session("Truncated_30_day_plan", plan_items[:2], str(sessions))
+    again = migrate_json_sessions(store, str(sessions))
+    assert [os.path.basename(path) for path, _ in again] == ["Truncated_30_day_plan.json"]
+    assert store.load_plan(again[0][1]) == plan_items[:2]
+    assert migrate_json_sessions(store, str(sessions)) == []
+    assert len(store.list_plans()) == 3
+    store.close()
@@ -0,0 +1,173 @@
+# benchmarks/test_singleflight.py
+"""Identical concurrent agent calls share one upstream request."""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from fake_llm import FakeChatModel
+from metrics import MetricsRegistry
+from singleflight import FlightAborted, SingleFlight
+
+LATENCY = 0.05
+CAPTION = dict(platform="Instagram", tone="Friendly", audience="Students", title="5 skills",
+               key_points="Skills", cta="Enroll", hashtags="#EdTech")
+BRIEF = dict(brand_name="Brand", niche="EdTech", audience="Students", tone="Friendly",
+             platforms=["Instagram"], goal="Sign-ups")
+
+
+class CountingChatModel(FakeChatModel):
+    def reply(self, messages) -> str:
+        self.metadata["calls"] = self.metadata.get("calls", 0) + 1
+        return super().reply(messages)
+
+
+def _agent(make_agent, **kwargs):
+    llm = CountingChatModel(latency=LATENCY, tokens_per_second=4000, metadata={})
+    return make_agent(llm=llm, metrics=MetricsRegistry(), singleflight=SingleFlight(), **kwargs), llm
+
+
+def test_concurrent_captions_coalesce(benchmark, make_agent):
+    agent, llm = _agent(make_agent)
+
+    def burst():
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            return list(pool.map(lambda _: agent.write_caption(**CAPTION), range(8)))
+
+    captions = benchmark.pedantic(burst, rounds=3)
+    assert len(set(captions)) == 1
+    assert llm.metadata["calls"] <= 3 * 2
+    row = agent.metrics.summary()[0]
+    assert row["calls"] == 24 and row["coalesced"] == 24 - llm.metadata["calls"]
+    assert agent.singleflight.stats()["in_flight"] == 0
+
+
+def test_async_captions_coalesce(make_agent):
+    agent, llm = _agent(make_agent)
+
+    async def burst():
+        return await asyncio.gather(*(agent.awrite_caption(**CAPTION) for _ in range(10)))
+
+    assert len(set(asyncio.run(burst()))) == 1
+    assert llm.metadata["calls"] == 1
+
+
+def test_coalescing_can_be_disabled(make_agent):
+    agent, llm = _agent(make_agent, coalesce=False)
+
+    async def burst():
+        return await asyncio.gather(*(agent.awrite_caption(**CAPTION) for _ in range(4)))
+
+    asyncio.run(burst())
+    assert llm.metadata["calls"] == 4
+
+
+def test_streamed_plan_followers_get_every_item(make_agent):
+    """Followers joining mid-stream replay the chunks they missed; the leader stopping early does not cut them off."""
+    agent, llm = _agent(make_agent)
+    llm.tokens_per_second = 2000
+    results = []
+    start = threading.Barrier(3)
+
+    def read(limit):
+        start.wait()
+        results.append(list(agent.stream_30_day_plan(**BRIEF, days=limit)))
+
+    threads = [threading.Thread(target=read, args=(limit,)) for limit in (5, 30, 30)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(len(items) for items in results) == [5, 30, 30]
+    assert llm.metadata["calls"] == 1
+
+
+def test_leader_error_and_cancellation_reach_followers():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait()
+        raise ValueError("upstream failed")
+
+    errors = []
+
+    def follower():
+        try:
+            flights.do("k", lambda: "unused")
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=lambda: pytest.raises(ValueError, flights.do, "k", fail))
+    leader.start()
+    while flights.stats()["in_flight"] == 0:
+        time.sleep(0.001)
+    followers = [threading.Thread(target=follower) for _ in range(3)]
+    for t in followers:
+        t.start()
+    while flights.stats()["coalesced"] < 3:
+        time.sleep(0.001)
+    release.set()
+    for t in [leader, *followers]:
+        t.join()
+    assert len(errors) == 3
+
+    async def cancelled():
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+
+        leader = asyncio.ensure_future(flights.ado("c", slow))
+        await started.wait()
+        follower = asyncio.ensure_future(flights.ado("c", slow))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(FlightAborted):
+            await follower
+
+    asyncio.run(cancelled())
+
+
+def _mixed_modes(make_agent, leader, follower):
+    agent, llm = _agent(make_agent)
+    started = threading.Event()
+    results = {}
+
+    def run(name, fn):
+        results[name] = fn()
+
+    first = threading.Thread(target=run, args=("leader", lambda: leader(agent, started)))
+    first.start()
+    started.wait()
+    run("follower", lambda: follower(agent))
+    first.join()
+    return results, llm
+
+
+def test_streaming_leader_with_blocking_follower(make_agent):
+    def leader(agent, started):
+        sections = agent.stream_repurpose("Instagram", "Original caption", ["LinkedIn", "Twitter"])
+        first = next(sections)
+        started.set()
+        return dict([first, *sections])
+
+    results, llm = _mixed_modes(make_agent, leader, lambda agent: agent.repurpose("Instagram", "Original caption", ["LinkedIn", "Twitter"]))
+    assert results["leader"] == results["follower"] and set(results["follower"]) == {"LinkedIn", "Twitter"}
+    # Different call modes never share a flight
+    assert llm.metadata["calls"] == 2
+
+
+def test_blocking_leader_with_streaming_follower(make_agent):
+    def leader(agent, started):
+        threading.Timer(LATENCY / 5, started.set).start()
+        return agent.repurpose("Instagram", "Original caption", ["LinkedIn", "Twitter"])
+
+    results, llm = _mixed_modes(
+        make_agent, leader, lambda agent: dict(agent.stream_repurpose("Instagram", "Original caption", ["LinkedIn", "Twitter"]))
+    )
+    assert results["leader"] == results["follower"] and set(results["follower"]) == {"LinkedIn", "Twitter"}
+    assert llm.metadata["calls"] == 2
@@ -0,0 +1,91 @@
+# benchmarks/test_startup.py
+"""Cold-start check for app.py against startup_budget.json.
+
+A fresh interpreter imports app.py's top-level modules and then renders the
+app twice through Streamlit's AppTest. The heavy dependencies listed in
+`lazy_modules` must not be in sys.modules after either step. Timings
+(import_s, first_render_s, rerun_s) only have to stay within `tolerance`
+times the stored `baseline_s`: loose enough for noisy shared machines, tight
+enough to catch a heavy import creeping back into startup. Set
+STARTUP_TOLERANCE to loosen it further on slow hardware.
+"""
+import ast
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_budget.json"), encoding="utf-8") as f:
+    BUDGET = json.load(f)
+TOLERANCE = float(os.getenv("STARTUP_TOLERANCE", BUDGET["tolerance"]))
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+import streamlit
+started = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+import_s = time.perf_counter() - started
+loaded_by_import = [m for m in {lazy!r} if m in sys.modules]
+
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app!r}, default_timeout=60)
+started = time.perf_counter()
+at.run()
+first_render_s = time.perf_counter() - started
+started = time.perf_counter()
+at.run()
+rerun_s = time.perf_counter() - started
+print(json.dumps({{
+    "import_s": import_s,
+    "first_render_s": first_render_s,
+    "rerun_s": rerun_s,
+    "exception": [str(e.value) for e in at.exception],
+    "loaded_by_import": loaded_by_import,
+    "loaded": [m for m in {lazy!r} if m in sys.modules],
+}}))
+"""
+
+
+def _top_level_imports(path: str):
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+    return modules
+
+
+@pytest.fixture(scope="module")
+def startup(tmp_path_factory):
+    script = PROBE.format(root=ROOT, app=APP, modules=_top_level_imports(APP), lazy=BUDGET["lazy_modules"])
+    env = dict(os.environ, SESSION_DB_PATH=str(tmp_path_factory.mktemp("startup") / "sessions.db"))
+    env.pop("LLM_METRICS_PORT", None)
+    out = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+    assert out.returncode == 0, out.stderr
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    sys.stdout.write(f"\nstartup: {json.dumps({k: v for k, v in result.items() if k.endswith('_s')})}\n")
+    return result
+
+
+def test_first_render_succeeds(startup):
+    assert startup["exception"] == []
+
+
+@pytest.mark.parametrize("stage", ["loaded_by_import", "loaded"])
+def test_heavy_modules_stay_lazy(startup, stage):
+    assert startup[stage] == [], f"imported at startup: {startup[stage]}"
+
+
+@pytest.mark.parametrize("stage", sorted(BUDGET["baseline_s"]))
+def test_startup_within_tolerance(startup, stage):
+    limit = BUDGET["baseline_s"][stage] * TOLERANCE
+    assert startup[stage] < limit, f"{stage} took {startup[stage]:.3f}s, over {TOLERANCE:g}x the {BUDGET['baseline_s'][stage]}s baseline"
@@ -0,0 +1,45 @@
+# benchmarks/test_state.py
+from state import STORE_LIMITS, ArtifactStore, _approx_size, get_store
+
+
+def test_evicts_least_recently_used_past_max_items():
+    store = ArtifactStore(max_items=3, max_bytes=10 ** 9)
+    for key in "abc":
+        store.put(key, key * 10)
+    assert store.get("a") == "a" * 10  # now the most recently used
+    store.put("d", "d" * 10)
+    assert [key for key, _ in store.items()] == ["c", "a", "d"]
+    assert "b" not in store and store.get("b") is None
+    # Replacing an entry refreshes it without evicting anything
+    store.put("c", "C" * 10)
+    assert [key for key, _ in store.items()] == ["a", "d", "c"] and store.latest() == "C" * 10
+
+
+def test_evicts_oldest_past_max_bytes():
+    value = "x" * 1000
+    size = _approx_size(value)
+    store = ArtifactStore(max_items=100, max_bytes=3 * size)
+    for i in range(5):
+        store.put(f"k{i}", value)
+    assert [key for key, _ in store.items()] == ["k2", "k3", "k4"]
+    assert store.bytes == 3 * size
+    assert store.pop("k3") == value and store.bytes == 2 * size
+
+
+def test_newest_entry_is_kept_even_if_over_budget():
+    store = ArtifactStore(max_items=5, max_bytes=100)
+    store.put("small", "s")
+    store.put("big", "b" * 10_000)
+    assert [key for key, _ in store.items()] == ["big"]
+    assert store.bytes == _approx_size("b" * 10_000)
+
+
+def test_get_store_uses_per_kind_limits():
+    session_state = {}
+    captions = get_store(session_state, "captions")
+    assert get_store(session_state, "captions") is captions
+    assert (captions.max_items, captions.max_bytes) == STORE_LIMITS["captions"]
+    for i in range(STORE_LIMITS["captions"][0] + 5):
+        captions.put(f"caption {i}", f"text {i}")
+    assert len(captions) == STORE_LIMITS["captions"][0]
+    assert "caption 4" not in captions and "caption 5" in captions
@@ -0,0 +1,213 @@
+# cache.py
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "llm_responses.db")
+# Both tiers expire entries by age; a week unless configured otherwise
+DEFAULT_TTL = 7 * 24 * 3600
+
+
+def cache_key(system_prompt: str, human_prompt: str, model: str, temperature: float) -> str:
+    """Content address of one LLM request: identical inputs give identical keys."""
+    payload = json.dumps([system_prompt, human_prompt, model, temperature], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryCache:
+    """Thread-safe in-memory LRU with optional TTL (seconds)."""
+
+    def __init__(self, max_entries: int = 512, ttl: Optional[float] = DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, created_at = entry
+            if self.ttl is not None and time.time() - created_at > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, created_at: Optional[float] = None):
+        with self._lock:
+            self._data[key] = (value, created_at or time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """On-disk cache tier. Evicts expired rows and least recently used rows over max_entries."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = 10000, ttl: Optional[float] = DEFAULT_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened lazily so agents that never cache do not create a file
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[tuple]:
+        """Return (value, created_at) or None."""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if self.ttl is not None and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            return row[0], row[1]
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._writes += 1
+            # Size eviction is amortised over writes rather than run on every insert
+            if self._writes % 50 == 0:
+                self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        if self.ttl is not None:
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+
+
+class ResponseCache:
+    """In-memory LRU in front of an optional SQLite tier, with hit/miss counters.
+
+    The default memory tier expires entries after the disk tier's TTL.
+    """
+
+    def __init__(self, memory: Optional[MemoryCache] = None, disk: Optional[SQLiteCache] = None, enabled: bool = True):
+        # Not `memory or ...`: an empty MemoryCache is falsy (it has __len__)
+        if memory is None:
+            memory = MemoryCache(ttl=disk.ttl if disk is not None else DEFAULT_TTL)
+        self.memory = memory
+        self.disk = disk
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self._lock = threading.Lock()
+
+    def _count(self, **increments: int):
+        with self._lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        value = self.memory.get(key)
+        if value is not None:
+            self._count(hits=1, memory_hits=1)
+            return value
+        if self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                value, created_at = entry
+                # Promote to memory, keeping the original age for the TTL
+                self.memory.set(key, value, created_at)
+                self._count(hits=1, disk_hits=1)
+                return value
+        self._count(misses=1)
+        return None
+
+    def set(self, key: str, value: str):
+        if not self.enabled:
+            return
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            hits, misses, memory_hits, disk_hits = self.hits, self.misses, self.memory_hits, self.disk_hits
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "memory_hits": memory_hits,
+            "disk_hits": disk_hits,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+        }
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache() -> ResponseCache:
+    """Process-wide cache shared by all agents. LLM_CACHE_DISABLED=1 turns it off."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache(
+                disk=SQLiteCache(os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH)),
+                enabled=os.getenv("LLM_CACHE_DISABLED", "") not in ("1", "true", "yes"),
+            )
+        return _default_cache
@@ -0,0 +1,208 @@
+# export.py
+import json
+import uuid
+import hashlib
+from datetime import date, timedelta
+from typing import List, Optional, Sequence, Union
+
+import pandas as pd
+
+from agent import PLAN_FIELDS, CaptionResult, PlanItem, _day_number
+from plan_columns import PlanColumns
+from realtime_utils import FEATURE_COLUMNS, analyze_captions_batch
+from utils import plan_to_dataframe
+
+PARTITION_COLUMNS = ["brand", "month"]
+DICTIONARY_COLUMNS = ["platform", "post_type"]
+EXPORT_FORMATS = {"parquet": "parquet", "arrow": "ipc"}
+
+# Fixed nullable dtypes so every export has the same schema, with or without captions
+FEATURE_DTYPES = {column: "boolean" if column.startswith("has_") else "Int64" for column in FEATURE_COLUMNS}
+FEATURE_DTYPES["engagement_score"] = "Float64"
+
+
+def _pa():
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ImportError("Parquet/Arrow export needs pyarrow: pip install pyarrow") from e
+    return pa
+
+
+def plan_export_frame(
+    items: Union[List[PlanItem], PlanColumns],
+    brand: str,
+    start_date: Optional[date] = None,
+    captions: Optional[Sequence[CaptionResult]] = None,
+    plan_id: Optional[int] = None,
+) -> pd.DataFrame:
+    """One row per plan item with its scheduled date, caption and caption analysis features.
+
+    Day N is scheduled on `start_date` + N - 1 (default today); the month of that
+    date is the partition key. Feature columns are null where there is no caption.
+    """
+    start_date = start_date or date.today()
+    df = plan_to_dataframe(items)
+    days = df["post_date"].astype(str).map(_day_number)
+    scheduled = [start_date + timedelta(days=(d or 1) - 1) for d in days]
+
+    df.insert(0, "brand", brand)
+    df.insert(1, "plan_id", pd.array([plan_id] * len(df), dtype="Int64"))
+    df.insert(2, "day", pd.array(days.tolist(), dtype="Int64"))
+    df.insert(3, "scheduled_date", scheduled)
+    df.insert(4, "month", [d.strftime("%Y-%m") for d in scheduled])
+
+    by_post = {(c.post_date, c.platform): c for c in captions or []}
+    matched = [by_post.get((p, pl)) for p, pl in zip(df["post_date"].astype(str), df["platform"].astype(str))]
+    df["caption"] = [c.caption if c else None for c in matched]
+    df["caption_error"] = [c.error if c else None for c in matched]
+
+    has_caption = df["caption"].notna()
+    features = pd.DataFrame(index=df.index, columns=list(FEATURE_DTYPES))
+    if has_caption.any():
+        features = analyze_captions_batch(
+            df.loc[has_caption, "caption"], df.loc[has_caption, "platform"].astype(str)
+        ).reindex(df.index)
+    for column, dtype in FEATURE_DTYPES.items():
+        df[column] = features[column].astype(object).where(features[column].notna(), None).astype(dtype)
+    return df
+
+
+def export_key(
+    items: Union[List[PlanItem], PlanColumns],
+    brand: str,
+    start_date: Optional[date] = None,
+    captions: Optional[Sequence[CaptionResult]] = None,
+    plan_id: Optional[int] = None,
+) -> str:
+    """Hash of every plan_export_frame input, so a prepared export can be reused until one changes."""
+    payload = json.dumps(
+        [
+            brand,
+            plan_id,
+            (start_date or date.today()).isoformat(),
+            [item.model_dump() for item in items],
+            [c.model_dump() for c in captions or []],
+        ],
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def export_schema():
+    """Arrow schema of plan_export_frame output; platform and post_type are dictionary encoded."""
+    pa = _pa()
+    fields = [
+        ("brand", pa.string()),
+        ("plan_id", pa.int64()),
+        ("day", pa.int64()),
+        ("scheduled_date", pa.date32()),
+        ("month", pa.string()),
+    ]
+    for name in PLAN_FIELDS:
+        fields.append((name, pa.dictionary(pa.int32(), pa.string()) if name in DICTIONARY_COLUMNS else pa.string()))
+    fields += [("caption", pa.string()), ("caption_error", pa.string())]
+    for name, dtype in FEATURE_DTYPES.items():
+        fields.append((name, {"boolean": pa.bool_(), "Int64": pa.int64(), "Float64": pa.float64()}[dtype]))
+    return pa.schema(fields)
+
+
+def to_arrow_table(df: pd.DataFrame):
+    pa = _pa()
+    schema = export_schema()
+    columns = []
+    for field in schema:
+        values = df[field.name].astype(object).where(df[field.name].notna(), None)
+        if pa.types.is_dictionary(field.type):
+            columns.append(pa.array(values, type=pa.string()).dictionary_encode())
+        else:
+            columns.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def write_dataset(df: pd.DataFrame, root: str, format: str = "parquet") -> List[str]:
+    """Append `df` to a hive-partitioned dataset under `root` (brand=.../month=...).
+
+    Each call writes new files with a unique name, so concurrent or repeated
+    exports never overwrite each other. Returns the written file paths.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {format!r}; expected one of {sorted(EXPORT_FORMATS)}")
+    pa = _pa()
+    import pyarrow.dataset as ds
+
+    table = to_arrow_table(df)
+    partitioning = ds.partitioning(pa.schema([table.schema.field(name) for name in PARTITION_COLUMNS]), flavor="hive")
+    written: List[str] = []
+    ds.write_dataset(
+        table,
+        root,
+        format=EXPORT_FORMATS[format],
+        partitioning=partitioning,
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.{format}",
+        existing_data_behavior="overwrite_or_ignore",
+        file_visitor=lambda f: written.append(f.path),
+    )
+    return written
+
+
+def to_parquet_bytes(df: pd.DataFrame) -> bytes:
+    """Single Parquet file in memory, for downloads."""
+    _pa()
+    import pyarrow.parquet as pq
+    import io
+
+    buffer = io.BytesIO()
+    pq.write_table(to_arrow_table(df), buffer, compression="zstd")
+    return buffer.getvalue()
+
+
+def read_dataset(root: str, format: str = "parquet", **filters) -> pd.DataFrame:
+    """Read an exported dataset back, e.g. read_dataset(root, brand="Rooman Skills", month="2026-10")."""
+    pa = _pa()
+    import pyarrow.dataset as ds
+
+    schema = export_schema()
+    partitioning = ds.partitioning(pa.schema([schema.field(name) for name in PARTITION_COLUMNS]), flavor="hive")
+    dataset = ds.dataset(root, schema=schema, format=EXPORT_FORMATS[format], partitioning=partitioning)
+    expression = None
+    for name, value in filters.items():
+        term = ds.field(name) == value
+        expression = term if expression is None else expression & term
+    return dataset.to_table(filter=expression).to_pandas()
+
+
+def export_saved_plans(store, root: str, brand: Optional[str] = None, format: str = "parquet", page_size: int = 100) -> int:
+    """Write every plan in a SessionStore to the dataset, scheduled from each plan's creation date.
+
+    Returns the number of plans exported.
+    """
+    exported = 0
+    offset = 0
+    while True:
+        plans = store.list_plans(brand=brand, limit=page_size, offset=offset)
+        if not plans:
+            return exported
+        for plan in plans:
+            items = PlanColumns(store.iter_items(plan_id=plan["id"]))
+            if len(items):
+                start = date.fromtimestamp(plan["created_at"])
+                write_dataset(plan_export_frame(items, plan["brand"], start, plan_id=plan["id"]), root, format)
+                exported += 1
+        offset += page_size
+
+
+if __name__ == "__main__":
+    import argparse
+    from session_store import DEFAULT_SESSION_DB, SessionStore
+
+    parser = argparse.ArgumentParser(description="Export saved plans to a brand/month partitioned dataset.")
+    parser.add_argument("root", help="Output directory")
+    parser.add_argument("--db", default=DEFAULT_SESSION_DB)
+    parser.add_argument("--brand")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="parquet")
+    args = parser.parse_args()
+
+    count = export_saved_plans(SessionStore(args.db), args.root, brand=args.brand, format=args.format)
+    print(f"Exported {count} plan(s) to {args.root}")
@@ -0,0 +1,348 @@
+# fake_llm.py
+"""Offline chat models for benchmarks and local development.
+
+FakeChatModel answers plan (text or JSON), caption and repurpose prompts with well-formed,
+deterministic replies. ReplayChatModel serves responses captured from a real
+model by RecordingChatModel. Both simulate latency (time to first token) and a
+token rate, for invoke, ainvoke, stream and astream alike:
+
+    agent = SocialAgent(llm=FakeChatModel(latency=0.2, tokens_per_second=80))
+"""
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import itertools
+import threading
+from typing import Any, Dict, Iterable, Iterator, AsyncIterator, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from scheduler import estimate_tokens
+
+_TOKEN = re.compile(r"\S+\s*|\s+")
+_DAY_RANGE = re.compile(r"Day (\d+) to Day (\d+)")
+_DAY_LIST = re.compile(r"^Days to write: *(.*)$", re.MULTILINE)
+_FIELD = re.compile(r"^(Platform|Platforms|Tone|Audience|Title|CTA|Hashtags|Target Platforms): *(.*)$", re.MULTILINE)
+
+POST_TYPES = ["Carousel", "Reel", "Static Post", "Story", "Article", "Poll", "Video"]
+HOOKS = ["Stop scrolling.", "Here's the truth:", "Most people miss this.", "Quick question:", "Real talk:"]
+
+
+def messages_key(messages: List[BaseMessage]) -> str:
+    """Stable key for a prompt: the role and content of every message."""
+    payload = json.dumps([[m.type, m.content] for m in messages], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def split_tokens(text: str) -> List[str]:
+    """Word-ish stream chunks (a word plus its trailing whitespace), roughly one per token."""
+    return _TOKEN.findall(text)
+
+
+def _fields(prompt: str) -> Dict[str, str]:
+    return {key: value.strip() for key, value in _FIELD.findall(prompt)}
+
+
+def _fake_posts(days: Iterable[int], platforms: List[str], rng: random.Random) -> List[Dict[str, Any]]:
+    posts = []
+    for day in days:
+        topic = rng.choice(["skills", "careers", "projects", "interviews", "portfolios", "networking"])
+        posts.append({
+            "d": day,
+            "p": platforms[(day - 1) % len(platforms)],
+            "t": rng.choice(POST_TYPES),
+            "i": f"Day {day}: {rng.randint(3, 9)} ways to level up your {topic}",
+            "k": f"Start small, Practice on real {topic}, Share progress weekly",
+            "c": rng.choice(["Enroll today", "Comment below", "Link in bio", "Save this post"]),
+            "h": f"#{topic.title()} #Learning #Growth #India",
+        })
+    return posts
+
+
+def fake_plan(days: Iterable[int], platforms: List[str], rng: random.Random) -> str:
+    blocks = [
+        "---\n"
+        f"Post Date: Day {post['d']}\n"
+        f"Platform: {post['p']}\n"
+        f"Post Type: {post['t']}\n"
+        f"Idea Title: {post['i']}\n"
+        f"Key Points: {post['k']}\n"
+        f"CTA: {post['c']}\n"
+        f"Hashtags: {post['h']}\n"
+        for post in _fake_posts(days, platforms, rng)
+    ]
+    return "\n".join(blocks) + "---\n"
+
+
+def fake_plan_json(days: Iterable[int], platforms: List[str], rng: random.Random) -> str:
+    """The compact JSON document requested by the JSON plan templates."""
+    posts = _fake_posts(days, platforms, rng)
+    return json.dumps({"posts": posts}, ensure_ascii=False, separators=(",", ":"))
+
+
+def fake_caption(fields: Dict[str, str], rng: random.Random) -> str:
+    title = fields.get("Title", "Your next step")
+    cta = fields.get("CTA", "Link in bio")
+    return (
+        f"{rng.choice(HOOKS)} {title} 🚀\n\n"
+        "✅ Pick one skill and go deep\n"
+        "✅ Build something you can show\n"
+        "✅ Share what you learn every week\n\n"
+        f"What's stopping you? {cta}.\n\n"
+        f"{fields.get('Hashtags', '#Learning #Growth')}"
+    )
+
+
+def fake_repurpose(fields: Dict[str, str], rng: random.Random) -> str:
+    sections = []
+    for platform in [p.strip() for p in fields.get("Target Platforms", "Twitter").split(",") if p.strip()]:
+        sections.append(f"[{platform}]:\n{rng.choice(HOOKS)} A {platform}-ready take on the original post. Link in bio. #Growth")
+    return "\n\n".join(sections)
+
+
+class _Load:
+    """Calls in progress and the most seen at once; used as `with load:` around a call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+
+    def __enter__(self):
+        with self._lock:
+            self.active += 1
+            self.calls += 1
+            self.peak = max(self.peak, self.active)
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self.active -= 1
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic offline replies shaped like the real prompts expect.
+
+    `latency` is the delay before the first token; `tokens_per_second` paces the
+    rest of the reply (None returns it at once). Every `stall_every`-th call
+    waits an extra `stall` seconds first, to simulate a stalled endpoint.
+    Replies depend only on the prompt and `seed`, so runs are reproducible.
+    `call_count` and `peak_concurrency` let tests check how calls overlapped
+    without timing them.
+    """
+
+    latency: float = 0.0
+    tokens_per_second: Optional[float] = None
+    seed: int = 0
+    model_name: str = "fake-social"
+    stall_every: int = 0
+    stall: float = 0.0
+    _calls: Any = PrivateAttr(default_factory=itertools.count)
+    _load: Any = PrivateAttr(default_factory=_Load)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-social"
+
+    @property
+    def call_count(self) -> int:
+        return self._load.calls
+
+    @property
+    def peak_concurrency(self) -> int:
+        """Most calls (including streams still being read) in progress at once."""
+        return self._load.peak
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, "seed": self.seed}
+
+    def reply(self, messages: List[BaseMessage]) -> str:
+        prompt = messages[-1].content
+        rng = random.Random(f"{self.seed}:{messages_key(messages)}")
+        fields = _fields(prompt)
+        if "Target Platforms:" in prompt:
+            return fake_repurpose(fields, rng)
+        if "Write a single caption" in prompt:
+            return fake_caption(fields, rng)
+        platforms = [p.strip() for p in fields.get("Platforms", "Instagram").split(",") if p.strip()] or ["Instagram"]
+        day_list = _DAY_LIST.search(prompt)
+        day_range = _DAY_RANGE.search(prompt)
+        if day_list:
+            days = [int(day) for day in re.findall(r"\d+", day_list.group(1))]
+        elif day_range:
+            days = list(range(int(day_range.group(1)), int(day_range.group(2)) + 1))
+        else:
+            days = list(range(1, 31))
+        if '"posts"' in prompt:
+            return fake_plan_json(days, platforms, rng)
+        return fake_plan(days, platforms, rng)
+
+    def _usage(self, messages: List[BaseMessage], text: str) -> Dict[str, int]:
+        prompt_tokens = sum(estimate_tokens(m.content) for m in messages)
+        completion_tokens = len(split_tokens(text))
+        return {"input_tokens": prompt_tokens, "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    def _first_token_delay(self) -> float:
+        call = next(self._calls) + 1
+        if self.stall_every and call % self.stall_every == 0:
+            return self.latency + self.stall
+        return self.latency
+
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text = self.reply(messages)
+        with self._load:
+            time.sleep(self._first_token_delay() + self._token_delay() * len(split_tokens(text)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=self._usage(messages, text)))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text = self.reply(messages)
+        with self._load:
+            await asyncio.sleep(self._first_token_delay() + self._token_delay() * len(split_tokens(text)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=self._usage(messages, text)))])
+
+    def _stream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        text = self.reply(messages)
+        delay = self._token_delay()
+        with self._load:
+            time.sleep(self._first_token_delay())
+            for token in split_tokens(text):
+                if delay:
+                    time.sleep(delay)
+                chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+                if run_manager:
+                    run_manager.on_llm_new_token(token, chunk=chunk)
+                yield chunk
+        # Like OpenAI with stream_usage, token counts arrive on a final empty chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, text)))
+
+    async def _astream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        text = self.reply(messages)
+        delay = self._token_delay()
+        with self._load:
+            await asyncio.sleep(self._first_token_delay())
+            for token in split_tokens(text):
+                if delay:
+                    await asyncio.sleep(delay)
+                chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+                if run_manager:
+                    await run_manager.on_llm_new_token(token, chunk=chunk)
+                yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, text)))
+
+
+def load_cassette(path: str) -> Dict[str, str]:
+    """{messages_key: response} from a JSONL file written by RecordingChatModel.
+
+    A complete response wins over a stream the caller stopped reading early.
+    """
+    responses = {}
+    partial = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                key = record["key"]
+                if record.get("partial") and key in responses and key not in partial:
+                    continue
+                responses[key] = record["response"]
+                if record.get("partial"):
+                    partial.add(key)
+                else:
+                    partial.discard(key)
+    return responses
+
+
+class ReplayChatModel(FakeChatModel):
+    """Serve recorded responses, keyed by the exact prompt.
+
+    Unknown prompts raise KeyError, or fall back to the generated fake reply
+    when `fallback` is set.
+    """
+
+    cassette: str
+    fallback: bool = False
+    responses: Dict[str, str] = {}
+
+    def __init__(self, **data):
+        super().__init__(**data)
+        self.responses = load_cassette(self.cassette)
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def reply(self, messages: List[BaseMessage]) -> str:
+        key = messages_key(messages)
+        if key in self.responses:
+            return self.responses[key]
+        if self.fallback:
+            return super().reply(messages)
+        raise KeyError(f"No recorded response for prompt {key[:12]} in {self.cassette}")
+
+
+_cassette_lock = threading.Lock()
+
+
+class RecordingChatModel(BaseChatModel):
+    """Pass calls through to `inner` and append every completed response to a JSONL cassette."""
+
+    inner: BaseChatModel
+    cassette: str
+
+    @property
+    def _llm_type(self) -> str:
+        return "recording"
+
+    def _record(self, messages: List[BaseMessage], text: str, partial: bool = False):
+        record = {"key": messages_key(messages), "response": text}
+        if partial:
+            record["partial"] = True
+        line = json.dumps(record, ensure_ascii=False)
+        with _cassette_lock, open(self.cassette, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        response = self.inner.invoke(messages, stop=stop, **kwargs)
+        self._record(messages, response.content)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=response.content, usage_metadata=response.usage_metadata))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        response = await self.inner.ainvoke(messages, stop=stop, **kwargs)
+        self._record(messages, response.content)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=response.content, usage_metadata=response.usage_metadata))])
+
+    def _stream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        parts = []
+        complete = False
+        try:
+            for chunk in self.inner.stream(messages, stop=stop, **kwargs):
+                parts.append(chunk.content)
+                yield ChatGenerationChunk(message=AIMessageChunk(content=chunk.content, usage_metadata=chunk.usage_metadata))
+            complete = True
+        finally:
+            # Callers such as stream_30_day_plan may stop reading once they have what they need
+            if parts:
+                self._record(messages, "".join(parts), partial=not complete)
+
+    async def _astream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        parts = []
+        complete = False
+        try:
+            async for chunk in self.inner.astream(messages, stop=stop, **kwargs):
+                parts.append(chunk.content)
+                yield ChatGenerationChunk(message=AIMessageChunk(content=chunk.content, usage_metadata=chunk.usage_metadata))
+            complete = True
+        finally:
+            if parts:
+                self._record(messages, "".join(parts), partial=not complete)
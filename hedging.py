@@ -0,0 +1,233 @@
+# hedging.py
+"""Hedged requests for tail-latency control.
+
+A hedged call starts on the primary model. If no first token has arrived
+after the hedge delay (a percentile of recent first-token latencies for that
+operation), a duplicate goes to the next fallback model (or the primary again).
+The first attempt to finish wins and the other is cancelled: its stream is
+closed, or its task cancelled on asyncio.
+
+    agent = SocialAgent(hedging=HedgingPolicy(percentile=0.95, fallbacks=[ChatOpenAI(model="gpt-4o")]))
+
+Every hedge is extra spend; stats() and MetricsRegistry count how often hedges
+fire and how often they win, to weigh that against the tail latency saved.
+"""
+import time
+import queue
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from metrics import _quantile
+
+# Interactive operations by default; hedging a 30-post plan would double a large bill
+HEDGED_OPERATIONS = ("caption", "repurpose")
+
+
+class AttemptSignal:
+    """Passed to each attempt: report the first token, and stop early once cancelled."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.ttft: Optional[float] = None
+        self._cancelled = threading.Event()
+
+    def first_token(self):
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.started
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+
+class HedgeCancelled(Exception):
+    """Raised inside an attempt that lost the race."""
+
+
+def model_label(llm: Any, default: str) -> str:
+    return getattr(llm, "model_name", None) or getattr(llm, "model", None) or default
+
+
+class HedgingPolicy:
+    """When to hedge, where to send the duplicate, and how it went.
+
+    The hedge delay is the `percentile` of the last `window` first-token
+    latencies of the operation, clamped to [min_delay, max_delay]; until
+    `min_samples` are seen, `initial_delay` is used. `fallbacks` are chat models
+    tried in turn for successive hedges; with none, the primary is asked again.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        fallbacks: Optional[List[Any]] = None,
+        operations: Iterable[str] = HEDGED_OPERATIONS,
+        initial_delay: float = 2.0,
+        min_delay: float = 0.05,
+        max_delay: float = 10.0,
+        min_samples: int = 20,
+        window: int = 512,
+    ):
+        self.percentile = percentile
+        self.fallbacks = list(fallbacks or [])
+        self.operations = set(operations)
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._next_fallback = 0
+        self._lock = threading.Lock()
+
+    def applies(self, operation: str) -> bool:
+        return operation in self.operations
+
+    def delay(self, operation: str) -> float:
+        with self._lock:
+            samples = sorted(self._samples.get(operation, ()))
+        if len(samples) < self.min_samples:
+            return self.initial_delay
+        return min(self.max_delay, max(self.min_delay, _quantile(samples, self.percentile)))
+
+    def observe(self, operation: str, ttft: float):
+        with self._lock:
+            samples = self._samples.get(operation)
+            if samples is None:
+                samples = self._samples[operation] = deque(maxlen=self.window)
+            samples.append(ttft)
+
+    def hedge_target(self, primary: Any) -> Any:
+        if not self.fallbacks:
+            return primary
+        with self._lock:
+            llm = self.fallbacks[self._next_fallback % len(self.fallbacks)]
+            self._next_fallback += 1
+        return llm
+
+    def _count(self, operation: str, **increments: int):
+        with self._lock:
+            counts = self._counts.setdefault(operation, {"calls": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0})
+            for key, value in increments.items():
+                counts[key] += value
+
+    def stats(self) -> List[Dict[str, float]]:
+        """One row per operation: calls, hedges fired, hedges that won, and the current delay."""
+        with self._lock:
+            counts = {op: dict(c) for op, c in self._counts.items()}
+        rows = []
+        for operation, c in sorted(counts.items()):
+            rows.append({
+                "operation": operation,
+                **c,
+                "hedge_rate": round(c["hedged"] / c["calls"], 3) if c["calls"] else 0.0,
+                "win_rate": round(c["hedge_wins"] / c["hedged"], 3) if c["hedged"] else 0.0,
+                "delay_s": round(self.delay(operation), 3),
+            })
+        return rows
+
+    def _record(self, operation: str, attempts: List[Tuple[Any, AttemptSignal]], winner: int, error: bool):
+        for _, signal in attempts:
+            if signal.ttft is not None:
+                self.observe(operation, signal.ttft)
+        hedged = len(attempts) > 1
+        self._count(
+            operation,
+            calls=1,
+            hedged=int(hedged),
+            hedge_wins=int(hedged and winner > 0),
+            # The primary failed and a hedge still answered
+            failovers=int(hedged and winner > 0 and error),
+        )
+
+    def run(
+        self, operation: str, primary: Any, attempt: Callable[[Any, AttemptSignal], Any]
+    ) -> Tuple[Any, bool, bool]:
+        """Call `attempt(llm, signal)` in worker threads, hedging once if needed.
+
+        Returns (result, hedged, hedge_won). A cancelled thread stops at its
+        next chunk; one stalled before its first chunk lingers until it wakes.
+        """
+        results: "queue.Queue[Tuple[int, Any, Optional[BaseException]]]" = queue.Queue()
+        attempts: List[Tuple[Any, AttemptSignal]] = []
+
+        def start(llm: Any):
+            index = len(attempts)
+            signal = AttemptSignal()
+            attempts.append((llm, signal))
+
+            def work():
+                try:
+                    results.put((index, attempt(llm, signal), None))
+                except BaseException as e:
+                    results.put((index, None, e))
+
+            threading.Thread(target=work, name=f"hedge-{operation}-{index}", daemon=True).start()
+
+        start(primary)
+        try:
+            index, result, error = results.get(timeout=self.delay(operation))
+        except queue.Empty:
+            index = None
+        if index is None:
+            if attempts[0][1].ttft is None:
+                start(self.hedge_target(primary))
+            index, result, error = results.get()
+
+        primary_error = error if index == 0 else None
+        pending = len(attempts) - 1
+        while error is not None and pending:
+            index, result, error = results.get()
+            pending -= 1
+        for i, (_, signal) in enumerate(attempts):
+            if i != index:
+                signal.cancel()
+        self._record(operation, attempts, index, primary_error is not None)
+        if error is not None:
+            raise primary_error or error
+        return result, len(attempts) > 1, index > 0
+
+    async def arun(
+        self, operation: str, primary: Any, attempt: Callable[[Any, AttemptSignal], Awaitable[Any]]
+    ) -> Tuple[Any, bool, bool]:
+        """asyncio version of run(); the losing task is cancelled."""
+        attempts: List[Tuple[Any, AttemptSignal]] = []
+        tasks: List[asyncio.Task] = []
+
+        def start(llm: Any):
+            signal = AttemptSignal()
+            attempts.append((llm, signal))
+            tasks.append(asyncio.ensure_future(attempt(llm, signal)))
+
+        start(primary)
+        deadline = time.perf_counter() + self.delay(operation)
+        # Poll for the first token; a done task ends the wait early
+        while not tasks[0].done() and attempts[0][1].ttft is None and time.perf_counter() < deadline:
+            await asyncio.wait(tasks, timeout=min(0.01, max(0.0, deadline - time.perf_counter())))
+        if not tasks[0].done() and attempts[0][1].ttft is None:
+            start(self.hedge_target(primary))
+
+        winner = None
+        primary_failed = False
+        pending = set(tasks)
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = tasks.index(task)
+                        break
+                    primary_failed = primary_failed or task is tasks[0]
+        finally:
+            for task in pending:
+                task.cancel()
+        self._record(operation, attempts, winner if winner is not None else 0, primary_failed)
+        if winner is None:
+            raise tasks[0].exception()
+        return tasks[winner].result(), len(attempts) > 1, winner > 0
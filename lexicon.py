@@ -0,0 +1,136 @@
+# lexicon.py
+import re
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Union
+
+# Text is tokenized into words in C; the automaton then steps once per word,
+# so every match starts and ends on a word boundary ('win' never matches 'window').
+_WORD = re.compile(r"\w+")
+
+
+class LexiconMatch(NamedTuple):
+    term: str
+    category: str
+    start: int
+    end: int
+
+
+class Lexicon:
+    """Aho-Corasick automaton over word tokens for a fixed keyword list.
+
+    `terms` is either a list of keywords or a {category: keywords} dict.
+    Multi-word terms ("link in bio") are supported. All matches are found in a
+    single left-to-right scan, independent of how many terms there are.
+    """
+
+    def __init__(self, terms: Union[Iterable[str], Dict[str, Iterable[str]]]):
+        categories = terms if isinstance(terms, dict) else {"": terms}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[tuple]] = [[]]
+        self.size = 0
+        for category, words in categories.items():
+            for term in words:
+                self._add(term, category)
+        self._build()
+
+    def _add(self, term: str, category: str):
+        tokens = _WORD.findall(term.lower())
+        if not tokens:
+            return
+        state = 0
+        for token in tokens:
+            nxt = self._goto[state].get(token)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][token] = nxt
+            state = nxt
+        self._out[state].append((term, category, len(tokens)))
+        self.size += 1
+
+    def _build(self):
+        # Depth-1 states fail to the root; deeper ones follow their parent's failure chain
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self._goto[state].items():
+                queue.append(nxt)
+                self._fail[nxt] = self._step(self._fail[state], token)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def _step(self, state: int, token: str) -> int:
+        goto, fail = self._goto, self._fail
+        while state and token not in goto[state]:
+            state = fail[state]
+        return goto[state].get(token, 0)
+
+    def find_all(self, text: str) -> List[LexiconMatch]:
+        """Every (possibly overlapping) term occurrence with its character span."""
+        matches = []
+        starts = []
+        state = 0
+        for match in _WORD.finditer(text.lower()):
+            starts.append(match.start())
+            state = self._step(state, match.group())
+            for term, category, length in self._out[state]:
+                matches.append(LexiconMatch(term, category, starts[-length], match.end()))
+        return matches
+
+    def contains_any(self, text: str) -> bool:
+        state = 0
+        for token in _WORD.findall(text.lower()):
+            state = self._step(state, token)
+            if self._out[state]:
+                return True
+        return False
+
+    def terms_by_category(self, text: str) -> Dict[str, Set[str]]:
+        """Distinct matched terms grouped by category."""
+        found: Dict[str, Set[str]] = {}
+        state = 0
+        for token in _WORD.findall(text.lower()):
+            state = self._step(state, token)
+            for term, category, _ in self._out[state]:
+                found.setdefault(category, set()).add(term)
+        return found
+
+    def first_category(self, text: str, default: Optional[str] = None) -> Optional[str]:
+        """Category of the earliest match in the text."""
+        state = 0
+        for token in _WORD.findall(text.lower()):
+            state = self._step(state, token)
+            if self._out[state]:
+                return self._out[state][0][1]
+        return default
+
+
+# Matching is whole-word, so inflected forms are listed explicitly
+CTA_KEYWORDS = [
+    'link in bio', 'links in bio',
+    'click', 'clicks', 'clicking',
+    'visit', 'visits', 'visiting',
+    'sign up', 'signs up', 'signing up', 'signup', 'signups',
+    'register', 'registers', 'registering', 'registration', 'registrations',
+    'enroll', 'enrolls', 'enrolling', 'enrollment', 'enrol', 'enrolment',
+    'join', 'joins', 'joining',
+    'learn more',
+    'dm us', 'dm me',
+    'comment', 'comments', 'commenting',
+]
+
+SENTIMENT_KEYWORDS = {
+    "positive": ['great', 'amazing', 'excellent', 'love', 'best', 'awesome', 'fantastic', 'wonderful', 'success', 'win'],
+    "negative": ['bad', 'worst', 'hate', 'terrible', 'awful', 'fail', 'problem', 'issue', 'difficult', 'hard'],
+    "neutral": ['update', 'news', 'announcement', 'information', 'learn', 'know', 'understand'],
+}
+
+# Niche keys used by the hashtag tables in realtime_utils and advanced_features
+NICHE_KEYWORDS = {niche: [niche] for niche in ["edtech", "fitness", "food", "tech", "business"]}
+
+# Compiled once at import and shared by every caller
+CTA_LEXICON = Lexicon(CTA_KEYWORDS)
+SENTIMENT_LEXICON = Lexicon(SENTIMENT_KEYWORDS)
+NICHE_LEXICON = Lexicon(NICHE_KEYWORDS)
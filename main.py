@@ -1,28 +1,189 @@
-from dotenv import load_dotenv
+# main.py
+"""Interactive REPL for the social media agent on Vertex AI (Gemini).
+
+The Vertex client and model are set up once per process and every reply is
+streamed to stdout as it arrives. The conversation is kept across turns and
+trimmed, oldest turns first, to a token budget. `--offline` swaps in the
+local FakeChatModel, so the REPL runs without credentials or network:
+
+    python main.py              # Vertex, needs PROJECT_ID and google-cloud-aiplatform
+    python main.py --offline --timing
+"""
 import os
-from agent_config import AGENT_INSTRUCTIONS
-from vertexai.generative_models import GenerativeModel
-from vertexai import init
+import sys
+import time
+import argparse
+import threading
+from typing import Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from scheduler import estimate_tokens
 
 load_dotenv()
 
 PROJECT_ID = os.getenv("PROJECT_ID")
 LOCATION = "us-central1"
+MODEL_NAME = "gemini-1.5-flash"
+HISTORY_TOKENS = 6000
 
-def run_agent(user_input):
-    init(project=PROJECT_ID, location=LOCATION)
+Turn = Tuple[str, str]  # (role, text); role is "user" or "model"
 
-    model = GenerativeModel("gemini-1.5-flash")
 
-    full_prompt = f"{AGENT_INSTRUCTIONS}\nUser request: {user_input}"
+def load_instructions(offline: bool = False) -> str:
+    try:
+        from agent_config import AGENT_INSTRUCTIONS
+        return AGENT_INSTRUCTIONS
+    except ImportError:
+        if not offline:
+            raise
+        # The offline stand-in does not depend on the exact instructions
+        from prompts import SOCIAL_STRATEGY_SYSTEM
+        return SOCIAL_STRATEGY_SYSTEM
 
-    response = model.generate_content(full_prompt)
-    return response.text
 
-if __name__ == "__main__":
+class VertexBackend:
+    """One initialized Vertex client and GenerativeModel, reused for every turn."""
+
+    def __init__(self, instructions: str, model_name: str = MODEL_NAME,
+                 project: Optional[str] = PROJECT_ID, location: str = LOCATION):
+        try:
+            import vertexai
+            from vertexai.generative_models import Content, GenerativeModel, Part
+        except ImportError as e:
+            raise ImportError("The Vertex REPL needs google-cloud-aiplatform: pip install google-cloud-aiplatform") from e
+        vertexai.init(project=project, location=location)
+        self._content = Content
+        self._part = Part
+        self.model = GenerativeModel(model_name, system_instruction=instructions)
+
+    def stream(self, history: List[Turn]) -> Iterator[str]:
+        contents = [self._content(role=role, parts=[self._part.from_text(text)]) for role, text in history]
+        for chunk in self.model.generate_content(contents, stream=True):
+            # Safety-filtered or empty chunks have no text
+            if chunk.candidates and chunk.candidates[0].content.parts:
+                yield chunk.text
+
+
+class LocalBackend:
+    """Offline stand-in backed by fake_llm.FakeChatModel, with the same streaming interface."""
+
+    def __init__(self, instructions: str, latency: float = 0.05, tokens_per_second: Optional[float] = 200):
+        from fake_llm import FakeChatModel
+
+        self.instructions = instructions
+        self.model = FakeChatModel(latency=latency, tokens_per_second=tokens_per_second)
+
+    def stream(self, history: List[Turn]) -> Iterator[str]:
+        from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+        messages = [SystemMessage(content=self.instructions)]
+        messages += [HumanMessage(content=text) if role == "user" else AIMessage(content=text) for role, text in history]
+        for chunk in self.model.stream(messages):
+            if chunk.content:
+                yield chunk.content
+
+
+class ChatSession:
+    """Conversation state for the REPL.
+
+    History is trimmed before each request so that it fits in `max_history_tokens`
+    (local estimate); whole turns are dropped oldest first and the newest user
+    turn is always sent.
+    """
+
+    def __init__(self, backend, max_history_tokens: int = HISTORY_TOKENS):
+        self.backend = backend
+        self.max_history_tokens = max_history_tokens
+        self.history: List[Turn] = []
+        self.last_ttft: Optional[float] = None
+
+    def _trim(self):
+        total = sum(estimate_tokens(text) for _, text in self.history)
+        while len(self.history) > 1 and total > self.max_history_tokens:
+            total -= estimate_tokens(self.history.pop(0)[1])
+        # Gemini expects the conversation to open with a user turn
+        while len(self.history) > 1 and self.history[0][0] != "user":
+            self.history.pop(0)
+
+    def send(self, text: str) -> Iterator[str]:
+        """Stream the reply to `text`; the turn is added to history once the reply is complete."""
+        self.history.append(("user", text))
+        self._trim()
+        started = time.perf_counter()
+        self.last_ttft = None
+        parts = []
+        try:
+            for chunk in self.backend.stream(list(self.history)):
+                if self.last_ttft is None:
+                    self.last_ttft = time.perf_counter() - started
+                parts.append(chunk)
+                yield chunk
+        except BaseException:
+            # Keep history well-formed: a failed or interrupted turn is forgotten
+            self.history.pop()
+            raise
+        self.history.append(("model", "".join(parts)))
+
+
+_session: Optional[ChatSession] = None
+_session_lock = threading.Lock()
+
+
+def get_session(offline: bool = False) -> ChatSession:
+    """Process-wide session; the backend is created on first use only."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            instructions = load_instructions(offline)
+            backend = LocalBackend(instructions) if offline else VertexBackend(instructions)
+            _session = ChatSession(backend)
+        return _session
+
+
+def run_agent(user_input: str) -> str:
+    """Full reply to one message, continuing the shared conversation."""
+    return "".join(get_session(offline=os.getenv("AGENT_OFFLINE") == "1").send(user_input))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--offline", action="store_true", default=os.getenv("AGENT_OFFLINE") == "1",
+                        help="Use the local stand-in model (no credentials or network)")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--history-tokens", type=int, default=HISTORY_TOKENS,
+                        help="Token budget for the conversation sent with each turn")
+    parser.add_argument("--timing", action="store_true", help="Print time to first token after each reply")
+    args = parser.parse_args(argv)
+
+    instructions = load_instructions(args.offline)
+    started = time.perf_counter()
+    backend = LocalBackend(instructions) if args.offline else VertexBackend(instructions, model_name=args.model)
+    session = ChatSession(backend, max_history_tokens=args.history_tokens)
     print("✨ Social Media Agent Ready! ✨")
+    if args.timing:
+        print(f"(client ready in {time.perf_counter() - started:.2f}s)")
 
     while True:
-        text = input("\nYou: ")
-        output = run_agent(text)
-        print("\nAgent:", output)
+        try:
+            text = input("\nYou: ")
+        except (EOFError, KeyboardInterrupt):
+            print()
+            return
+        if not text.strip():
+            continue
+        print("\nAgent: ", end="", flush=True)
+        try:
+            for chunk in session.send(text):
+                sys.stdout.write(chunk)
+                sys.stdout.flush()
+        except KeyboardInterrupt:
+            print("\n(interrupted)")
+            continue
+        print()
+        if args.timing and session.last_ttft is not None:
+            print(f"(first token after {session.last_ttft:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+# metrics.py
+import os
+import math
+import time
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+# USD per 1M tokens (input, output); models not listed are reported with zero cost
+MODEL_PRICING = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+# Share of the input price charged for prompt tokens served from the provider's prefix cache
+CACHED_INPUT_DISCOUNT = 0.5
+
+QUANTILES = (0.5, 0.95, 0.99)
+# "coalesced": answered by an identical call already in flight (see singleflight.py)
+CACHE_STATUSES = ("off", "miss", "hit", "semantic", "coalesced")
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+    input_price, output_price = MODEL_PRICING.get(model, (0.0, 0.0))
+    billed_prompt = prompt_tokens - cached_tokens * (1 - CACHED_INPUT_DISCOUNT)
+    return (billed_prompt * input_price + completion_tokens * output_price) / 1_000_000
+
+
+def _quantile(values: List[float], q: float) -> float:
+    """Nearest-rank quantile of an already sorted list."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Series:
+    """Running totals plus a window of recent latencies for one (operation, model)."""
+
+    def __init__(self, window: int):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.wall_sum = 0.0
+        self.ttft_sum = 0.0
+        self.ttft_count = 0
+        self.cache = {status: 0 for status in CACHE_STATUSES}
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.wall = deque(maxlen=window)
+        self.ttft = deque(maxlen=window)
+
+
+class _ParseSeries:
+    """How well plan replies in one output format parsed, and what they cost."""
+
+    def __init__(self):
+        self.plans = 0
+        self.complete = 0
+        self.items_expected = 0
+        self.items_parsed = 0
+        self.completion_tokens = 0
+
+
+class CallTimer:
+    """Measures one agent call; create with MetricsRegistry.start()."""
+
+    def __init__(self, registry: "MetricsRegistry", operation: str, model: str):
+        self.registry = registry
+        self.operation = operation
+        self.model = model
+        self.started = time.perf_counter()
+        self.ttft: Optional[float] = None
+        self.cache = "off"
+        # Filled in by LLMScheduler.run/arun/stream
+        self.scheduler_stats: Dict[str, float] = {}
+
+    def first_token(self):
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.started
+
+    def finish(
+        self,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        cache: Optional[str] = None,
+        error: Optional[BaseException] = None,
+        cached_tokens: int = 0,
+    ):
+        wall = time.perf_counter() - self.started
+        self.registry.record(
+            self.operation,
+            self.model,
+            wall=wall,
+            ttft=self.ttft if self.ttft is not None else wall,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cached_tokens=cached_tokens,
+            retries=int(self.scheduler_stats.get("retries", 0)),
+            cache=cache or self.cache,
+            error=error is not None,
+        )
+
+
+class MetricsRegistry:
+    """Per-operation LLM call metrics with Prometheus text export.
+
+    Latency quantiles are computed over the last `window` calls of each
+    (operation, model) pair; counters cover the life of the process.
+    """
+
+    def __init__(self, window: int = 2048, export_path: Optional[str] = None, export_interval: float = 10.0):
+        self.window = window
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self._parses: Dict[str, _ParseSeries] = {}
+        self._lock = threading.Lock()
+        self._last_export = 0.0
+
+    def start(self, operation: str, model: str) -> CallTimer:
+        return CallTimer(self, operation, model)
+
+    def record(
+        self,
+        operation: str,
+        model: str,
+        wall: float,
+        ttft: float,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        retries: int = 0,
+        cache: str = "off",
+        error: bool = False,
+        cached_tokens: int = 0,
+    ):
+        with self._lock:
+            series = self._get_series(operation, model)
+            series.calls += 1
+            series.errors += int(error)
+            series.retries += retries
+            series.prompt_tokens += prompt_tokens
+            series.completion_tokens += completion_tokens
+            series.cached_tokens += cached_tokens
+            series.cost += estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens)
+            series.cache[cache] = series.cache.get(cache, 0) + 1
+            series.wall_sum += wall
+            series.wall.append(wall)
+            # Cached answers have no model latency; keep them out of the TTFT distribution
+            if cache in ("off", "miss") and not error:
+                series.ttft_sum += ttft
+                series.ttft_count += 1
+                series.ttft.append(ttft)
+        if self.export_path and time.monotonic() - self._last_export > self.export_interval:
+            self._last_export = time.monotonic()
+            self.write_prometheus(self.export_path)
+
+    def _get_series(self, operation: str, model: str) -> _Series:
+        series = self._series.get((operation, model))
+        if series is None:
+            series = self._series[(operation, model)] = _Series(self.window)
+        return series
+
+    def record_hedge(self, operation: str, model: str, won: bool):
+        """A hedged duplicate was sent for one call; `won` if it answered first."""
+        with self._lock:
+            series = self._get_series(operation, model)
+            series.hedges += 1
+            series.hedge_wins += int(won)
+
+    def record_parse(self, output_format: str, expected: int, parsed: int, completion_tokens: int):
+        """One parsed plan reply: items asked for, items recovered, output tokens spent."""
+        with self._lock:
+            series = self._parses.get(output_format)
+            if series is None:
+                series = self._parses[output_format] = _ParseSeries()
+            series.plans += 1
+            series.complete += int(parsed >= expected)
+            series.items_expected += expected
+            series.items_parsed += min(parsed, expected)
+            series.completion_tokens += completion_tokens
+
+    def parse_summary(self) -> List[Dict[str, float]]:
+        """One row per plan output format.
+
+        `token_savings` compares output tokens per parsed item with the text
+        format, e.g. 0.4 means 40% fewer tokens per usable post.
+        """
+        with self._lock:
+            parses = sorted(self._parses.items())
+        per_item = {
+            fmt: s.completion_tokens / s.items_parsed for fmt, s in parses if s.items_parsed
+        }
+        baseline = per_item.get("text")
+        rows = []
+        for fmt, s in parses:
+            row = {
+                "format": fmt,
+                "plans": s.plans,
+                "parse_success_rate": round(s.items_parsed / s.items_expected, 3) if s.items_expected else 0.0,
+                "complete_plans": s.complete,
+                "completion_tokens": s.completion_tokens,
+                "tokens_per_item": round(per_item.get(fmt, 0.0), 1),
+                "token_savings": None,
+            }
+            if baseline and fmt in per_item and fmt != "text":
+                row["token_savings"] = round(1 - per_item[fmt] / baseline, 3)
+            rows.append(row)
+        return rows
+
+    def summary(self) -> List[Dict[str, float]]:
+        """One row per (operation, model), for display."""
+        rows = []
+        with self._lock:
+            for (operation, model), s in sorted(self._series.items()):
+                wall, ttft = sorted(s.wall), sorted(s.ttft)
+                cached = s.cache.get("hit", 0) + s.cache.get("semantic", 0)
+                rows.append({
+                    "operation": operation,
+                    "model": model,
+                    "calls": s.calls,
+                    "errors": s.errors,
+                    "p50_s": round(_quantile(wall, 0.5), 3),
+                    "p95_s": round(_quantile(wall, 0.95), 3),
+                    "ttft_p50_s": round(_quantile(ttft, 0.5), 3),
+                    "ttft_p95_s": round(_quantile(ttft, 0.95), 3),
+                    "prompt_tokens": s.prompt_tokens,
+                    "cached_prompt_tokens": s.cached_tokens,
+                    "completion_tokens": s.completion_tokens,
+                    "cost_usd": round(s.cost, 6),
+                    "cache_hit_rate": round(cached / s.calls, 3) if s.calls else 0.0,
+                    "coalesced": s.cache.get("coalesced", 0),
+                    "retries": s.retries,
+                    "hedges": s.hedges,
+                    "hedge_wins": s.hedge_wins,
+                })
+        return rows
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            series = sorted(self._series.items())
+
+            def labels(operation: str, model: str, **extra) -> str:
+                pairs = [("operation", operation), ("model", model)] + list(extra.items())
+                return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+            for name, attr, total, count, help_text in (
+                ("llm_call_duration_seconds", "wall", "wall_sum", "calls", "Wall time of agent LLM calls"),
+                ("llm_time_to_first_token_seconds", "ttft", "ttft_sum", "ttft_count", "Time to first token of uncached calls"),
+            ):
+                metric(name, "summary", help_text)
+                for (operation, model), s in series:
+                    values = sorted(getattr(s, attr))
+                    for q in QUANTILES:
+                        lines.append(f"{name}{labels(operation, model, quantile=q)} {_quantile(values, q):.6f}")
+                    lines.append(f"{name}_sum{labels(operation, model)} {getattr(s, total):.6f}")
+                    lines.append(f"{name}_count{labels(operation, model)} {getattr(s, count)}")
+
+            metric("llm_calls_total", "counter", "Agent LLM calls by cache status")
+            for (operation, model), s in series:
+                for status, value in s.cache.items():
+                    lines.append(f"llm_calls_total{labels(operation, model, cache=status)} {value}")
+
+            metric("llm_tokens_total", "counter", "Prompt, completion and provider-cached prompt tokens")
+            for (operation, model), s in series:
+                lines.append(f"llm_tokens_total{labels(operation, model, type='prompt')} {s.prompt_tokens}")
+                lines.append(f"llm_tokens_total{labels(operation, model, type='completion')} {s.completion_tokens}")
+                lines.append(f"llm_tokens_total{labels(operation, model, type='cached_prompt')} {s.cached_tokens}")
+
+            for name, attr, help_text in (
+                ("llm_cost_usd_total", "cost", "Estimated spend in USD"),
+                ("llm_retries_total", "retries", "Retried attempts"),
+                ("llm_errors_total", "errors", "Calls that raised"),
+                ("llm_hedges_total", "hedges", "Hedged duplicate requests sent"),
+                ("llm_hedge_wins_total", "hedge_wins", "Hedged requests that answered first"),
+            ):
+                metric(name, "counter", help_text)
+                for (operation, model), s in series:
+                    value = getattr(s, attr)
+                    lines.append(f"{name}{labels(operation, model)} {value:.6f}" if isinstance(value, float)
+                                 else f"{name}{labels(operation, model)} {value}")
+
+            parses = sorted(self._parses.items())
+            for name, attr, help_text in (
+                ("llm_plan_parses_total", "plans", "Plan replies parsed, by output format"),
+                ("llm_plan_items_expected_total", "items_expected", "Plan posts requested"),
+                ("llm_plan_items_parsed_total", "items_parsed", "Plan posts recovered by the parser"),
+                ("llm_plan_completion_tokens_total", "completion_tokens", "Output tokens spent on plan replies"),
+            ):
+                if not parses:
+                    break
+                metric(name, "counter", help_text)
+                for fmt, s in parses:
+                    lines.append(f'{name}{{format="{_escape(fmt)}"}} {getattr(s, attr)}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Write atomically, e.g. for node_exporter's textfile collector."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp, path)
+
+    def serve_prometheus(self, port: int, host: str = "0.0.0.0"):
+        """Serve /metrics from a daemon thread. Returns the HTTP server."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self._parses.clear()
+
+
+_metrics: Optional[MetricsRegistry] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Process-wide registry. LLM_METRICS_FILE periodically writes the Prometheus text to a file."""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = MetricsRegistry(export_path=os.getenv("LLM_METRICS_FILE") or None)
+        return _metrics
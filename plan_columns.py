@@ -0,0 +1,133 @@
+# plan_columns.py
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Mapping
+
+from agent import PlanItem
+
+PLAN_COLUMNS = ["post_date", "platform", "post_type", "idea_title", "key_points", "cta", "hashtags"]
+
+# Low-cardinality fields are stored as small integer codes into a shared value table
+CATEGORICAL_COLUMNS = ["post_date", "platform", "post_type"]
+TEXT_COLUMNS = ["idea_title", "key_points", "cta", "hashtags"]
+
+
+class _Categories:
+    def __init__(self):
+        self.values: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.codes = array("H")
+
+    def append(self, value: str):
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        self.codes.append(code)
+
+    def __getitem__(self, i: int) -> str:
+        return self.values[self.codes[i]]
+
+    def nbytes(self) -> int:
+        return self.codes.itemsize * len(self.codes) + sum(sys.getsizeof(v) for v in self.values)
+
+
+class _TextColumn:
+    """UTF-8 bytes of every value in one buffer, with start offsets."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array("Q", [0])
+        self.ascii = True
+
+    def append(self, value: str):
+        self.ascii = self.ascii and value.isascii()
+        self.data += value.encode("utf-8")
+        self.offsets.append(len(self.data))
+
+    def __getitem__(self, i: int) -> str:
+        return self.data[self.offsets[i]:self.offsets[i + 1]].decode("utf-8")
+
+    def values(self) -> List[str]:
+        if self.ascii:
+            # Byte offsets are character offsets: decode once, then slice the str
+            text = self.data.decode("ascii")
+            offsets = self.offsets
+            return [text[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+        return [self[i] for i in range(len(self.offsets) - 1)]
+
+    def nbytes(self) -> int:
+        return len(self.data) + self.offsets.itemsize * len(self.offsets)
+
+
+class PlanColumns:
+    """Column-oriented container for many plan items.
+
+    Holds no per-item Python objects: categorical fields are interned and stored
+    as uint16 codes, text fields as one UTF-8 buffer per column. Roughly a tenth
+    of the memory of the equivalent list of PlanItem models.
+    """
+
+    def __init__(self, items: Iterable = ()):
+        self._categories = {name: _Categories() for name in CATEGORICAL_COLUMNS}
+        self._text = {name: _TextColumn() for name in TEXT_COLUMNS}
+        self._length = 0
+        self.extend(items)
+
+    def append(self, item):
+        """Add a PlanItem or a mapping with the plan item fields."""
+        row = item if isinstance(item, Mapping) else item.model_dump()
+        for name, column in self._categories.items():
+            column.append(str(row[name]))
+        for name, column in self._text.items():
+            column.append(str(row[name]))
+        self._length += 1
+
+    def extend(self, items: Iterable):
+        for item in items:
+            self.append(item)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def row(self, i: int) -> Dict[str, str]:
+        if not -self._length <= i < self._length:
+            raise IndexError(i)
+        i %= self._length
+        return {name: self._column(name)[i] for name in PLAN_COLUMNS}
+
+    def __getitem__(self, i: int) -> PlanItem:
+        return PlanItem(**self.row(i))
+
+    def __iter__(self) -> Iterator[PlanItem]:
+        for i in range(self._length):
+            yield self[i]
+
+    def _column(self, name: str):
+        return self._categories[name] if name in self._categories else self._text[name]
+
+    def column(self, name: str) -> List[str]:
+        if name in self._text:
+            return self._text[name].values()
+        column = self._categories[name]
+        return [column.values[code] for code in column.codes]
+
+    def categories(self, name: str) -> List[str]:
+        return list(self._categories[name].values)
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the column buffers."""
+        return sum(c.nbytes() for c in self._categories.values()) + sum(c.nbytes() for c in self._text.values())
+
+    def to_dataframe(self):
+        """Build the same columns as utils.plan_to_dataframe, with categorical dtypes for coded fields."""
+        import pandas as pd
+
+        data = {}
+        for name in PLAN_COLUMNS:
+            if name in self._categories:
+                column = self._categories[name]
+                data[name] = pd.Categorical.from_codes(column.codes, categories=column.values)
+            else:
+                data[name] = self.column(name)
+        return pd.DataFrame(data, columns=PLAN_COLUMNS)
@@ -0,0 +1,203 @@
+# prompt_registry.py
+"""Versioned prompt templates, compiled once per process.
+
+Each RegisteredPrompt parses its template a single time and renders by joining
+the pieces, and knows its static prefix: the system message plus the template
+text before the first variable. That prefix is identical across calls, which is
+what provider-side prompt caching reuses (OpenAI caches prefixes of at least
+PROVIDER_MIN_CACHED_PREFIX tokens). Token counts come from a local estimate;
+pass `tokenizer` (e.g. a tiktoken encoder's length) for exact numbers.
+
+    prompt = get_prompt_registry().get("caption")
+    messages = prompt.messages(variables)
+    get_prompt_registry().report()
+"""
+import threading
+from string import Formatter
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from scheduler import estimate_tokens
+from prompts import (
+    SOCIAL_STRATEGY_SYSTEM,
+    SOCIAL_STRATEGY_TEMPLATE,
+    SOCIAL_STRATEGY_JSON_TEMPLATE,
+    SOCIAL_STRATEGY_SHARD_TEMPLATE,
+    SOCIAL_STRATEGY_SHARD_JSON_TEMPLATE,
+    SOCIAL_STRATEGY_REPAIR_TEMPLATE,
+    SOCIAL_STRATEGY_REPAIR_JSON_TEMPLATE,
+    CAPTION_SYSTEM,
+    CAPTION_TEMPLATE,
+    REPURPOSE_SYSTEM,
+    REPURPOSE_TEMPLATE,
+)
+
+if TYPE_CHECKING:
+    from langchain_core.messages import BaseMessage
+
+PROVIDER_MIN_CACHED_PREFIX = 1024
+
+# (name, version, system prompt, template); bump the version whenever the text changes
+DEFAULT_PROMPTS = [
+    ("plan", 2, SOCIAL_STRATEGY_SYSTEM, SOCIAL_STRATEGY_TEMPLATE),
+    ("plan_json", 2, SOCIAL_STRATEGY_SYSTEM, SOCIAL_STRATEGY_JSON_TEMPLATE),
+    ("plan_shard", 2, SOCIAL_STRATEGY_SYSTEM, SOCIAL_STRATEGY_SHARD_TEMPLATE),
+    ("plan_shard_json", 2, SOCIAL_STRATEGY_SYSTEM, SOCIAL_STRATEGY_SHARD_JSON_TEMPLATE),
+    ("plan_repair", 2, SOCIAL_STRATEGY_SYSTEM, SOCIAL_STRATEGY_REPAIR_TEMPLATE),
+    ("plan_repair_json", 2, SOCIAL_STRATEGY_SYSTEM, SOCIAL_STRATEGY_REPAIR_JSON_TEMPLATE),
+    ("caption", 2, CAPTION_SYSTEM, CAPTION_TEMPLATE),
+    ("repurpose", 2, REPURPOSE_SYSTEM, REPURPOSE_TEMPLATE),
+]
+
+
+def _compile(template: str) -> List[Tuple[str, Optional[str]]]:
+    """(literal text, variable name or None) pieces, with {{ }} already unescaped."""
+    pieces = []
+    for literal, field, spec, conversion in Formatter().parse(template):
+        if spec or conversion:
+            raise ValueError(f"Format specs are not supported in prompt templates: {{{field}!{conversion}:{spec}}}")
+        pieces.append((literal, field))
+    return pieces
+
+
+class RegisteredPrompt:
+    """One compiled (name, version) template with its system prompt."""
+
+    def __init__(self, name: str, version: int, system: str, template: str,
+                 tokenizer: Callable[[str], int] = estimate_tokens):
+        self.name = name
+        self.version = version
+        self.system = system
+        self.template = template
+        self._pieces = _compile(template)
+        self.input_variables = sorted({field for _, field in self._pieces if field})
+        static = []
+        for literal, field in self._pieces:
+            static.append(literal)
+            if field:
+                break
+        self.static_prefix = "".join(static)
+        self.system_tokens = tokenizer(system)
+        self.prefix_tokens = self.system_tokens + tokenizer(self.static_prefix)
+        self.template_tokens = tokenizer("".join(literal for literal, _ in self._pieces))
+
+    @property
+    def id(self) -> str:
+        return f"{self.name}@v{self.version}"
+
+    def format(self, **variables) -> str:
+        try:
+            return "".join(
+                literal + (str(variables[field]) if field else "") for literal, field in self._pieces
+            )
+        except KeyError as e:
+            raise KeyError(f"Prompt {self.id} is missing variable {e.args[0]!r}") from None
+
+    def messages(self, variables: dict) -> List["BaseMessage"]:
+        from langchain_core.messages import HumanMessage, SystemMessage
+
+        return [SystemMessage(content=self.system), HumanMessage(content=self.format(**variables))]
+
+
+class _Usage:
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+
+
+class PromptRegistry:
+    """Named, versioned prompts plus per-template token accounting.
+
+    get(name) returns the newest version unless one is pinned. record() is
+    called by the agent for every rendered prompt; report() then shows how
+    much of the average prompt is a reusable static prefix.
+    """
+
+    def __init__(self, tokenizer: Callable[[str], int] = estimate_tokens):
+        self.tokenizer = tokenizer
+        self._prompts: Dict[str, Dict[int, RegisteredPrompt]] = {}
+        self._usage: Dict[str, _Usage] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, version: int, system: str, template: str) -> RegisteredPrompt:
+        prompt = RegisteredPrompt(name, version, system, template, self.tokenizer)
+        with self._lock:
+            versions = self._prompts.setdefault(name, {})
+            if version in versions and versions[version].template != template:
+                raise ValueError(f"{prompt.id} is already registered with different text; bump the version")
+            versions[version] = prompt
+        return prompt
+
+    def get(self, name: str, version: Optional[int] = None) -> RegisteredPrompt:
+        versions = self._prompts.get(name)
+        if not versions:
+            raise KeyError(f"Unknown prompt {name!r}")
+        if version is None:
+            return versions[max(versions)]
+        if version not in versions:
+            raise KeyError(f"Unknown version {version} of prompt {name!r}; have {sorted(versions)}")
+        return versions[version]
+
+    def versions(self, name: str) -> List[int]:
+        return sorted(self._prompts.get(name, {}))
+
+    def names(self) -> List[str]:
+        return sorted(self._prompts)
+
+    def render(self, name: str, variables: dict, version: Optional[int] = None) -> List["BaseMessage"]:
+        prompt = self.get(name, version)
+        messages = prompt.messages(variables)
+        self.record(prompt, messages)
+        return messages
+
+    def record(self, prompt: RegisteredPrompt, messages: List["BaseMessage"]):
+        tokens = sum(self.tokenizer(m.content) for m in messages)
+        with self._lock:
+            usage = self._usage.get(prompt.id)
+            if usage is None:
+                usage = self._usage[prompt.id] = _Usage()
+            usage.calls += 1
+            usage.prompt_tokens += tokens
+
+    def report(self) -> List[Dict]:
+        """One row per registered prompt version.
+
+        `prefix_share` is the static prefix as a fraction of the average rendered
+        prompt, i.e. the most a provider prefix cache could serve; `cacheable`
+        says whether the prefix is long enough for OpenAI to cache at all.
+        """
+        rows = []
+        with self._lock:
+            for name in sorted(self._prompts):
+                for version, prompt in sorted(self._prompts[name].items()):
+                    usage = self._usage.get(prompt.id, _Usage())
+                    avg = usage.prompt_tokens / usage.calls if usage.calls else 0.0
+                    rows.append({
+                        "prompt": prompt.id,
+                        "system_tokens": prompt.system_tokens,
+                        "static_prefix_tokens": prompt.prefix_tokens,
+                        "template_tokens": prompt.system_tokens + prompt.template_tokens,
+                        "calls": usage.calls,
+                        "avg_prompt_tokens": round(avg, 1),
+                        "prefix_share": round(min(1.0, prompt.prefix_tokens / avg), 3) if avg else None,
+                        "cacheable": prompt.prefix_tokens >= PROVIDER_MIN_CACHED_PREFIX,
+                    })
+        return rows
+
+    def reset_usage(self):
+        with self._lock:
+            self._usage.clear()
+
+
+_registry: Optional[PromptRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_prompt_registry() -> PromptRegistry:
+    """Process-wide registry holding DEFAULT_PROMPTS."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = PromptRegistry()
+            for name, version, system, template in DEFAULT_PROMPTS:
+                _registry.register(name, version, system, template)
+        return _registry
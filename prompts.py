@@ -1,4 +1,12 @@
 # prompts.py
+"""Prompt text. Templates are registered (and versioned) in prompt_registry.py.
+
+Every template is laid out static-first: fixed instructions and output format
+come before the first {variable}, so consecutive calls share a long identical
+prefix that provider-side prompt caching can reuse. The plan templates of one
+output format also start with the same format block, so plan, shard and repair
+calls share that prefix with each other.
+"""
 from textwrap import dedent
 
 SOCIAL_STRATEGY_SYSTEM = dedent("""
@@ -7,20 +15,9 @@ You produce clear, structured, actionable plans tailored to brand voice and audi
 Be concise but specific. Avoid generic fluff. Include hooks, CTAs, and platform best practices.
 """)
 
-SOCIAL_STRATEGY_TEMPLATE = dedent("""
-Brand: {brand_name}
-Niche/Industry: {niche}
-Audience: {audience}
-Tone/Voice: {tone}
-Platforms: {platforms}
-Goal: {goal}
-Constraints: {constraints}
-
-Task:
-Create a 30-day content plan. Keep ideas varied: education, storytelling, behind-the-scenes, social proof, UGC prompts, offers.
-Align with Indian audience context where relevant.
-
-IMPORTANT: Return EXACTLY in this format for each post (one post per block, separated by blank line):
+PLAN_TEXT_FORMAT = dedent("""
+Output format:
+Return EXACTLY in this format for each post (one post per block, separated by blank line):
 
 ---
 Post Date: Day 1
@@ -32,9 +29,71 @@ CTA: Enroll in our skill-building course today
 Hashtags: #CareerGrowth #SkillDevelopment #EdTech #JobReady #India
 ---
 
-Repeat this exact format for all 30 days. Use "Post Date:", "Platform:", "Post Type:", "Idea Title:", "Key Points:", "CTA:", "Hashtags:" as exact labels.
+Use "Post Date:", "Platform:", "Post Type:", "Idea Title:", "Key Points:", "CTA:", "Hashtags:" as exact labels.
+""")
+
+PLAN_JSON_FORMAT = dedent("""
+Output format:
+Return only a JSON object, no markdown, with one entry in "posts" per day.
+Keys: d = day number, p = platform, t = post type, i = idea title, k = key points (comma-separated), c = CTA, h = hashtags (space-separated).
+{{"posts":[{{"d":1,"p":"Instagram","t":"Carousel","i":"5 Skills That Will Make You Job-Ready in 2024","k":"Focus on in-demand skills, Build portfolio projects, Network actively","c":"Enroll in our skill-building course today","h":"#CareerGrowth #SkillDevelopment #EdTech #JobReady #India"}}]}}
 """)
 
+PLAN_TASK = dedent("""
+Task:
+Create a 30-day content plan for the brand below, one post per day from Day 1 to Day 30.
+Keep ideas varied: education, storytelling, behind-the-scenes, social proof, UGC prompts, offers.
+Align with Indian audience context where relevant.
+""")
+
+PLAN_SHARD_TASK = dedent("""
+Task:
+You are writing one part of a 30-day content plan for the brand below.
+Create posts ONLY for the range under "Days:", one post per day, numbered with the real day numbers.
+Focus this part on the themes under "Focus:".
+The rest of the month is planned separately (see "Other parts:"); do not repeat those themes or ideas.
+Align with Indian audience context where relevant.
+""")
+
+PLAN_REPAIR_TASK = dedent("""
+Task:
+You are rewriting some days of an existing 30-day content plan for the brand below.
+Create posts ONLY for the days under "Days to write", one post per day, numbered with those day numbers.
+The rest of the plan (see "Existing plan:") is already written and stays as it is.
+Fit the new posts around it and do not repeat its ideas.
+Align with Indian audience context where relevant.
+""")
+
+BRAND_BRIEF = dedent("""
+Brand: {brand_name}
+Niche/Industry: {niche}
+Audience: {audience}
+Tone/Voice: {tone}
+Platforms: {platforms}
+Goal: {goal}
+Constraints: {constraints}
+""")
+
+SHARD_BRIEF = dedent("""
+Days: {day_range}
+Focus: {focus_themes}
+Other parts:
+{other_parts}
+""")
+
+REPAIR_BRIEF = dedent("""
+Days to write: {days}
+Existing plan:
+{existing_plan}
+""")
+
+SOCIAL_STRATEGY_TEMPLATE = PLAN_TEXT_FORMAT + PLAN_TASK + BRAND_BRIEF
+SOCIAL_STRATEGY_JSON_TEMPLATE = PLAN_JSON_FORMAT + PLAN_TASK + BRAND_BRIEF
+SOCIAL_STRATEGY_SHARD_TEMPLATE = PLAN_TEXT_FORMAT + PLAN_SHARD_TASK + BRAND_BRIEF + SHARD_BRIEF
+SOCIAL_STRATEGY_SHARD_JSON_TEMPLATE = PLAN_JSON_FORMAT + PLAN_SHARD_TASK + BRAND_BRIEF + SHARD_BRIEF
+SOCIAL_STRATEGY_REPAIR_TEMPLATE = PLAN_TEXT_FORMAT + PLAN_REPAIR_TASK + BRAND_BRIEF + REPAIR_BRIEF
+SOCIAL_STRATEGY_REPAIR_JSON_TEMPLATE = PLAN_JSON_FORMAT + PLAN_REPAIR_TASK + BRAND_BRIEF + REPAIR_BRIEF
+
 CAPTION_SYSTEM = dedent("""
 You write high-performing social captions with strong hooks, skimmable structure, and clear CTAs.
 You tailor style to the specified platform, tone, and audience.
@@ -42,6 +101,14 @@ Include 5-10 relevant hashtags when helpful.
 """)
 
 CAPTION_TEMPLATE = dedent("""
+Write a single caption under 180 words for the post idea below, with:
+- a compelling hook in first line,
+- short paragraphs or bullets,
+- a clear CTA,
+- platform-appropriate emojis sparingly (optional),
+- include provided hashtags at the end when appropriate.
+Return only the caption text.
+
 Platform: {platform}
 Tone: {tone}
 Audience: {audience}
@@ -51,14 +118,6 @@ Title: {title}
 Key Points: {key_points}
 CTA: {cta}
 Hashtags: {hashtags}
-
-Write a single caption under 180 words with:
-- a compelling hook in first line,
-- short paragraphs or bullets,
-- a clear CTA,
-- platform-appropriate emojis sparingly (optional),
-- include provided hashtags at the end when appropriate.
-Return only the caption text.
 """)
 
 REPURPOSE_SYSTEM = dedent("""
@@ -67,13 +126,8 @@ Optimize for each platform's format and norms without bloating the text.
 """)
 
 REPURPOSE_TEMPLATE = dedent("""
-Original Caption (Source Platform: {source_platform}):
-{original_caption}
-
-Target Platforms: {target_platforms}
-
 Task:
-Create optimized versions for each target platform:
+Create optimized versions of the original caption below for each target platform:
 - Keep message consistent.
 - Adapt length, hooks, hashtags, and CTA for each platform.
 - Use list formatting only if it improves readability.
@@ -81,4 +135,9 @@ Create optimized versions for each target platform:
 Return in the structure:
 [Platform]:
 <caption>
-""")
\ No newline at end of file
+
+Target Platforms: {target_platforms}
+
+Original Caption (Source Platform: {source_platform}):
+{original_caption}
+""")
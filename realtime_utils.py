@@ -1,17 +1,78 @@
 # realtime_utils.py
 import re
-from typing import Dict, List
+from typing import Dict, List, Sequence, Union
+from lexicon import CTA_LEXICON, NICHE_LEXICON
+
+CHAR_LIMITS = {"Instagram": 2200, "LinkedIn": 3000, "Twitter": 280}
+
+# Caption length that earns the length bonus, per platform
+ENGAGEMENT_LENGTH_RANGE = {"Instagram": (100, 300), "LinkedIn": (150, 500), "Twitter": (100, 250)}
+
+EMOJI_RANGES = (
+    u"\U0001F600-\U0001F64F"  # emoticons
+    u"\U0001F300-\U0001F5FF"  # symbols & pictographs
+    u"\U0001F680-\U0001F6FF"  # transport & map symbols
+    u"\U0001F1E0-\U0001F1FF"  # flags
+)
+
+# Compiled once at import instead of on every call
+_HASHTAG_PATTERN = re.compile(r'#\w+')
+_EMOJI_PATTERN = re.compile("[" + EMOJI_RANGES + "]+", flags=re.UNICODE)
+
+FEATURE_COLUMNS = ["char_count", "word_count", "hashtag_count", "emoji_count", "line_count", "has_cta", "has_question"]
+
+
+def extract_caption_features(caption: str) -> Dict[str, int]:
+    """Collect every feature the analyzer and scorer need; CTA phrases are found in one lexicon pass"""
+    return {
+        "char_count": len(caption),
+        "word_count": len(caption.split()),
+        "hashtag_count": len(_HASHTAG_PATTERN.findall(caption)),
+        "emoji_count": len(_EMOJI_PATTERN.findall(caption)),
+        "line_count": caption.count('\n') + 1,
+        "has_cta": CTA_LEXICON.contains_any(caption),
+        "has_question": '?' in caption,
+    }
+
+
+def score_caption_features(features: Dict[str, int], platform: str) -> int:
+    """Predicted engagement score (0-100) from extracted caption features"""
+    score = 50  # Base score
+
+    # Length optimization
+    low, high = ENGAGEMENT_LENGTH_RANGE.get(platform, (1, 0))
+    if low <= features["char_count"] <= high:
+        score += 10
+
+    # Hashtags
+    if 3 <= features["hashtag_count"] <= 5:
+        score += 10
+
+    # Emojis
+    if features["emoji_count"] > 0:
+        score += 10
+
+    # CTA
+    if features["has_cta"]:
+        score += 10
+
+    # Question
+    if features["has_question"]:
+        score += 10
+
+    return min(score, 100)
+
 
 def analyze_caption_realtime(caption: str, platform: str) -> Dict[str, any]:
     """Analyze caption and provide real-time suggestions"""
     
     suggestions = []
     warnings = []
+    features = extract_caption_features(caption)
     
     # Character limits
-    limits = {"Instagram": 2200, "LinkedIn": 3000, "Twitter": 280}
-    limit = limits.get(platform, 2200)
-    char_count = len(caption)
+    limit = CHAR_LIMITS.get(platform, 2200)
+    char_count = features["char_count"]
     
     # Check length
     if char_count > limit:
@@ -20,8 +81,7 @@ def analyze_caption_realtime(caption: str, platform: str) -> Dict[str, any]:
         warnings.append(f"Close to {platform} character limit")
     
     # Hashtag analysis
-    hashtags = re.findall(r'#\w+', caption)
-    hashtag_count = len(hashtags)
+    hashtag_count = features["hashtag_count"]
     
     if platform == "Instagram" and hashtag_count > 30:
         warnings.append("Instagram allows max 30 hashtags")
@@ -33,15 +93,7 @@ def analyze_caption_realtime(caption: str, platform: str) -> Dict[str, any]:
         suggestions.append("Consider adding relevant hashtags for better reach")
     
     # Emoji check
-    emoji_pattern = re.compile("["
-        u"\U0001F600-\U0001F64F"  # emoticons
-        u"\U0001F300-\U0001F5FF"  # symbols & pictographs
-        u"\U0001F680-\U0001F6FF"  # transport & map symbols
-        u"\U0001F1E0-\U0001F1FF"  # flags
-        "]+", flags=re.UNICODE)
-    
-    emojis = emoji_pattern.findall(caption)
-    emoji_count = len(emojis)
+    emoji_count = features["emoji_count"]
     
     if emoji_count == 0 and platform == "Instagram":
         suggestions.append("Instagram posts with emojis get 47% more engagement")
@@ -49,70 +101,80 @@ def analyze_caption_realtime(caption: str, platform: str) -> Dict[str, any]:
         suggestions.append("Too many emojis might reduce readability")
     
     # CTA check
-    cta_keywords = ['link in bio', 'click', 'visit', 'sign up', 'register', 'enroll', 'join', 'learn more', 'dm us', 'comment']
-    has_cta = any(keyword in caption.lower() for keyword in cta_keywords)
+    has_cta = features["has_cta"]
     
     if not has_cta:
         suggestions.append("Add a clear call-to-action (CTA) to drive engagement")
     
     # Line breaks for readability
-    lines = caption.split('\n')
-    if len(lines) == 1 and char_count > 200:
+    if features["line_count"] == 1 and char_count > 200:
         suggestions.append("Break long text into paragraphs for better readability")
     
     # Question check (engagement booster)
-    if '?' not in caption:
+    if not features["has_question"]:
         suggestions.append("Questions increase engagement - consider adding one")
     
     return {
         "char_count": char_count,
-        "word_count": len(caption.split()),
+        "word_count": features["word_count"],
         "hashtag_count": hashtag_count,
         "emoji_count": emoji_count,
         "has_cta": has_cta,
         "suggestions": suggestions,
         "warnings": warnings,
-        "engagement_score": calculate_engagement_score(caption, platform)
+        "engagement_score": score_caption_features(features, platform)
     }
 
 def calculate_engagement_score(caption: str, platform: str) -> int:
     """Calculate predicted engagement score (0-100)"""
-    score = 50  # Base score
-    
-    # Length optimization
-    char_count = len(caption)
-    if platform == "Instagram" and 100 <= char_count <= 300:
-        score += 10
-    elif platform == "LinkedIn" and 150 <= char_count <= 500:
-        score += 10
-    elif platform == "Twitter" and 100 <= char_count <= 250:
-        score += 10
-    
-    # Hashtags
-    hashtag_count = len(re.findall(r'#\w+', caption))
-    if 3 <= hashtag_count <= 5:
-        score += 10
-    
-    # Emojis
-    emoji_pattern = re.compile("["
-        u"\U0001F600-\U0001F64F"
-        u"\U0001F300-\U0001F5FF"
-        u"\U0001F680-\U0001F6FF"
-        u"\U0001F1E0-\U0001F1FF"
-        "]+", flags=re.UNICODE)
-    if len(emoji_pattern.findall(caption)) > 0:
-        score += 10
-    
-    # CTA
-    cta_keywords = ['link in bio', 'click', 'visit', 'sign up', 'register', 'enroll', 'join', 'learn more', 'dm us', 'comment']
-    if any(keyword in caption.lower() for keyword in cta_keywords):
-        score += 10
-    
-    # Question
-    if '?' in caption:
-        score += 10
-    
-    return min(score, 100)
+    return score_caption_features(extract_caption_features(caption), platform)
+
+def score_features_frame(features, platform: Union[str, Sequence[str]] = "Instagram"):
+    """Vectorized score_caption_features over a DataFrame of caption features"""
+    import pandas as pd
+
+    platforms = pd.Series(platform, index=features.index) if isinstance(platform, str) else pd.Series(list(platform), index=features.index)
+    low = platforms.map(lambda p: ENGAGEMENT_LENGTH_RANGE.get(p, (1, 0))[0]).to_numpy()
+    high = platforms.map(lambda p: ENGAGEMENT_LENGTH_RANGE.get(p, (1, 0))[1]).to_numpy()
+
+    score = score_feature_arrays(
+        features["char_count"].to_numpy(),
+        features["hashtag_count"].to_numpy(),
+        features["emoji_count"].to_numpy(),
+        features["has_cta"].to_numpy(dtype=bool),
+        features["has_question"].to_numpy(dtype=bool),
+        low,
+        high,
+    )
+    return pd.Series(score, index=features.index, name="engagement_score")
+
+def score_feature_arrays(chars, hashtags, emojis, has_cta, has_question, low, high):
+    """score_caption_features on numpy arrays (any broadcastable shapes); `low`/`high` bound the length bonus"""
+    import numpy as np
+
+    score = (
+        50
+        + 10 * ((chars >= low) & (chars <= high))
+        + 10 * ((hashtags >= 3) & (hashtags <= 5))
+        + 10 * (emojis > 0)
+        + 10 * np.asarray(has_cta, dtype=bool)
+        + 10 * np.asarray(has_question, dtype=bool)
+    )
+    return np.minimum(score, 100)
+
+def analyze_captions_batch(captions, platform: Union[str, Sequence[str]] = "Instagram"):
+    """Feature + engagement score DataFrame for a list or pandas Series of captions.
+
+    `platform` is one platform for every caption or a sequence aligned with `captions`.
+    """
+    import pandas as pd
+
+    if not isinstance(captions, pd.Series):
+        captions = pd.Series(list(captions), dtype=object)
+    records = [extract_caption_features(c if isinstance(c, str) else "") for c in captions]
+    features = pd.DataFrame.from_records(records, index=captions.index, columns=FEATURE_COLUMNS)
+    features["engagement_score"] = score_features_frame(features, platform)
+    return features
 
 def get_trending_hashtags(niche: str) -> List[str]:
     """Return trending hashtags for a niche (mock data - can be replaced with API)"""
@@ -124,9 +186,8 @@ def get_trending_hashtags(niche: str) -> List[str]:
         "business": ["#Entrepreneurship", "#BusinessGrowth", "#StartupLife", "#Leadership", "#Marketing"]
     }
     
-    niche_lower = niche.lower()
-    for key in hashtag_db:
-        if key in niche_lower:
-            return hashtag_db[key]
+    key = NICHE_LEXICON.first_category(niche)
+    if key in hashtag_db:
+        return hashtag_db[key]
     
     return ["#Growth", "#Success", "#Motivation", "#Innovation", "#Community"]
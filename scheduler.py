@@ -0,0 +1,340 @@
+# scheduler.py
+import os
+import time
+import heapq
+import random
+import asyncio
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 5
+PRIORITY_BULK = 10
+
+# Queue priority per agent operation: interactive requests jump ahead of bulk work
+OPERATION_PRIORITY = {
+    "caption": PRIORITY_INTERACTIVE,
+    "repurpose": PRIORITY_INTERACTIVE,
+    "plan": PRIORITY_NORMAL,
+    "plan_shard": PRIORITY_BULK,
+    "plan_repair": PRIORITY_NORMAL,
+}
+
+# Rough completion sizes, counted against the tokens-per-minute budget up front
+EXPECTED_OUTPUT_TOKENS = {
+    "caption": 350,
+    "repurpose": 700,
+    "plan": 3000,
+    "plan_shard": 1200,
+    "plan_repair": 600,
+}
+
+# (requests per minute, tokens per minute); override with LLM_RPM_LIMIT / LLM_TPM_LIMIT
+DEFAULT_LIMITS = {
+    "gpt-4o-mini": (500, 200_000),
+}
+FALLBACK_LIMITS = (500, 30_000)
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {"RateLimitError", "APIConnectionError", "APITimeoutError", "InternalServerError"}
+
+_priority_override: contextvars.ContextVar = contextvars.ContextVar("llm_priority", default=None)
+
+
+@contextmanager
+def priority(value: int):
+    """Run LLM calls made in this context (including tasks it spawns) at `value`."""
+    token = _priority_override.set(value)
+    try:
+        yield
+    finally:
+        _priority_override.reset(token)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+class LLMThrottledError(RuntimeError):
+    """Raised when a call is still rate limited after all retries."""
+
+    def __init__(self, message: str, attempts: int, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.attempts = attempts
+        self.retry_after = retry_after
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+class _Ticket:
+    __slots__ = ("priority", "seq", "model", "tokens", "enqueued_at")
+
+    def __init__(self, priority: int, seq: int, model: str, tokens: int):
+        self.priority = priority
+        self.seq = seq
+        self.model = model
+        self.tokens = tokens
+        self.enqueued_at = time.monotonic()
+
+    def __lt__(self, other: "_Ticket") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class LLMScheduler:
+    """Process-wide admission control for LLM calls.
+
+    Calls wait in one priority queue per model and are released in order as
+    that model's request and token buckets allow, so a model that is out of
+    budget never holds up calls to another. Retryable failures are retried
+    with exponential backoff and full jitter, honouring retry-after hints.
+    Works for threads and asyncio tasks alike.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Tuple[int, int]]] = None,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ):
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._queues: Dict[str, List[_Ticket]] = {}
+        # asyncio waiters queued behind another ticket, woken when a queue head changes
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._buckets: Dict[str, Tuple[TokenBucket, TokenBucket]] = {}
+        self._stats = {
+            "admitted": 0,
+            "throttled": 0,
+            "retries": 0,
+            "failures": 0,
+            "total_wait": 0.0,
+            "max_wait": 0.0,
+        }
+
+    def _limits_for(self, model: str) -> Tuple[int, int]:
+        rpm, tpm = self.limits.get(model, FALLBACK_LIMITS)
+        return int(os.getenv("LLM_RPM_LIMIT", rpm)), int(os.getenv("LLM_TPM_LIMIT", tpm))
+
+    def _bucket(self, model: str) -> Tuple[TokenBucket, TokenBucket]:
+        if model not in self._buckets:
+            rpm, tpm = self._limits_for(model)
+            self._buckets[model] = (TokenBucket(rpm), TokenBucket(tpm))
+        return self._buckets[model]
+
+    def _enqueue(self, model: str, tokens: int, priority: int) -> _Ticket:
+        override = _priority_override.get()
+        ticket = _Ticket(priority if override is None else override, next(self._seq), model, tokens)
+        with self._cond:
+            heapq.heappush(self._queues.setdefault(model, []), ticket)
+        return ticket
+
+    def _notify(self):
+        """Wake every waiter; call with the lock held."""
+        self._cond.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:
+                pass  # that event loop is already closed
+
+    def _try_admit(self, ticket: _Ticket) -> Optional[float]:
+        """0 if admitted, seconds until the buckets refill if at the head, None if queued behind others."""
+        queue = self._queues[ticket.model]
+        if queue[0] is not ticket:
+            return None
+        requests, tokens = self._bucket(ticket.model)
+        now = time.monotonic()
+        wait = max(requests.wait_time(1, now), tokens.wait_time(ticket.tokens, now))
+        if wait > 0:
+            return wait
+        requests.consume(1)
+        tokens.consume(ticket.tokens)
+        heapq.heappop(queue)
+        self._record_admit(now - ticket.enqueued_at)
+        self._notify()
+        return 0.0
+
+    def _record_admit(self, waited: float):
+        self._stats["admitted"] += 1
+        self._stats["total_wait"] += waited
+        self._stats["max_wait"] = max(self._stats["max_wait"], waited)
+        if waited > 0.05:
+            self._stats["throttled"] += 1
+
+    def _abandon(self, ticket: _Ticket):
+        with self._cond:
+            queue = self._queues[ticket.model]
+            if ticket in queue:
+                queue.remove(ticket)
+                heapq.heapify(queue)
+                self._notify()
+
+    def acquire(self, model: str, tokens: int, priority: int = PRIORITY_NORMAL):
+        ticket = self._enqueue(model, tokens, priority)
+        try:
+            with self._cond:
+                while True:
+                    wait = self._try_admit(ticket)
+                    if wait == 0:
+                        return
+                    self._cond.wait(timeout=wait)
+        except BaseException:
+            self._abandon(ticket)
+            raise
+
+    async def aacquire(self, model: str, tokens: int, priority: int = PRIORITY_NORMAL):
+        ticket = self._enqueue(model, tokens, priority)
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_admit(ticket)
+                    if wait == 0:
+                        return
+                    woken = loop.create_future()
+                    self._async_waiters.append((loop, woken))
+                # Until the buckets refill, or until the queue ahead of us moves
+                await asyncio.wait({woken}, timeout=wait)
+                if not woken.done():
+                    with self._cond:
+                        if (loop, woken) in self._async_waiters:
+                            self._async_waiters.remove((loop, woken))
+        except BaseException:
+            self._abandon(ticket)
+            raise
+
+    def _retry_after(self, error: Exception) -> Optional[float]:
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        try:
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000
+            value = headers.get("retry-after")
+            if value:
+                try:
+                    return float(value)
+                except ValueError:
+                    return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+        return None
+
+    def retry_delay(self, error: Exception, attempt: int) -> float:
+        """Seconds to wait before retry number `attempt` + 1, or re-raise if the error is final."""
+        status = getattr(error, "status_code", None)
+        if status not in RETRYABLE_STATUS and type(error).__name__ not in RETRYABLE_ERRORS:
+            raise error
+        hint = self._retry_after(error)
+        with self._cond:
+            if attempt >= self.max_retries:
+                self._stats["failures"] += 1
+                raise LLMThrottledError(
+                    f"LLM call still failing after {attempt + 1} attempts: {error}",
+                    attempts=attempt + 1,
+                    retry_after=hint,
+                ) from error
+            self._stats["retries"] += 1
+        if hint is not None:
+            return min(self.max_delay, hint) + random.uniform(0, 0.25)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def run(self, fn: Callable, model: str, tokens: int, priority: int = PRIORITY_NORMAL, stats: Optional[dict] = None):
+        """Call `fn` once admitted, retrying retryable errors. `stats["retries"]` gets the retry count."""
+        stats = {} if stats is None else stats
+        stats["retries"] = 0
+        while True:
+            self.acquire(model, tokens, priority)
+            try:
+                return fn()
+            except Exception as e:
+                time.sleep(self.retry_delay(e, stats["retries"]))
+                stats["retries"] += 1
+
+    async def arun(self, fn: Callable, model: str, tokens: int, priority: int = PRIORITY_NORMAL, stats: Optional[dict] = None):
+        stats = {} if stats is None else stats
+        stats["retries"] = 0
+        while True:
+            await self.aacquire(model, tokens, priority)
+            try:
+                return await fn()
+            except Exception as e:
+                await asyncio.sleep(self.retry_delay(e, stats["retries"]))
+                stats["retries"] += 1
+
+    def stream(
+        self, fn: Callable[[], Iterator], model: str, tokens: int, priority: int = PRIORITY_NORMAL, stats: Optional[dict] = None
+    ) -> Iterator:
+        """Like run() for streaming calls; only failures before the first chunk are retried."""
+        stats = {} if stats is None else stats
+        stats["retries"] = 0
+        while True:
+            self.acquire(model, tokens, priority)
+            started = False
+            try:
+                for chunk in fn():
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                if started:
+                    raise
+                time.sleep(self.retry_delay(e, stats["retries"]))
+                stats["retries"] += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            admitted = self._stats["admitted"]
+            return {
+                "queue_depth": sum(len(queue) for queue in self._queues.values()),
+                "admitted": admitted,
+                "throttled": self._stats["throttled"],
+                "retries": self._stats["retries"],
+                "failures": self._stats["failures"],
+                "avg_wait_s": round(self._stats["total_wait"] / admitted, 3) if admitted else 0.0,
+                "max_wait_s": round(self._stats["max_wait"], 3),
+            }
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler()
+        return _scheduler
@@ -0,0 +1,170 @@
+# semantic_cache.py
+import re
+import time
+import uuid
+import zlib
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+_NON_WORD = re.compile(r"[^\w#\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, drop punctuation (keeping hashtags) and collapse whitespace."""
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", text.lower())).strip()
+
+
+class HashingVectorizer:
+    """Local, stateless text embedding: hashed word unigrams plus character n-grams.
+
+    No vocabulary or network access is needed; crc32 keeps the hashing stable
+    across processes.
+    """
+
+    def __init__(self, dim: int = 2 ** 12, ngram: int = 3):
+        self.dim = dim
+        self.ngram = ngram
+
+    def _features(self, text: str) -> List[str]:
+        features = []
+        for word in normalize_text(text).split():
+            features.append(word)
+            padded = f" {word} "
+            features.extend(padded[i:i + self.ngram] for i in range(len(padded) - self.ngram + 1))
+        return features
+
+    def transform(self, fields: Dict[str, str]) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for value in fields.values():
+            for feature in self._features(str(value)):
+                h = zlib.crc32(feature.encode("utf-8"))
+                vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SemanticMatch:
+    def __init__(self, response: str, similarity: float, source_id: str, request_id: str):
+        self.response = response
+        self.similarity = similarity
+        self.source_id = source_id
+        self.request_id = request_id
+
+    def __repr__(self) -> str:
+        return f"SemanticMatch(similarity={self.similarity:.3f}, source_id={self.source_id!r})"
+
+
+class _Partition:
+    """Vectors for one (namespace, exact fields) bucket in a growable matrix.
+
+    Once `max_entries` are stored it is a ring buffer: each insert overwrites
+    the oldest row in place, so a write costs O(dim) however full it is.
+    """
+
+    def __init__(self, dim: int, max_entries: int):
+        self.max_entries = max_entries
+        self.matrix = np.zeros((min(16, max_entries), dim), dtype=np.float32)
+        self.ids: List[str] = []
+        self.responses: List[str] = []
+        self._oldest = 0
+
+    def add(self, vector: np.ndarray, request_id: str, response: str):
+        if len(self.ids) >= self.max_entries:
+            index = self._oldest
+            self._oldest = (self._oldest + 1) % self.max_entries
+            self.ids[index] = request_id
+            self.responses[index] = response
+        else:
+            index = len(self.ids)
+            if index == len(self.matrix):
+                grown = np.zeros((min(2 * len(self.matrix), self.max_entries), self.matrix.shape[1]), dtype=np.float32)
+                grown[:index] = self.matrix
+                self.matrix = grown
+            self.ids.append(request_id)
+            self.responses.append(response)
+        self.matrix[index] = vector
+
+    def best(self, vector: np.ndarray) -> Tuple[int, float]:
+        if not self.ids:
+            return -1, 0.0
+        scores = self.matrix[: len(self.ids)] @ vector
+        index = int(np.argmax(scores))
+        return index, float(scores[index])
+
+
+class SemanticCache:
+    """Serve stored responses for near-duplicate requests.
+
+    Fields in `exact` (platform, model...) must match exactly; fields in
+    `fuzzy` are embedded and compared by cosine similarity against `threshold`.
+    Every served response is recorded in `audit_log`.
+    """
+
+    def __init__(self, threshold: float = 0.92, dim: int = 2 ** 12, max_entries: int = 2000, audit_size: int = 1000):
+        self.threshold = threshold
+        self.vectorizer = HashingVectorizer(dim=dim)
+        self.max_entries = max_entries
+        self.audit_log = deque(maxlen=audit_size)
+        self.hits = 0
+        self.misses = 0
+        self._partitions: Dict[tuple, _Partition] = {}
+        self._lock = threading.Lock()
+
+    def _partition_key(self, namespace: str, exact: Dict[str, str]) -> tuple:
+        return (namespace,) + tuple(sorted((k, str(v)) for k, v in exact.items()))
+
+    def lookup(self, namespace: str, exact: Dict[str, str], fuzzy: Dict[str, str]) -> Optional[SemanticMatch]:
+        vector = self.vectorizer.transform(fuzzy)
+        request_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            partition = self._partitions.get(self._partition_key(namespace, exact))
+            index, similarity = partition.best(vector) if partition else (-1, 0.0)
+            if index < 0 or similarity < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            match = SemanticMatch(partition.responses[index], similarity, partition.ids[index], request_id)
+            self.audit_log.append({
+                "request_id": request_id,
+                "source_id": match.source_id,
+                "namespace": namespace,
+                "similarity": round(similarity, 4),
+                "served_at": time.time(),
+            })
+            return match
+
+    def add(self, namespace: str, exact: Dict[str, str], fuzzy: Dict[str, str], response: str) -> str:
+        vector = self.vectorizer.transform(fuzzy)
+        request_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            key = self._partition_key(namespace, exact)
+            partition = self._partitions.get(key)
+            if partition is None:
+                partition = self._partitions[key] = _Partition(self.vectorizer.dim, self.max_entries)
+            partition.add(vector, request_id, response)
+        return request_id
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": sum(len(p.ids) for p in self._partitions.values()),
+        }
+
+
+_default_semantic_cache: Optional[SemanticCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_semantic_cache() -> SemanticCache:
+    global _default_semantic_cache
+    with _default_lock:
+        if _default_semantic_cache is None:
+            _default_semantic_cache = SemanticCache()
+        return _default_semantic_cache
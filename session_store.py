@@ -0,0 +1,305 @@
+# session_store.py
+import os
+import re
+import json
+import glob
+import time
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from agent import PlanItem, _day_number
+
+DEFAULT_SESSION_DB = os.path.join("sessions", "sessions.db")
+
+_ITEM_COLUMNS = ["post_date", "platform", "post_type", "idea_title", "key_points", "cta", "hashtags"]
+_LEGACY_SUFFIX = re.compile(r"_30_day_plan$")
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS plans ("
+    "id INTEGER PRIMARY KEY, brand TEXT NOT NULL, niche TEXT, status TEXT NOT NULL, "
+    "source TEXT, created_at REAL NOT NULL, item_count INTEGER NOT NULL DEFAULT 0)",
+    "CREATE INDEX IF NOT EXISTS idx_plans_brand ON plans(brand, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_plans_created ON plans(created_at)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_plans_source ON plans(source) WHERE source IS NOT NULL",
+    # brand is denormalised onto items so cross-brand queries never join
+    "CREATE TABLE IF NOT EXISTS plan_items ("
+    "id INTEGER PRIMARY KEY, plan_id INTEGER NOT NULL REFERENCES plans(id) ON DELETE CASCADE, "
+    "brand TEXT NOT NULL, day INTEGER, post_date TEXT NOT NULL, platform TEXT NOT NULL, "
+    "post_type TEXT NOT NULL, idea_title TEXT NOT NULL, key_points TEXT NOT NULL, "
+    "cta TEXT NOT NULL, hashtags TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_items_plan ON plan_items(plan_id, day)",
+    "CREATE INDEX IF NOT EXISTS idx_items_brand ON plan_items(brand, day)",
+    "CREATE INDEX IF NOT EXISTS idx_items_platform ON plan_items(platform, day)",
+    "CREATE INDEX IF NOT EXISTS idx_items_post_type ON plan_items(post_type, day)",
+]
+
+
+class SessionStore:
+    """SQLite (WAL) store for generated plans, queryable by brand, platform, day and post type.
+
+    Every generation becomes a new plan row, so history is kept. Items are
+    written one at a time as they are parsed and read back page by page.
+    """
+
+    def __init__(self, path: str = DEFAULT_SESSION_DB):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Each item commit only needs to survive a process crash, not power loss
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # Writes
+
+    def start_plan(self, brand: str, niche: Optional[str] = None, source: Optional[str] = None,
+                   created_at: Optional[float] = None) -> int:
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.execute(
+                "INSERT INTO plans (brand, niche, status, source, created_at) VALUES (?, ?, 'in_progress', ?, ?)",
+                (brand, niche, source, created_at or time.time()),
+            )
+            conn.commit()
+            return cursor.lastrowid
+
+    def add_item(self, plan_id: int, item: PlanItem):
+        """Persist one parsed item immediately, so a crash mid-stream keeps what arrived."""
+        self.add_items(plan_id, [item])
+
+    def add_items(self, plan_id: int, items: Iterable[PlanItem]):
+        rows = [self._item_row(item) for item in items]
+        if not rows:
+            return
+        with self._lock:
+            conn = self._connect()
+            brand = conn.execute("SELECT brand FROM plans WHERE id = ?", (plan_id,)).fetchone()
+            if brand is None:
+                raise KeyError(f"Unknown plan id {plan_id}")
+            conn.executemany(
+                f"INSERT INTO plan_items (plan_id, brand, day, {', '.join(_ITEM_COLUMNS)}) "
+                f"VALUES (?, ?, ?, {', '.join('?' * len(_ITEM_COLUMNS))})",
+                [(plan_id, brand[0]) + row for row in rows],
+            )
+            conn.execute("UPDATE plans SET item_count = item_count + ? WHERE id = ?", (len(rows), plan_id))
+            conn.commit()
+
+    def replace_days(self, plan_id: int, items: Iterable[PlanItem]):
+        """Swap in regenerated items, replacing whatever the plan held for their days."""
+        rows = [self._item_row(item) for item in items]
+        if not rows:
+            return
+        with self._lock:
+            conn = self._connect()
+            brand = conn.execute("SELECT brand FROM plans WHERE id = ?", (plan_id,)).fetchone()
+            if brand is None:
+                raise KeyError(f"Unknown plan id {plan_id}")
+            conn.executemany("DELETE FROM plan_items WHERE plan_id = ? AND day = ?", [(plan_id, row[0]) for row in rows])
+            conn.executemany(
+                f"INSERT INTO plan_items (plan_id, brand, day, {', '.join(_ITEM_COLUMNS)}) "
+                f"VALUES (?, ?, ?, {', '.join('?' * len(_ITEM_COLUMNS))})",
+                [(plan_id, brand[0]) + row for row in rows],
+            )
+            conn.execute(
+                "UPDATE plans SET item_count = (SELECT COUNT(*) FROM plan_items WHERE plan_id = ?) WHERE id = ?",
+                (plan_id, plan_id),
+            )
+            conn.commit()
+
+    def finish_plan(self, plan_id: int, status: str = "complete"):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("UPDATE plans SET status = ? WHERE id = ?", (status, plan_id))
+            conn.commit()
+
+    def abort_plan(self, plan_id: int) -> str:
+        """Mark a plan whose generation raised: 'partial' if any items were saved, else 'failed'."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "UPDATE plans SET status = CASE WHEN item_count > 0 THEN 'partial' ELSE 'failed' END WHERE id = ?",
+                (plan_id,),
+            )
+            conn.commit()
+            row = conn.execute("SELECT status FROM plans WHERE id = ?", (plan_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown plan id {plan_id}")
+        return row[0]
+
+    def delete_plan(self, plan_id: int):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM plans WHERE id = ?", (plan_id,))
+            conn.commit()
+
+    def save_plan(self, brand: str, items: Iterable[PlanItem], niche: Optional[str] = None) -> int:
+        plan_id = self.start_plan(brand, niche=niche)
+        self.add_items(plan_id, items)
+        self.finish_plan(plan_id)
+        return plan_id
+
+    @staticmethod
+    def _item_row(item: PlanItem) -> Tuple:
+        data = item.model_dump()
+        return (_day_number(data["post_date"]),) + tuple(data[c] for c in _ITEM_COLUMNS)
+
+    # Reads
+
+    def list_plans(self, brand: Optional[str] = None, limit: int = 50, offset: int = 0) -> List[Dict]:
+        """Plan metadata, newest first."""
+        query = "SELECT id, brand, niche, status, source, created_at, item_count FROM plans"
+        params: list = []
+        if brand is not None:
+            query += " WHERE brand = ?"
+            params.append(brand)
+        query += " ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        with self._lock:
+            return [dict(row) for row in self._connect().execute(query, params)]
+
+    def latest_plan(self, brand: str) -> Optional[Dict]:
+        plans = self.list_plans(brand=brand, limit=1)
+        return plans[0] if plans else None
+
+    def _item_filter(self, plan_id, brand, platform, post_type, day) -> Tuple[str, list]:
+        clauses, params = [], []
+        for column, value in (("plan_id", plan_id), ("brand", brand), ("platform", platform),
+                              ("post_type", post_type), ("day", day)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return (" AND ".join(clauses) or "1"), params
+
+    def page_items(
+        self,
+        plan_id: Optional[int] = None,
+        brand: Optional[str] = None,
+        platform: Optional[str] = None,
+        post_type: Optional[str] = None,
+        day: Optional[int] = None,
+        limit: int = 100,
+        after_id: int = 0,
+    ) -> Tuple[List[PlanItem], Optional[int]]:
+        """One page of matching items plus the cursor for the next page (None at the end).
+
+        Keyset pagination on the row id, so deep pages cost the same as the first.
+        """
+        where, params = self._item_filter(plan_id, brand, platform, post_type, day)
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT id, {', '.join(_ITEM_COLUMNS)} FROM plan_items "
+                f"WHERE {where} AND id > ? ORDER BY id LIMIT ?",
+                params + [after_id, limit],
+            ).fetchall()
+        items = [PlanItem(**{c: row[c] for c in _ITEM_COLUMNS}) for row in rows]
+        return items, (rows[-1]["id"] if len(rows) == limit else None)
+
+    def iter_items(self, page_size: int = 100, **filters) -> Iterator[PlanItem]:
+        """Lazily yield matching items, fetching `page_size` rows at a time."""
+        cursor = 0
+        while cursor is not None:
+            items, cursor = self.page_items(limit=page_size, after_id=cursor, **filters)
+            yield from items
+
+    def count_items(self, plan_id: Optional[int] = None, brand: Optional[str] = None,
+                    platform: Optional[str] = None, post_type: Optional[str] = None,
+                    day: Optional[int] = None) -> int:
+        where, params = self._item_filter(plan_id, brand, platform, post_type, day)
+        with self._lock:
+            return self._connect().execute(f"SELECT COUNT(*) FROM plan_items WHERE {where}", params).fetchone()[0]
+
+    def plan_for_source(self, source: str) -> Optional[int]:
+        with self._lock:
+            row = self._connect().execute("SELECT id FROM plans WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    def load_plan(self, plan_id: int) -> List[PlanItem]:
+        return list(self.iter_items(plan_id=plan_id))
+
+
+def _brand_from_filename(path: str) -> str:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return _LEGACY_SUFFIX.sub("", stem).replace("_", " ")
+
+
+def migrate_json_sessions(
+    store: SessionStore, base_dir: str = "sessions", skipped: Optional[List[Tuple[str, str]]] = None
+) -> List[Tuple[str, int]]:
+    """Import legacy `<brand>_30_day_plan.json` files written by utils.save_session.
+
+    Safe to re-run: files already imported (matched by path) are skipped.
+    A file that is not valid JSON or whose items do not validate is left out
+    entirely, never half-imported, and added to `skipped` as (path, reason);
+    once fixed it is picked up by the next run.
+    Returns (path, plan_id) for each newly imported file.
+    """
+    imported = []
+    for path in sorted(glob.glob(os.path.join(base_dir, "*.json"))):
+        source = os.path.abspath(path)
+        if store.plan_for_source(source) is not None:
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            if not isinstance(raw, list):
+                raise ValueError("expected a JSON array of plan items")
+            items = [PlanItem(**x) for x in raw]
+        except (ValueError, TypeError) as e:
+            if skipped is not None:
+                skipped.append((path, f"{type(e).__name__}: {e}"))
+            continue
+        plan_id = store.start_plan(_brand_from_filename(path), source=source, created_at=os.path.getmtime(path))
+        store.add_items(plan_id, items)
+        store.finish_plan(plan_id)
+        imported.append((path, plan_id))
+    return imported
+
+
+_default_store: Optional[SessionStore] = None
+_default_lock = threading.Lock()
+
+
+def get_default_session_store() -> SessionStore:
+    """Process-wide store; SESSION_DB_PATH overrides the location."""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = SessionStore(os.getenv("SESSION_DB_PATH", DEFAULT_SESSION_DB))
+        return _default_store
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import legacy sessions/*.json plans into the session store.")
+    parser.add_argument("--sessions-dir", default="sessions")
+    parser.add_argument("--db", default=os.getenv("SESSION_DB_PATH", DEFAULT_SESSION_DB))
+    args = parser.parse_args()
+
+    skipped = []
+    results = migrate_json_sessions(SessionStore(args.db), args.sessions_dir, skipped)
+    for path, plan_id in results:
+        print(f"Imported {path} as plan {plan_id}")
+    for path, reason in skipped:
+        print(f"Skipped {path}: {reason}")
+    print(f"{len(results)} file(s) imported into {args.db}, {len(skipped)} skipped")
@@ -0,0 +1,265 @@
+# singleflight.py
+"""In-flight request coalescing ("single flight").
+
+Identical requests that arrive while one is already running wait for it
+instead of calling the model again: the first caller (the leader) makes the
+call and every follower receives its result, or for streams every chunk,
+including those sent before the follower joined. Only concurrent calls are
+shared; once a flight lands its key is free again (keeping finished answers
+is ResponseCache's job). The leader's error is raised in its followers too.
+
+    flights = get_singleflight()
+    resp, shared = flights.do(key, lambda: llm.invoke(messages))
+    resp, shared = await flights.ado(key, lambda: llm.ainvoke(messages))
+    for chunk in flights.stream(key, lambda: llm.stream(messages)): ...
+
+Sync and async callers of the same key share one flight.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Called in a follower once its shared flight lands, with the leader's error if any
+OnShared = Callable[[Optional[BaseException]], None]
+
+
+class FlightAborted(RuntimeError):
+    """The leading call was cancelled or interrupted before it finished."""
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class _Flight:
+    """One in-progress call: the chunks published so far and, once landed, its outcome."""
+
+    def __init__(self):
+        self.chunks: List[Any] = []
+        self.done = False
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+        self._cond = threading.Condition()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def publish(self, chunk: Any):
+        with self._cond:
+            self.chunks.append(chunk)
+            self._cond.notify_all()
+
+    def land(self, result: Any = None, error: Optional[BaseException] = None):
+        with self._cond:
+            self.result, self.error, self.done = result, error, True
+            self._cond.notify_all()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:
+                pass  # that event loop is already closed
+
+    def outcome(self) -> Any:
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def wait(self) -> Any:
+        with self._cond:
+            self._cond.wait_for(lambda: self.done)
+        return self.outcome()
+
+    async def wait_async(self) -> Any:
+        future = None
+        with self._cond:
+            if not self.done:
+                future = asyncio.get_running_loop().create_future()
+                self._waiters.append((asyncio.get_running_loop(), future))
+        if future is not None:
+            await future
+        return self.outcome()
+
+    def replay(self) -> Iterator[Any]:
+        """Every chunk from the first, then the leader's error if it failed."""
+        seen = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: seen < len(self.chunks) or self.done)
+                pending, done = self.chunks[seen:], self.done
+            seen += len(pending)
+            yield from pending
+            if done and seen == len(self.chunks):
+                break
+        self.outcome()
+
+
+class SingleFlight:
+    """Keyed in-flight calls, shared by every caller in the process."""
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._leaders = 0
+        self._coalesced = 0
+
+    def _join(self, key: str) -> Tuple[_Flight, bool]:
+        """(flight, is_leader) for `key`, starting a flight if none is running."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                self._coalesced += 1
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            self._leaders += 1
+            return flight, True
+
+    def _leave(self, flight: _Flight):
+        with self._lock:
+            flight.followers -= 1
+
+    def _land(self, key: str, flight: _Flight, result: Any = None, error: Optional[BaseException] = None):
+        # Unregister first, so a caller arriving after this starts a fresh flight
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.land(result, error)
+
+    def _abort(self, key: str, flight: _Flight, error: BaseException):
+        self._land(key, flight, error=FlightAborted(f"Shared call was interrupted: {error!r}"))
+
+    def do(self, key: str, fn: Callable[[], Any], on_shared: Optional[OnShared] = None) -> Tuple[Any, bool]:
+        """Return (result, shared): fn() runs only if no identical call is in flight."""
+        flight, leader = self._join(key)
+        if not leader:
+            return self._follow(flight, flight.wait, on_shared), True
+        try:
+            result = fn()
+        except Exception as e:
+            self._land(key, flight, error=e)
+            raise
+        except BaseException as e:
+            self._abort(key, flight, e)
+            raise
+        self._land(key, flight, result)
+        return result, False
+
+    async def ado(
+        self, key: str, fn: Callable[[], Awaitable[Any]], on_shared: Optional[OnShared] = None
+    ) -> Tuple[Any, bool]:
+        """asyncio version of do(); followers wait without blocking their event loop."""
+        flight, leader = self._join(key)
+        if not leader:
+            try:
+                result = await flight.wait_async()
+            except Exception as e:
+                if on_shared is not None:
+                    on_shared(e)
+                raise
+            finally:
+                self._leave(flight)
+            if on_shared is not None:
+                on_shared(None)
+            return result, True
+        try:
+            result = await fn()
+        except Exception as e:
+            self._land(key, flight, error=e)
+            raise
+        except BaseException as e:
+            # Includes asyncio.CancelledError: followers must not hang on a cancelled leader
+            self._abort(key, flight, e)
+            raise
+        self._land(key, flight, result)
+        return result, False
+
+    def _follow(self, flight: _Flight, wait: Callable[[], Any], on_shared: Optional[OnShared]) -> Any:
+        try:
+            result = wait()
+        except Exception as e:
+            if on_shared is not None:
+                on_shared(e)
+            raise
+        finally:
+            self._leave(flight)
+        if on_shared is not None:
+            on_shared(None)
+        return result
+
+    def stream(
+        self, key: str, factory: Callable[[], Iterator[Any]], on_shared: Optional[OnShared] = None
+    ) -> Iterator[Any]:
+        """Yield the chunks of factory()'s stream, shared with identical concurrent streams.
+
+        If the leader stops reading early while followers are attached, the
+        rest of the stream is read in a background thread so they still get
+        all of it; with no followers the upstream stream is closed.
+        """
+        flight, leader = self._join(key)
+        if not leader:
+            error = None
+            try:
+                yield from flight.replay()
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                self._leave(flight)
+                if on_shared is not None:
+                    on_shared(error)
+            return
+
+        upstream = None
+        try:
+            upstream = factory()
+            for chunk in upstream:
+                flight.publish(chunk)
+                yield chunk
+        except Exception as e:
+            self._land(key, flight, error=e)
+            raise
+        except BaseException as e:
+            if upstream is not None and self._hand_off(key, flight):
+                threading.Thread(target=self._drain, args=(key, flight, upstream), daemon=True).start()
+            else:
+                if upstream is not None and hasattr(upstream, "close"):
+                    upstream.close()
+                self._abort(key, flight, e)
+            raise
+        self._land(key, flight)
+
+    def _hand_off(self, key: str, flight: _Flight) -> bool:
+        """True if followers still need the stream; otherwise it is unregistered."""
+        with self._lock:
+            if flight.followers > 0:
+                return True
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            return False
+
+    def _drain(self, key: str, flight: _Flight, upstream: Iterator[Any]):
+        try:
+            for chunk in upstream:
+                flight.publish(chunk)
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            return
+        self._land(key, flight)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"in_flight": len(self._flights), "leaders": self._leaders, "coalesced": self._coalesced}
+
+
+_singleflight: Optional[SingleFlight] = None
+_singleflight_lock = threading.Lock()
+
+
+def get_singleflight() -> SingleFlight:
+    """Process-wide SingleFlight used by SocialAgent unless given its own."""
+    global _singleflight
+    with _singleflight_lock:
+        if _singleflight is None:
+            _singleflight = SingleFlight()
+        return _singleflight
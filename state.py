@@ -0,0 +1,82 @@
+# state.py
+import pickle
+from collections import OrderedDict
+from typing import Any, Iterator, MutableMapping, Optional, Tuple
+
+
+def _approx_size(value: Any) -> int:
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return len(repr(value))
+
+
+class ArtifactStore:
+    """Bounded, insertion-ordered store for generated artifacts (plans, captions...).
+
+    Least recently used entries are evicted once either `max_items` or the
+    approximate `max_bytes` budget is exceeded. The newest entry is always kept.
+    """
+
+    def __init__(self, max_items: int = 20, max_bytes: int = 2_000_000):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self.bytes = 0
+
+    def put(self, key: str, value: Any):
+        if key in self._items:
+            self.bytes -= self._items.pop(key)[1]
+        size = _approx_size(value)
+        self._items[key] = (value, size)
+        self.bytes += size
+        while len(self._items) > 1 and (len(self._items) > self.max_items or self.bytes > self.max_bytes):
+            _, (_, evicted) = self._items.popitem(last=False)
+            self.bytes -= evicted
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key not in self._items:
+            return default
+        self._items.move_to_end(key)
+        return self._items[key][0]
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        if key not in self._items:
+            return default
+        value, size = self._items.pop(key)
+        self.bytes -= size
+        return value
+
+    def latest(self) -> Optional[Any]:
+        if not self._items:
+            return None
+        return next(reversed(self._items.values()))[0]
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return ((key, value) for key, (value, _) in self._items.items())
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+# Per-session caps for each kind of artifact kept across reruns
+STORE_LIMITS = {
+    "plans": (5, 1_000_000),
+    "bulk_captions": (3, 1_000_000),
+    "captions": (20, 500_000),
+    "repurposed": (20, 500_000),
+    # Prepared Parquet downloads, keyed by export.export_key
+    "exports": (2, 4_000_000),
+}
+
+
+def get_store(session_state: MutableMapping, name: str) -> ArtifactStore:
+    """The named ArtifactStore for this session, created on first use."""
+    key = f"artifacts_{name}"
+    if key not in session_state:
+        max_items, max_bytes = STORE_LIMITS.get(name, (20, 1_000_000))
+        session_state[key] = ArtifactStore(max_items=max_items, max_bytes=max_bytes)
+    return session_state[key]
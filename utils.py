@@ -1,11 +1,19 @@
 # utils.py
 import os
+import re
 import json
-import pandas as pd
-from typing import List
+from typing import TYPE_CHECKING, Iterator, List, Union
 from agent import PlanItem
+from plan_columns import PlanColumns
 
-def plan_to_dataframe(items: List[PlanItem]) -> pd.DataFrame:
+if TYPE_CHECKING:
+    import pandas as pd
+
+def plan_to_dataframe(items: Union[List[PlanItem], PlanColumns]) -> "pd.DataFrame":
+    import pandas as pd
+
+    if isinstance(items, PlanColumns):
+        return items.to_dataframe()
     if not items:
         return pd.DataFrame(columns=["post_date","platform","post_type","idea_title","key_points","cta","hashtags"])
     data = [item.model_dump() for item in items]
@@ -23,4 +31,57 @@ def load_session(path: str) -> List[PlanItem]:
     from agent import PlanItem  # local import to avoid circular
     with open(path, "r", encoding="utf-8") as f:
         raw = json.load(f)
-    return [PlanItem(**x) for x in raw]
\ No newline at end of file
+    return [PlanItem(**x) for x in raw]
+
+_WHITESPACE = re.compile(r"\s*")
+
+def iter_session_records(path: str, chunk_size: int = 1 << 16) -> Iterator[dict]:
+    """Yield the items of a saved session's JSON array one by one.
+
+    The file is read in chunks, so memory stays bounded by the largest item
+    rather than the file size. An item is only yielded once the `,` or `]`
+    after it has been read, so a number split across chunks is not cut short.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf = ""
+        pos = 0
+        started = False
+        eof = False
+        while True:
+            # Skip whitespace, the opening bracket and separators between items
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] == "," or (not started and buf[pos] == "[")):
+                started = started or buf[pos] == "["
+                pos += 1
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            if pos < len(buf) and started:
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    # Anything else after the item may be the rest of a split number
+                    after = _WHITESPACE.match(buf, end).end()
+                    if after < len(buf) and buf[after] in ",]":
+                        yield obj
+                        pos = end
+                        continue
+                    if eof:
+                        raise ValueError(f"{path}: expected ',' or ']' after an item")
+            elif eof:
+                raise ValueError(f"{path}: truncated or not a JSON array")
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+
+def iter_session(path: str) -> Iterator[PlanItem]:
+    """Streaming variant of load_session."""
+    for raw in iter_session_records(path):
+        yield PlanItem(**raw)
+
+def load_session_columns(path: str) -> PlanColumns:
+    """Load a saved session straight into a compact PlanColumns, without building PlanItem models."""
+    return PlanColumns(iter_session_records(path))